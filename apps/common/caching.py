@@ -0,0 +1,269 @@
+import json
+import pickle
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Dict, Final, Iterable, List, Optional, Tuple
+
+import redis
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from .metrics import get_counters, increment_counter
+
+TIER_STATS: Final[Tuple[str, ...]] = (
+    "local_hits",
+    "local_misses",
+    "shared_hits",
+    "shared_misses",
+)
+
+_MISSING = object()
+_caches: Dict[str, "TieredCache"] = {}
+
+
+class LocalCache:
+    """
+    Size-bounded LRU with a TTL per entry, private to the process.
+    """
+
+    def __init__(self, max_entries: int, ttl: float) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class BaseInvalidationBus:
+    """
+    Tells every process which keys of a tiered cache to drop from their
+    local tier.
+    """
+
+    def publish(self, name: str, keys: List[str]) -> None:
+        raise NotImplementedError
+
+    def subscribe(self, callback: Callable[[str, List[str]], None]) -> None:
+        raise NotImplementedError
+
+
+class InMemoryInvalidationBus(BaseInvalidationBus):
+    def __init__(self) -> None:
+        self._callbacks: List[Callable[[str, List[str]], None]] = []
+
+    def publish(self, name: str, keys: List[str]) -> None:
+        for callback in self._callbacks:
+            callback(name, keys)
+
+    def subscribe(self, callback: Callable[[str, List[str]], None]) -> None:
+        self._callbacks.append(callback)
+
+
+class RedisInvalidationBus(BaseInvalidationBus):
+    """
+    Redis pub/sub with one listener thread per process. Delivery is at most
+    once, so the local TTL bounds how long a lost message leaves a stale entry.
+    A process ignores its own messages, having already updated its local tier.
+    """
+
+    CHANNEL: Final[str] = "tiered_cache:invalidate"
+
+    def __init__(self, client: Optional[redis.Redis] = None) -> None:
+        self.client = client or redis.Redis.from_url(settings.REDIS_URL)
+        self._callbacks: List[Callable[[str, List[str]], None]] = []
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._origin = uuid.uuid4().hex
+
+    def publish(self, name: str, keys: List[str]) -> None:
+        self.client.publish(self.CHANNEL, json.dumps([self._origin, name, keys]))
+
+    def subscribe(self, callback: Callable[[str, List[str]], None]) -> None:
+        with self._lock:
+            self._callbacks.append(callback)
+            if self._thread is None:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.CHANNEL: self._handle})
+                self._thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def _handle(self, message: Dict[str, Any]) -> None:
+        origin, name, keys = json.loads(message["data"])
+        if origin == self._origin:
+            return
+        for callback in self._callbacks:
+            callback(name, keys)
+
+
+@lru_cache(maxsize=None)
+def get_invalidation_bus() -> BaseInvalidationBus:
+    bus = import_string(settings.TIERED_CACHE_INVALIDATION_BUS_BACKEND)()
+    bus.subscribe(_drop_local)
+    return bus
+
+
+class TieredCache:
+    """
+    A per-process LRU in front of the default cache for hot, rarely changing
+    values. Reads try the local tier, then the shared one, and fill the local
+    tier on the way back; ``invalidate`` drops keys from both tiers here and
+    from the local tier of every other process through the invalidation bus.
+
+    With ``copy_values`` the local tier keeps pickles, so callers may mutate
+    what they get (model instances) without touching the cached copy.
+    """
+
+    STATS_FLUSH_SECONDS: Final[float] = 10.0
+
+    def __init__(
+        self,
+        name: str,
+        max_entries: int = 1000,
+        local_ttl: float = 30.0,
+        timeout: int = 300,
+        copy_values: bool = False,
+    ) -> None:
+        self.name = name
+        self.local = LocalCache(max_entries, local_ttl)
+        self.timeout = timeout
+        self.copy_values = copy_values
+        self.stats: Counter = Counter()
+        self._stats_lock = threading.Lock()
+        self._stats_flushed_at = time.monotonic()
+        _caches[name] = self
+
+    def get(
+        self,
+        key: Any,
+        default: Any = None,
+        is_valid: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """
+        Values rejected by ``is_valid`` count as misses in their tier.
+        """
+        get_invalidation_bus()
+        key = str(key)
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            value = pickle.loads(value) if self.copy_values else value
+            if is_valid is None or is_valid(value):
+                self._count("local_hits")
+                return value
+        self._count("local_misses")
+
+        value = cache.get(self._shared_key(key), _MISSING)
+        if value is _MISSING or (is_valid is not None and not is_valid(value)):
+            self._count("shared_misses")
+            return default
+        self._count("shared_hits")
+        self._set_local(key, value)
+        return value
+
+    def set(self, key: Any, value: Any, publish: bool = False) -> None:
+        """
+        ``publish`` drops the key from the local tier of other processes, for
+        values that replace a changed one rather than fill a miss.
+        """
+        key = str(key)
+        cache.set(self._shared_key(key), value, self.timeout)
+        if publish:
+            get_invalidation_bus().publish(self.name, [key])
+        self._set_local(key, value)
+
+    def invalidate(self, keys: Iterable[Any]) -> None:
+        """
+        Drops the keys everywhere now and, inside a transaction, again after
+        commit so a read of the old row in between is not left cached.
+        """
+        keys = [str(key) for key in keys]
+        if not keys:
+            return
+        self._invalidate(keys)
+        if connection.in_atomic_block:
+            transaction.on_commit(lambda: self._invalidate(keys))
+
+    def flush_stats(self) -> None:
+        """
+        Adds this process's hit and miss counts to the shared counters.
+        """
+        with self._stats_lock:
+            stats, self.stats = self.stats, Counter()
+            self._stats_flushed_at = time.monotonic()
+        for stat, count in stats.items():
+            increment_counter(f"tiered_cache:{self.name}:{stat}", count)
+
+    def _invalidate(self, keys: List[str]) -> None:
+        self.local.delete_many(keys)
+        cache.delete_many([self._shared_key(key) for key in keys])
+        get_invalidation_bus().publish(self.name, keys)
+
+    def _set_local(self, key: str, value: Any) -> None:
+        self.local.set(key, pickle.dumps(value) if self.copy_values else value)
+
+    def _shared_key(self, key: str) -> str:
+        return f"{self.name}:{key}"
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self.stats[stat] += 1
+            due = time.monotonic() - self._stats_flushed_at >= self.STATS_FLUSH_SECONDS
+        if due:
+            self.flush_stats()
+
+
+def get_tier_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Shared hit and miss counts per tier of every tiered cache.
+    """
+    stats = {}
+    for name, tiered_cache in _caches.items():
+        tiered_cache.flush_stats()
+        counters = get_counters(f"tiered_cache:{name}:{stat}" for stat in TIER_STATS)
+        stats[name] = {
+            stat: counters[f"tiered_cache:{name}:{stat}"] for stat in TIER_STATS
+        }
+    return stats
+
+
+def clear_local_caches() -> None:
+    for tiered_cache in _caches.values():
+        tiered_cache.local.clear()
+
+
+def _drop_local(name: str, keys: List[str]) -> None:
+    if tiered_cache := _caches.get(name):
+        tiered_cache.local.delete_many(keys)
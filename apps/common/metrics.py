@@ -0,0 +1,28 @@
+from typing import Dict, Final, Iterable
+
+from django.core.cache import cache
+
+KEY_PREFIX: Final[str] = "metrics"
+
+
+def increment_counter(name: str, delta: int = 1) -> None:
+    """
+    Shared counter kept in the default cache, so every process adds to it.
+    """
+    key = f"{KEY_PREFIX}:{name}"
+    cache.add(key, 0, timeout=None)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        # Evicted between add and incr.
+        cache.add(key, delta, timeout=None)
+
+
+def get_counters(names: Iterable[str]) -> Dict[str, int]:
+    names = list(names)
+    values = cache.get_many([f"{KEY_PREFIX}:{name}" for name in names])
+    return {name: values.get(f"{KEY_PREFIX}:{name}", 0) for name in names}
+
+
+def reset_counters(names: Iterable[str]) -> None:
+    cache.delete_many([f"{KEY_PREFIX}:{name}" for name in names])
@@ -0,0 +1,95 @@
+import time
+
+import pytest
+
+from .caching import LocalCache, RedisInvalidationBus, TieredCache, get_invalidation_bus
+from .metrics import get_counters, reset_counters
+
+
+class TestLocalCache:
+    def test_evicts_least_recently_used(self):
+        local = LocalCache(max_entries=2, ttl=60)
+        local.set("a", 1)
+        local.set("b", 2)
+        assert local.get("a") == 1
+        local.set("c", 3)
+
+        assert local.get("a") == 1
+        assert local.get("c") == 3
+        assert local.get("b") is None
+        assert len(local) == 2
+
+    def test_entries_expire(self):
+        local = LocalCache(max_entries=10, ttl=0)
+        local.set("a", 1)
+        assert local.get("a") is None
+
+
+class TestTieredCache:
+    @pytest.fixture
+    def tiered(self):
+        tiered = TieredCache("test_tiered", copy_values=True)
+        yield tiered
+        tiered.invalidate(["key"])
+        tiered.stats.clear()
+
+    def test_reads_local_then_shared_tier(self, tiered):
+        assert tiered.get("key") is None
+        tiered.set("key", {"value": 1})
+        assert tiered.get("key") == {"value": 1}
+
+        tiered.local.clear()
+        assert tiered.get("key") == {"value": 1}
+        assert tiered.get("key") == {"value": 1}
+        assert tiered.stats == {
+            "local_hits": 2,
+            "local_misses": 2,
+            "shared_hits": 1,
+            "shared_misses": 1,
+        }
+
+    def test_local_copies_are_private(self, tiered):
+        tiered.set("key", {"value": 1})
+        tiered.get("key")["value"] = 2
+        assert tiered.get("key") == {"value": 1}
+
+    def test_invalid_values_count_as_misses(self, tiered):
+        tiered.set("key", {"version": 1})
+        assert tiered.get("key", is_valid=lambda value: value["version"] == 2) is None
+        assert tiered.stats["local_misses"] == 1
+        assert tiered.stats["shared_misses"] == 1
+
+    def test_invalidation_reaches_other_processes(self, tiered):
+        tiered.set("key", {"value": 1})
+        # Another process dropping the key publishes it on the bus.
+        get_invalidation_bus().publish(tiered.name, ["key"])
+
+        assert tiered.local.get("key") is None
+        assert tiered.get("key") == {"value": 1}
+
+    def test_redis_bus_delivers_to_subscribers(self, redis_client):
+        bus = RedisInvalidationBus(client=redis_client)
+        received = []
+        bus.subscribe(lambda name, keys: received.append((name, keys)))
+        bus.publish("test_tiered", ["own"])
+        RedisInvalidationBus(client=redis_client).publish("test_tiered", ["key"])
+
+        deadline = time.monotonic() + 2
+        while not received and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert received == [("test_tiered", ["key"])]
+
+    def test_invalidate_drops_both_tiers(self, tiered):
+        tiered.set("key", {"value": 1})
+        tiered.invalidate(["key"])
+        assert tiered.get("key") is None
+
+    def test_flush_stats_adds_to_shared_counters(self, tiered):
+        names = [f"tiered_cache:test_tiered:{stat}" for stat in ("local_misses",)]
+        reset_counters(names)
+        tiered.get("key")
+        tiered.flush_stats()
+
+        assert get_counters(names) == {names[0]: 1}
+        assert tiered.stats == {}
+        reset_counters(names)
@@ -1,10 +1,16 @@
 from django.contrib import admin
 
-from .models import Driver
+from .models import Driver, DriverLocation
+
+
+class DriverLocationInline(admin.StackedInline):
+    model = DriverLocation
+    readonly_fields = ["updated_at"]
 
 
 @admin.register(Driver)
 class DriverAdmin(admin.ModelAdmin):
+    inlines = [DriverLocationInline]
     list_display = [
         "user",
         "is_online",
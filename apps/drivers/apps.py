@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class DriversConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.drivers"
+
+    def ready(self) -> None:
+        from . import receivers  # noqa: F401
@@ -0,0 +1,375 @@
+import json
+import math
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Final, Iterable, List, NamedTuple, Optional, Tuple
+
+import redis
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .geo import KM_PER_DEGREE, MAX_GEO_LATITUDE
+from .spatial import GridIndex
+
+PROFILE_FIELDS: Final[Tuple[str, ...]] = (
+    "username",
+    "phone_number",
+    "vehicle_number",
+    "vehicle_model",
+)
+
+AvailabilityEntry = Tuple[int, float, float, Dict[str, Any]]
+Position = Tuple[float, float]
+
+
+class LoadState(NamedTuple):
+    expires_in: float
+    rebuild_seconds: float
+
+
+@dataclass
+class AvailableDriver:
+    id: int
+    latitude: float
+    longitude: float
+    distance_km: float
+    eta_seconds: float = 0.0
+    username: str = ""
+    phone_number: str = ""
+    vehicle_number: str = ""
+    vehicle_model: str = ""
+
+
+class BaseAvailabilityBackend:
+    """
+    Set of online, not busy drivers with a known position, searchable by
+    radius without touching the ``drivers`` table. It is updated one driver
+    at a time on every transition, and its version changes whenever its
+    content does.
+    """
+
+    def add(
+        self,
+        driver_id: int,
+        latitude: float,
+        longitude: float,
+        profile: Dict[str, Any],
+    ) -> Optional[Position]:
+        """
+        Returns the driver's previous position, or None if it was not in the
+        set; ``remove`` likewise.
+        """
+        raise NotImplementedError
+
+    def remove(self, driver_id: int) -> Optional[Position]:
+        raise NotImplementedError
+
+    def search(
+        self, latitude: float, longitude: float, radius_km: float, limit: int
+    ) -> List[AvailableDriver]:
+        raise NotImplementedError
+
+    def within_box(
+        self, min_lat: float, max_lat: float, min_lon: float, max_lon: float
+    ) -> List[AvailableDriver]:
+        """
+        Drivers inside the latitude/longitude box, with ``distance_km`` 0.
+        """
+        raise NotImplementedError
+
+    def driver_ids(self) -> List[int]:
+        raise NotImplementedError
+
+    def version(self) -> int:
+        raise NotImplementedError
+
+    def replace(
+        self, entries: Iterable[AvailabilityEntry], rebuild_seconds: float = 0.0
+    ) -> None:
+        """
+        Reloads the whole set; ``rebuild_seconds`` is how long computing
+        ``entries`` took, kept for early refresh decisions.
+        """
+        raise NotImplementedError
+
+    def load_state(self) -> Optional[LoadState]:
+        """
+        Time left until the set needs reloading, or None if it already does.
+        """
+        raise NotImplementedError
+
+    def is_loaded(self) -> bool:
+        return self.load_state() is not None
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class InMemoryAvailabilityBackend(BaseAvailabilityBackend):
+    """
+    Per-process backend over a GridIndex. Other processes' transitions are
+    only picked up on the next periodic reload, so use it for tests and
+    single-process deployments.
+    """
+
+    def __init__(self) -> None:
+        self.index = GridIndex(cell_size_deg=settings.DRIVER_INDEX_CELL_SIZE_DEG)
+        self._profiles: Dict[int, Dict[str, Any]] = {}
+        self._loaded_at: Optional[float] = None
+        self._rebuild_seconds = 0.0
+        self._version = 0
+        self._lock = threading.RLock()
+
+    def add(
+        self,
+        driver_id: int,
+        latitude: float,
+        longitude: float,
+        profile: Dict[str, Any],
+    ) -> Optional[Position]:
+        with self._lock:
+            previous = self._position(driver_id)
+            self.index.upsert(driver_id, latitude, longitude)
+            self._profiles[driver_id] = profile
+            self._version += 1
+            return previous
+
+    def remove(self, driver_id: int) -> Optional[Position]:
+        with self._lock:
+            previous = self._position(driver_id)
+            self.index.remove(driver_id)
+            if self._profiles.pop(driver_id, None) is not None:
+                self._version += 1
+            return previous
+
+    def _position(self, driver_id: int) -> Optional[Position]:
+        return self.index.position(driver_id) if driver_id in self.index else None
+
+    def search(
+        self, latitude: float, longitude: float, radius_km: float, limit: int
+    ) -> List[AvailableDriver]:
+        results = []
+        with self._lock:
+            for driver_id, distance_km in self.index.nearest(
+                latitude, longitude, limit, radius_km
+            ):
+                driver_lat, driver_lon = self.index.position(driver_id)
+                results.append(
+                    AvailableDriver(
+                        id=driver_id,
+                        latitude=driver_lat,
+                        longitude=driver_lon,
+                        distance_km=distance_km,
+                        **self._profiles.get(driver_id, {}),
+                    )
+                )
+        return results
+
+    def within_box(
+        self, min_lat: float, max_lat: float, min_lon: float, max_lon: float
+    ) -> List[AvailableDriver]:
+        with self._lock:
+            return [
+                AvailableDriver(
+                    driver_id,
+                    *self.index.position(driver_id),
+                    distance_km=0.0,
+                    **self._profiles.get(driver_id, {}),
+                )
+                for driver_id in self.index.within_box(
+                    min_lat, max_lat, min_lon, max_lon
+                )
+            ]
+
+    def driver_ids(self) -> List[int]:
+        with self._lock:
+            return list(self._profiles)
+
+    def version(self) -> int:
+        return self._version
+
+    def replace(
+        self, entries: Iterable[AvailabilityEntry], rebuild_seconds: float = 0.0
+    ) -> None:
+        entries = list(entries)
+        with self._lock:
+            self.index.rebuild(
+                (driver_id, latitude, longitude)
+                for driver_id, latitude, longitude, _ in entries
+            )
+            self._profiles = {driver_id: profile for driver_id, *_, profile in entries}
+            self._loaded_at = time.monotonic()
+            self._rebuild_seconds = rebuild_seconds
+            self._version += 1
+
+    def load_state(self) -> Optional[LoadState]:
+        if self._loaded_at is None:
+            return None
+        expires_in = settings.DRIVER_INDEX_REFRESH_SECONDS - (
+            time.monotonic() - self._loaded_at
+        )
+        return LoadState(expires_in, self._rebuild_seconds) if expires_in > 0 else None
+
+    def clear(self) -> None:
+        with self._lock:
+            self.index.clear()
+            self._profiles.clear()
+            self._loaded_at = None
+            self._version += 1
+
+
+class RedisGeoAvailabilityBackend(BaseAvailabilityBackend):
+    """
+    Shared backend keeping positions in a Redis GEO set and driver profiles
+    in a hash next to it.
+    """
+
+    GEO_KEY: Final[str] = "available_drivers:geo"
+    PROFILES_KEY: Final[str] = "available_drivers:profiles"
+    LOADED_KEY: Final[str] = "available_drivers:loaded"
+    VERSION_KEY: Final[str] = "available_drivers:version"
+
+    def __init__(self, client: Optional[redis.Redis] = None) -> None:
+        self.client = client or redis.Redis.from_url(settings.REDIS_URL)
+
+    def add(
+        self,
+        driver_id: int,
+        latitude: float,
+        longitude: float,
+        profile: Dict[str, Any],
+    ) -> Optional[Position]:
+        pipe = self.client.pipeline()
+        pipe.geopos(self.GEO_KEY, driver_id)
+        pipe.geoadd(self.GEO_KEY, (longitude, latitude, driver_id))
+        pipe.hset(self.PROFILES_KEY, str(driver_id), json.dumps(profile))
+        pipe.incr(self.VERSION_KEY)
+        (previous,), *_ = pipe.execute()
+        return (previous[1], previous[0]) if previous else None
+
+    def remove(self, driver_id: int) -> Optional[Position]:
+        pipe = self.client.pipeline()
+        pipe.geopos(self.GEO_KEY, driver_id)
+        pipe.zrem(self.GEO_KEY, driver_id)
+        pipe.hdel(self.PROFILES_KEY, str(driver_id))
+        (previous,), removed, _ = pipe.execute()
+        if not removed:
+            return None
+        self.client.incr(self.VERSION_KEY)
+        return (previous[1], previous[0]) if previous else None
+
+    def search(
+        self, latitude: float, longitude: float, radius_km: float, limit: int
+    ) -> List[AvailableDriver]:
+        matches = self.client.geosearch(
+            self.GEO_KEY,
+            longitude=longitude,
+            latitude=latitude,
+            radius=radius_km,
+            unit="km",
+            sort="ASC",
+            count=limit,
+            withdist=True,
+            withcoord=True,
+        )
+        if not matches:
+            return []
+
+        profiles = self.client.hmget(
+            self.PROFILES_KEY, [member for member, _, _ in matches]
+        )
+        return [
+            AvailableDriver(
+                id=int(member),
+                latitude=lat,
+                longitude=lon,
+                distance_km=distance_km,
+                **(json.loads(profile) if profile else {}),
+            )
+            for (member, distance_km, (lon, lat)), profile in zip(matches, profiles)
+        ]
+
+    def within_box(
+        self, min_lat: float, max_lat: float, min_lon: float, max_lon: float
+    ) -> List[AvailableDriver]:
+        # GEOSEARCH boxes are sized in km around a center; search one wide
+        # enough at its widest latitude and keep the matches inside the box.
+        # No member lies outside the GEO latitude range, so clamp to it.
+        min_lat = max(min_lat, -MAX_GEO_LATITUDE)
+        max_lat = min(max_lat, MAX_GEO_LATITUDE)
+        widest_lat = 0.0 if min_lat <= 0 <= max_lat else min(abs(min_lat), abs(max_lat))
+        matches = self.client.geosearch(
+            self.GEO_KEY,
+            longitude=(min_lon + max_lon) / 2,
+            latitude=(min_lat + max_lat) / 2,
+            width=(max_lon - min_lon)
+            * KM_PER_DEGREE
+            * math.cos(math.radians(widest_lat)),
+            height=(max_lat - min_lat) * KM_PER_DEGREE,
+            unit="km",
+            withcoord=True,
+        )
+        matches = [
+            (member, lat, lon)
+            for member, (lon, lat) in matches
+            if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+        ]
+        if not matches:
+            return []
+
+        profiles = self.client.hmget(
+            self.PROFILES_KEY, [member for member, _, _ in matches]
+        )
+        return [
+            AvailableDriver(
+                id=int(member),
+                latitude=lat,
+                longitude=lon,
+                distance_km=0.0,
+                **(json.loads(profile) if profile else {}),
+            )
+            for (member, lat, lon), profile in zip(matches, profiles)
+        ]
+
+    def driver_ids(self) -> List[int]:
+        return [int(member) for member in self.client.zrange(self.GEO_KEY, 0, -1)]
+
+    def version(self) -> int:
+        return int(self.client.get(self.VERSION_KEY) or 0)
+
+    def replace(
+        self, entries: Iterable[AvailabilityEntry], rebuild_seconds: float = 0.0
+    ) -> None:
+        pipe = self.client.pipeline(transaction=True)
+        pipe.delete(self.GEO_KEY, self.PROFILES_KEY)
+        for driver_id, latitude, longitude, profile in entries:
+            pipe.geoadd(self.GEO_KEY, (longitude, latitude, driver_id))
+            pipe.hset(self.PROFILES_KEY, str(driver_id), json.dumps(profile))
+        pipe.set(
+            self.LOADED_KEY, rebuild_seconds, ex=settings.DRIVER_INDEX_REFRESH_SECONDS
+        )
+        pipe.incr(self.VERSION_KEY)
+        pipe.execute()
+
+    def load_state(self) -> Optional[LoadState]:
+        pipe = self.client.pipeline(transaction=False)
+        pipe.pttl(self.LOADED_KEY)
+        pipe.get(self.LOADED_KEY)
+        ttl_ms, rebuild_seconds = pipe.execute()
+        if rebuild_seconds is None or ttl_ms <= 0:
+            return None
+        return LoadState(ttl_ms / 1000, float(rebuild_seconds))
+
+    def clear(self) -> None:
+        # The version survives so that it never repeats.
+        pipe = self.client.pipeline()
+        pipe.delete(self.GEO_KEY, self.PROFILES_KEY, self.LOADED_KEY)
+        pipe.incr(self.VERSION_KEY)
+        pipe.execute()
+
+
+@lru_cache(maxsize=None)
+def get_availability_backend() -> BaseAvailabilityBackend:
+    return import_string(settings.DRIVER_AVAILABILITY_BACKEND)()
@@ -0,0 +1,155 @@
+import json
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import Any, Dict, Final, NamedTuple, Optional, Tuple
+
+import redis
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .notifications import DRIVER_ADDED, DRIVER_MOVED, DriverChanges
+
+
+class TickStats(NamedTuple):
+    changes_in: int
+    frames_out: int
+    bytes_out: int
+
+
+def merge_change(
+    current: Optional[Dict[str, Any]], change: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    The one change that stands for ``current`` followed by ``change``: the
+    later change wins, except that a move keeps a pending add an add.
+    """
+    if (
+        current
+        and current["action"] == DRIVER_ADDED
+        and change["action"] == DRIVER_MOVED
+    ):
+        return {
+            **current,
+            "latitude": change["latitude"],
+            "longitude": change["longitude"],
+        }
+    return change
+
+
+class BaseBroadcastBuffer:
+    """
+    Collects driver changes between broadcast ticks, keeping only the latest
+    change per driver in each group.
+    """
+
+    def push(self, changes: DriverChanges) -> None:
+        raise NotImplementedError
+
+    def drain(self) -> Tuple[DriverChanges, int]:
+        """
+        Takes the merged changes per group and how many changes were pushed
+        since the previous drain.
+        """
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class InMemoryBroadcastBuffer(BaseBroadcastBuffer):
+    def __init__(self) -> None:
+        self._pending: Dict[str, Dict[int, Dict[str, Any]]] = defaultdict(dict)
+        self._pushed = 0
+        self._lock = threading.Lock()
+
+    def push(self, changes: DriverChanges) -> None:
+        with self._lock:
+            for group, group_changes in changes.items():
+                pending = self._pending[group]
+                for change in group_changes:
+                    pending[change["id"]] = merge_change(
+                        pending.get(change["id"]), change
+                    )
+                    self._pushed += 1
+
+    def drain(self) -> Tuple[DriverChanges, int]:
+        with self._lock:
+            drained = {
+                group: list(pending.values())
+                for group, pending in self._pending.items()
+            }
+            pushed = self._pushed
+            self._pending.clear()
+            self._pushed = 0
+            return drained, pushed
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+            self._pushed = 0
+
+
+class RedisBroadcastBuffer(BaseBroadcastBuffer):
+    """
+    Shared buffer so that one broadcaster merges the changes of every web
+    process: a hash from "<group>|<driver id>" to the pending change, merged
+    by a script, and a counter of pushed changes.
+    """
+
+    PENDING_KEY: Final[str] = "driver_broadcasts:pending"
+    PUSHED_KEY: Final[str] = "driver_broadcasts:pushed"
+
+    PUSH_SCRIPT = """
+        for i = 1, #ARGV, 2 do
+            local change = ARGV[i + 1]
+            local current = redis.call('HGET', KEYS[1], ARGV[i])
+            if current then
+                local pending = cjson.decode(current)
+                local decoded = cjson.decode(change)
+                if pending['action'] == 'added' and decoded['action'] == 'moved' then
+                    pending['latitude'] = decoded['latitude']
+                    pending['longitude'] = decoded['longitude']
+                    change = cjson.encode(pending)
+                end
+            end
+            redis.call('HSET', KEYS[1], ARGV[i], change)
+        end
+        redis.call('INCRBY', KEYS[2], #ARGV / 2)
+    """
+
+    DRAIN_SCRIPT = """
+        local pending = redis.call('HGETALL', KEYS[1])
+        local pushed = redis.call('GET', KEYS[2]) or 0
+        redis.call('DEL', KEYS[1], KEYS[2])
+        return {pushed, pending}
+    """
+
+    def __init__(self, client: Optional[redis.Redis] = None) -> None:
+        self.client = client or redis.Redis.from_url(settings.REDIS_URL)
+        self._push = self.client.register_script(self.PUSH_SCRIPT)
+        self._drain = self.client.register_script(self.DRAIN_SCRIPT)
+
+    def push(self, changes: DriverChanges) -> None:
+        args = []
+        for group, group_changes in changes.items():
+            for change in group_changes:
+                args += [f"{group}|{change['id']}", json.dumps(change)]
+        if args:
+            self._push(keys=[self.PENDING_KEY, self.PUSHED_KEY], args=args)
+
+    def drain(self) -> Tuple[DriverChanges, int]:
+        pushed, pending = self._drain(keys=[self.PENDING_KEY, self.PUSHED_KEY])
+        drained: DriverChanges = defaultdict(list)
+        for field, change in zip(pending[::2], pending[1::2]):
+            group, _ = field.decode().split("|")
+            drained[group].append(json.loads(change))
+        return dict(drained), int(pushed)
+
+    def clear(self) -> None:
+        self.client.delete(self.PENDING_KEY, self.PUSHED_KEY)
+
+
+@lru_cache(maxsize=None)
+def get_broadcast_buffer() -> BaseBroadcastBuffer:
+    return import_string(settings.DRIVER_BROADCAST_BUFFER_BACKEND)()
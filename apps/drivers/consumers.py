@@ -1,45 +1,226 @@
-import json
+from urllib.parse import parse_qs
 
+import redis
 from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.utils import timezone
 
-from .serializers import AvailableDriverSerializer
+from apps.users.models import User
+
+from .geo import format_coordinate
+from .notifications import AVAILABLE_DRIVERS_GROUP, tile_group_name
+from .serializers import DriverSubscriptionSerializer, LocationSampleSerializer
 from .services import DriverService
+from .wire import WireFormatError, negotiate_codec
 
 
-class AvailableDriversConsumer(AsyncWebsocketConsumer):
-    async def connect(self):
-        self.room_group_name = "available_drivers"
+class CodecConsumerMixin:
+    """
+    Speaks JSON text frames by default, or the binary MessagePack format
+    when the client offers its subprotocol at connect.
+    """
 
-        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+    async def accept_with_codec(self):
+        self.codec = negotiate_codec(self.scope.get("subprotocols", []))
+        await self.accept(subprotocol=self.codec.subprotocol)
 
-        await self.accept()
+    async def send_json(self, content):
+        await self.send(**self.codec.encode(content))
 
-        drivers = await self.get_available_drivers()
-        await self.send(
-            text_data=json.dumps({"type": "driver_list", "drivers": drivers})
-        )
+    async def send_frames(self, frames):
+        """
+        Forwards the frame for this socket's codec from a group message
+        encoded once by ``encode_frames``.
+        """
+        await self.send(**frames[self.codec.name])
+
+    async def receive_message(self, text_data, bytes_data):
+        """
+        Decodes a frame into a dict, or replies with an error and returns None.
+        """
+        try:
+            data = self.codec.decode(text_data, bytes_data)
+        except WireFormatError as exc:
+            await self.send_json({"type": "error", "errors": str(exc)})
+            return None
+        return data if isinstance(data, dict) else {}
+
+
+class GroupsConsumerMixin:
+    """
+    Tracks the channel layer groups the socket is in; set ``joined_groups``
+    to an empty set on connect.
+    """
+
+    async def join_groups(self, groups):
+        """
+        Moves the socket from the groups it is in to ``groups``.
+        """
+        for group in self.joined_groups - groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        for group in groups - self.joined_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        self.joined_groups = groups
+
+
+class AvailableDriversConsumer(
+    GroupsConsumerMixin, CodecConsumerMixin, AsyncWebsocketConsumer
+):
+    """
+    Streams the available drivers: the whole list and every change by
+    default, or only the drivers inside a viewport once the client
+    subscribes to it, with ``?bbox=``/``?tiles=`` at connect or a
+    ``subscribe`` message.
+    """
+
+    async def connect(self):
+        self.room_group_name = AVAILABLE_DRIVERS_GROUP
+        self.joined_groups = set()
+        self.tiles = []
+
+        await self.accept_with_codec()
+
+        if subscription := self.query_subscription():
+            await self.subscribe(subscription)
+        else:
+            await self.join_groups({self.room_group_name})
+            await self.send_driver_list()
 
     async def disconnect(self, close_code):
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        await self.join_groups(set())
 
-    async def receive(self, text_data):
-        data = json.loads(text_data)
+    async def receive(self, text_data=None, bytes_data=None):
+        data = await self.receive_message(text_data, bytes_data)
+        if data is None:
+            return
         message_type = data.get("type")
 
         if message_type == "get_drivers":
-            drivers = await self.get_available_drivers()
-            await self.send(
-                text_data=json.dumps({"type": "driver_list", "drivers": drivers})
-            )
+            if self.tiles:
+                await self.send_tile_list()
+            else:
+                await self.send_driver_list()
+        elif message_type == "subscribe":
+            await self.subscribe(data)
 
     async def driver_update(self, event):
+        await self.send_json({"type": "driver_update", "drivers": event["drivers"]})
+
+    async def driver_delta(self, event):
+        await self.send_frames(event["frames"])
+
+    async def send_driver_list(self):
+        rendered = await database_sync_to_async(
+            DriverService.get_rendered_available_drivers
+        )()
         await self.send(
-            text_data=json.dumps({"type": "driver_update", "drivers": event["drivers"]})
+            **self.codec.encode_rendered(
+                {"type": "driver_list"}, "drivers", rendered.content
+            )
+        )
+
+    async def subscribe(self, data):
+        serializer = DriverSubscriptionSerializer(data=data)
+        if not serializer.is_valid():
+            await self.send_json({"type": "error", "errors": serializer.errors})
+            if not self.joined_groups:
+                await self.join_groups({self.room_group_name})
+                await self.send_driver_list()
+            return
+
+        self.tiles = serializer.validated_data["tiles"]
+        await self.join_groups({tile_group_name(tile) for tile in self.tiles})
+        await self.send_tile_list()
+
+    async def send_tile_list(self):
+        try:
+            drivers = await database_sync_to_async(
+                DriverService.get_available_drivers_in_tiles
+            )(self.tiles)
+        except redis.RedisError:
+            await self.send_json(
+                {"type": "error", "errors": "Available drivers could not be loaded"}
+            )
+            return
+        await self.send_json(
+            {"type": "driver_list", "tiles": self.tiles, "drivers": drivers}
+        )
+
+    def query_subscription(self):
+        params = parse_qs(self.scope.get("query_string", b"").decode())
+        return {
+            key: params[key][0].split(",") for key in ("bbox", "tiles") if key in params
+        }
+
+
+class DriverTelemetryConsumer(CodecConsumerMixin, AsyncWebsocketConsumer):
+    """
+    One long-lived socket per driver for location, online/offline and
+    heartbeat messages. The driver is reloaded from the driver cache before
+    each message, since other processes change its online/busy flags (an
+    order claiming it) and invalidate the cached entry when they do.
+    """
+
+    async def connect(self):
+        user = self.scope.get("user")
+        if (
+            not user
+            or not user.is_authenticated
+            or user.user_type != User.UserType.DRIVER
+        ):
+            await self.close(code=4403)
+            return
+
+        await self.load_driver()
+        await self.accept_with_codec()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        data = await self.receive_message(text_data, bytes_data)
+        if data is None:
+            return
+        message_type = data.get("type")
+        await self.load_driver()
+
+        if message_type == "location":
+            await self.handle_location(data)
+        elif message_type == "online":
+            await self.send_status(DriverService.set_driver_online)
+        elif message_type == "offline":
+            await self.send_status(DriverService.set_driver_offline)
+        elif message_type == "heartbeat":
+            await self.send_json(
+                {"type": "heartbeat", "server_time": timezone.now().isoformat()}
+            )
+        else:
+            await self.send_json(
+                {"type": "error", "errors": f"Unknown message type: {message_type}"}
+            )
+
+    async def load_driver(self):
+        self.driver = await database_sync_to_async(DriverService.get_or_create_driver)(
+            self.scope["user"]
+        )
+
+    async def handle_location(self, data):
+        data.setdefault("recorded_at", timezone.now())
+        serializer = LocationSampleSerializer(data=data)
+        if not serializer.is_valid():
+            await self.send_json({"type": "error", "errors": serializer.errors})
+            return
+
+        location = await database_sync_to_async(DriverService.buffer_driver_locations)(
+            self.driver, [serializer.validated_data]
+        )
+        await self.send_json(
+            {
+                "type": "location",
+                "accepted": location is not None,
+                "latitude": format_coordinate(self.driver.latitude),
+                "longitude": format_coordinate(self.driver.longitude),
+            }
         )
 
-    @database_sync_to_async
-    def get_available_drivers(self):
-        drivers = DriverService.get_available_drivers()
-        serializer = AvailableDriverSerializer(drivers, many=True)
-        return serializer.data
+    async def send_status(self, transition):
+        await database_sync_to_async(transition)(self.driver)
+        status = DriverService.get_driver_status(self.driver)
+        await self.send_json({"type": "status", **status})
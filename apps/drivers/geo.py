@@ -0,0 +1,148 @@
+import math
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Final, Iterable, List, Optional, Tuple, Union
+
+EARTH_RADIUS_KM: Final[float] = 6371.0088
+KM_PER_DEGREE: Final[float] = math.pi * EARTH_RADIUS_KM / 180
+MICRODEGREES_PER_DEGREE: Final[int] = 1_000_000
+COORDINATE_DECIMAL_PLACES: Final[int] = 6
+# Redis GEO commands reject latitudes beyond this (the Web Mercator limit).
+MAX_GEO_LATITUDE: Final[float] = 85.05112878
+
+# Stored coordinates are Decimals; parsed and buffered ones are rounded floats.
+Coordinate = Union[float, Decimal]
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = (
+        math.sin(d_phi / 2) ** 2
+        + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(
+    latitude: float, longitude: float, radius_km: float
+) -> Tuple[float, float, float, float]:
+    """
+    Returns (min_lat, max_lat, min_lon, max_lon) enclosing the given radius.
+    Longitudes are clamped rather than wrapped around the antimeridian.
+    """
+    lat_delta = radius_km / KM_PER_DEGREE
+    min_lat = max(-90.0, latitude - lat_delta)
+    max_lat = min(90.0, latitude + lat_delta)
+
+    cos_lat = math.cos(math.radians(max(abs(min_lat), abs(max_lat))))
+    if cos_lat <= 1e-12:
+        return min_lat, max_lat, -180.0, 180.0
+
+    lon_delta = radius_km / (KM_PER_DEGREE * cos_lat)
+    return (
+        min_lat,
+        max_lat,
+        max(-180.0, longitude - lon_delta),
+        min(180.0, longitude + lon_delta),
+    )
+
+
+def haversine_many_km(
+    latitude: float,
+    longitude: float,
+    phis: Iterable[float],
+    lambdas: Iterable[float],
+    cos_phis: Iterable[float],
+) -> List[float]:
+    """
+    Distances from one point to many points given in radians together with
+    the cosine of their latitude, so per-point trigonometry is paid once.
+    """
+    phi1 = math.radians(latitude)
+    lambda1 = math.radians(longitude)
+    cos_phi1 = math.cos(phi1)
+    sin, asin, sqrt = math.sin, math.asin, math.sqrt
+    diameter = 2 * EARTH_RADIUS_KM
+    return [
+        diameter
+        * asin(
+            min(
+                1.0,
+                sqrt(
+                    sin((phi2 - phi1) * 0.5) ** 2
+                    + cos_phi1 * cos_phi2 * sin((lambda2 - lambda1) * 0.5) ** 2
+                ),
+            )
+        )
+        for phi2, lambda2, cos_phi2 in zip(phis, lambdas, cos_phis)
+    ]
+
+
+def region_key(latitude: float, longitude: float, size_deg: float) -> int:
+    """
+    Packs the fixed-size lat/lon cell containing a point into one integer,
+    row-major from the south-west corner, so it can be stored and indexed.
+    """
+    row = math.floor((latitude + 90) / size_deg)
+    column = math.floor((longitude + 180) / size_deg)
+    return row * _region_columns(size_deg) + column
+
+
+def region_keys_within(
+    latitude: float, longitude: float, radius_km: float, size_deg: float
+) -> List[int]:
+    return region_keys_in_box(
+        *bounding_box(latitude, longitude, radius_km), size_deg=size_deg
+    )
+
+
+def region_keys_in_box(
+    min_lat: float, max_lat: float, min_lon: float, max_lon: float, size_deg: float
+) -> List[int]:
+    columns = _region_columns(size_deg)
+    return [
+        row * columns + column
+        for row in range(
+            math.floor((min_lat + 90) / size_deg),
+            math.floor((max_lat + 90) / size_deg) + 1,
+        )
+        for column in range(
+            math.floor((min_lon + 180) / size_deg),
+            math.floor((max_lon + 180) / size_deg) + 1,
+        )
+    ]
+
+
+def region_box(key: int, size_deg: float) -> Tuple[float, float, float, float]:
+    """
+    Returns (min_lat, max_lat, min_lon, max_lon) of the cell ``key`` packs.
+    """
+    row, column = divmod(key, _region_columns(size_deg))
+    min_lat = row * size_deg - 90
+    min_lon = column * size_deg - 180
+    return min_lat, min_lat + size_deg, min_lon, min_lon + size_deg
+
+
+def _region_columns(size_deg: float) -> int:
+    return math.ceil(360 / size_deg) + 1
+
+
+def to_microdegrees(value: Coordinate) -> int:
+    if isinstance(value, Decimal):
+        return int((value * MICRODEGREES_PER_DEGREE).to_integral_value(ROUND_HALF_EVEN))
+    return round(float(value) * MICRODEGREES_PER_DEGREE)
+
+
+def from_microdegrees(value: int) -> float:
+    return value / MICRODEGREES_PER_DEGREE
+
+
+def format_coordinate(value: Optional[Coordinate]) -> Optional[str]:
+    """
+    Renders a coordinate the way the API always has, e.g. ``"40.712776"``.
+    """
+    if value is None:
+        return None
+    return f"{value:.{COORDINATE_DECIMAL_PLACES}f}"
@@ -0,0 +1,228 @@
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, Final, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import redis
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .geo import Coordinate, format_coordinate
+
+
+class BufferedLocation(NamedTuple):
+    latitude: Coordinate
+    longitude: Coordinate
+    recorded_at: float
+
+    def encode(self) -> str:
+        return (
+            f"{format_coordinate(self.latitude)},"
+            f"{format_coordinate(self.longitude)},{self.recorded_at!r}"
+        )
+
+    @classmethod
+    def decode(cls, value: bytes) -> "BufferedLocation":
+        latitude, longitude, recorded_at = value.decode().split(",")
+        return cls(float(latitude), float(longitude), float(recorded_at))
+
+
+class BaseLocationBuffer:
+    """
+    Write-behind buffer holding the latest reported position of each driver
+    until it is flushed, upserted in bulk into ``driver_locations``.
+    """
+
+    def put(self, driver_id: int, location: BufferedLocation) -> bool:
+        """
+        Stores the location unless a later sample is already buffered.
+        """
+        raise NotImplementedError
+
+    def get_many(self, driver_ids: Iterable[int]) -> Dict[int, BufferedLocation]:
+        raise NotImplementedError
+
+    def drain(self) -> Dict[int, BufferedLocation]:
+        """
+        Takes the locations that changed since the previous drain.
+        """
+        raise NotImplementedError
+
+    def discard(self, driver_id: int) -> None:
+        raise NotImplementedError
+
+    def append_history(
+        self, driver_id: int, locations: Iterable[BufferedLocation]
+    ) -> None:
+        """
+        Queues every sample, in order, for the location history, dropping
+        the oldest ones past ``DRIVER_LOCATION_HISTORY_MAX_ITEMS``.
+        """
+        raise NotImplementedError
+
+    def drain_history(self, max_items: int) -> List[Tuple[int, BufferedLocation]]:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class InMemoryLocationBuffer(BaseLocationBuffer):
+    def __init__(self) -> None:
+        self._latest: Dict[int, BufferedLocation] = {}
+        self._dirty: Set[int] = set()
+        self._history: Deque[Tuple[int, BufferedLocation]] = deque(
+            maxlen=settings.DRIVER_LOCATION_HISTORY_MAX_ITEMS
+        )
+        self._lock = threading.Lock()
+
+    def put(self, driver_id: int, location: BufferedLocation) -> bool:
+        with self._lock:
+            current = self._latest.get(driver_id)
+            if current and current.recorded_at >= location.recorded_at:
+                return False
+            self._latest[driver_id] = location
+            self._dirty.add(driver_id)
+            return True
+
+    def get_many(self, driver_ids: Iterable[int]) -> Dict[int, BufferedLocation]:
+        with self._lock:
+            return {
+                driver_id: self._latest[driver_id]
+                for driver_id in driver_ids
+                if driver_id in self._latest
+            }
+
+    def drain(self) -> Dict[int, BufferedLocation]:
+        with self._lock:
+            drained = {driver_id: self._latest[driver_id] for driver_id in self._dirty}
+            self._dirty.clear()
+            return drained
+
+    def discard(self, driver_id: int) -> None:
+        with self._lock:
+            self._latest.pop(driver_id, None)
+            self._dirty.discard(driver_id)
+
+    def append_history(
+        self, driver_id: int, locations: Iterable[BufferedLocation]
+    ) -> None:
+        with self._lock:
+            self._history.extend((driver_id, location) for location in locations)
+
+    def drain_history(self, max_items: int) -> List[Tuple[int, BufferedLocation]]:
+        with self._lock:
+            return [
+                self._history.popleft()
+                for _ in range(min(max_items, len(self._history)))
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._latest.clear()
+            self._dirty.clear()
+            self._history.clear()
+
+
+class RedisLocationBuffer(BaseLocationBuffer):
+    """
+    Shared buffer: every process reads the latest positions from one hash,
+    and changed ones are copied to a pending hash that a flusher renames away
+    and reads, so samples arriving mid-flush land in the next round.
+    """
+
+    LATEST_KEY: Final[str] = "driver_locations:latest"
+    PENDING_KEY: Final[str] = "driver_locations:pending"
+    FLUSHING_KEY: Final[str] = "driver_locations:flushing"
+    HISTORY_KEY: Final[str] = "driver_locations:history"
+
+    PUT_SCRIPT = """
+        local current = redis.call('HGET', KEYS[1], ARGV[1])
+        if current then
+            local recorded_at = tonumber(string.match(current, '[^,]+$'))
+            if recorded_at >= tonumber(ARGV[3]) then
+                return 0
+            end
+        end
+        redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+        redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+        return 1
+    """
+
+    def __init__(self, client: Optional[redis.Redis] = None) -> None:
+        self.client = client or redis.Redis.from_url(settings.REDIS_URL)
+        self._put = self.client.register_script(self.PUT_SCRIPT)
+        self.history_max_items = settings.DRIVER_LOCATION_HISTORY_MAX_ITEMS
+
+    def put(self, driver_id: int, location: BufferedLocation) -> bool:
+        return bool(
+            self._put(
+                keys=[self.LATEST_KEY, self.PENDING_KEY],
+                args=[driver_id, location.encode(), location.recorded_at],
+            )
+        )
+
+    def get_many(self, driver_ids: Iterable[int]) -> Dict[int, BufferedLocation]:
+        driver_ids = list(driver_ids)
+        if not driver_ids:
+            return {}
+        values = self.client.hmget(self.LATEST_KEY, driver_ids)
+        return {
+            driver_id: BufferedLocation.decode(value)
+            for driver_id, value in zip(driver_ids, values)
+            if value is not None
+        }
+
+    def drain(self) -> Dict[int, BufferedLocation]:
+        # A flushing hash left behind by a crashed flusher is drained first.
+        if not self.client.exists(self.FLUSHING_KEY):
+            try:
+                self.client.rename(self.PENDING_KEY, self.FLUSHING_KEY)
+            except redis.ResponseError:
+                return {}
+
+        pipe = self.client.pipeline(transaction=True)
+        pipe.hgetall(self.FLUSHING_KEY)
+        pipe.delete(self.FLUSHING_KEY)
+        drained, _ = pipe.execute()
+        return {
+            int(driver_id): BufferedLocation.decode(value)
+            for driver_id, value in drained.items()
+        }
+
+    def discard(self, driver_id: int) -> None:
+        pipe = self.client.pipeline()
+        pipe.hdel(self.LATEST_KEY, driver_id)
+        pipe.hdel(self.PENDING_KEY, driver_id)
+        pipe.execute()
+
+    def append_history(
+        self, driver_id: int, locations: Iterable[BufferedLocation]
+    ) -> None:
+        if values := [f"{driver_id},{location.encode()}" for location in locations]:
+            pipe = self.client.pipeline(transaction=True)
+            pipe.rpush(self.HISTORY_KEY, *values)
+            pipe.ltrim(self.HISTORY_KEY, -self.history_max_items, -1)
+            pipe.execute()
+
+    def drain_history(self, max_items: int) -> List[Tuple[int, BufferedLocation]]:
+        pipe = self.client.pipeline(transaction=True)
+        pipe.lrange(self.HISTORY_KEY, 0, max_items - 1)
+        pipe.ltrim(self.HISTORY_KEY, max_items, -1)
+        values, _ = pipe.execute()
+
+        drained = []
+        for value in values:
+            driver_id, location = value.split(b",", 1)
+            drained.append((int(driver_id), BufferedLocation.decode(location)))
+        return drained
+
+    def clear(self) -> None:
+        self.client.delete(
+            self.LATEST_KEY, self.PENDING_KEY, self.FLUSHING_KEY, self.HISTORY_KEY
+        )
+
+
+@lru_cache(maxsize=None)
+def get_location_buffer() -> BaseLocationBuffer:
+    return import_string(settings.DRIVER_LOCATION_BUFFER_BACKEND)()
@@ -0,0 +1,76 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.drivers.wire import CODECS, encode_frames
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures the CPU time a worker spends encoding one driver_delta "
+        "broadcast as the number of subscribed sockets grows, encoding per "
+        "socket vs. once per group message. No database needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--subscribers", type=int, nargs="+", default=[1, 100, 1_000, 20_000]
+        )
+        parser.add_argument("--changes", type=int, default=50)
+        parser.add_argument(
+            "--msgpack-share",
+            type=float,
+            default=0.5,
+            help="Fraction of sockets speaking MessagePack",
+        )
+        parser.add_argument("--repeat", type=int, default=5)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        content = {
+            "type": "driver_delta",
+            "changes": [
+                {
+                    "action": "moved",
+                    "id": i + 1,
+                    "latitude": f"{41.311081 + rng.uniform(-0.2, 0.2):.6f}",
+                    "longitude": f"{69.240562 + rng.uniform(-0.2, 0.2):.6f}",
+                }
+                for i in range(options["changes"])
+            ],
+        }
+        json_codec, msgpack_codec = CODECS
+
+        self.stdout.write(
+            f"{'subscribers':>11} {'per socket ms':>14} {'encode once ms':>15} "
+            f"{'speedup':>8}"
+        )
+        for subscribers in options["subscribers"]:
+            msgpack_sockets = round(subscribers * options["msgpack_share"])
+            codecs = [msgpack_codec] * msgpack_sockets + [json_codec] * (
+                subscribers - msgpack_sockets
+            )
+
+            def per_socket():
+                for codec in codecs:
+                    codec.encode(content)
+
+            def encode_once():
+                frames = encode_frames(content)
+                for codec in codecs:
+                    frames[codec.name]
+
+            per_socket_ms = self._time(per_socket, options["repeat"])
+            encode_once_ms = self._time(encode_once, options["repeat"])
+            self.stdout.write(
+                f"{subscribers:>11} {per_socket_ms:>14.3f} {encode_once_ms:>15.3f} "
+                f"{per_socket_ms / encode_once_ms:>7.1f}x"
+            )
+
+    def _time(self, func, repeat):
+        started = time.process_time()
+        for _ in range(repeat):
+            func()
+        return (time.process_time() - started) / repeat * 1_000
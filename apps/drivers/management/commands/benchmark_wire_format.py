@@ -0,0 +1,82 @@
+import random
+import time
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from apps.drivers.models import Driver
+from apps.drivers.serializers import AvailableDriverSerializer
+from apps.drivers.wire import JsonCodec, MsgpackCodec
+from apps.users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares frame size and encode/decode time of the JSON and MessagePack "
+        "WebSocket formats for driver lists and location pings. No database needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--sizes", type=int, nargs="+", default=[1, 100, 1_000])
+        parser.add_argument("--repeat", type=int, default=200)
+        parser.add_argument("--latitude", type=float, default=41.311081)
+        parser.add_argument("--longitude", type=float, default=69.240562)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        latitude, longitude = options["latitude"], options["longitude"]
+        codecs = {"json": JsonCodec(), "msgpack": MsgpackCodec()}
+
+        frames = {
+            "location": {
+                "type": "location",
+                "latitude": Decimal(f"{latitude:.6f}"),
+                "longitude": Decimal(f"{longitude:.6f}"),
+                "recorded_at": datetime.now(timezone.utc),
+            }
+        }
+        for size in options["sizes"]:
+            drivers = []
+            for i in range(size):
+                driver = Driver(
+                    id=i + 1,
+                    user=User(username=f"driver_{i}", phone_number="+998901234567"),
+                    vehicle_number=f"01A{i:03d}BC",
+                    vehicle_model="Chevrolet Cobalt",
+                )
+                driver.latitude = Decimal(f"{latitude + rng.uniform(-0.2, 0.2):.6f}")
+                driver.longitude = Decimal(f"{longitude + rng.uniform(-0.2, 0.2):.6f}")
+                drivers.append(driver)
+            frames[f"drivers x{size}"] = {
+                "type": "driver_list",
+                "drivers": AvailableDriverSerializer(drivers, many=True).data,
+            }
+
+        self.stdout.write(
+            f"{'frame':<16} {'format':<8} {'bytes':>9} {'encode us':>10} "
+            f"{'decode us':>10}"
+        )
+        for name, content in frames.items():
+            for codec_name, codec in codecs.items():
+                encoded = codec.encode(content)
+                payload = encoded.get("bytes_data") or encoded["text_data"]
+                size = len(payload if isinstance(payload, bytes) else payload.encode())
+                encode_us = self._time(lambda: codec.encode(content), options["repeat"])
+                decode_us = self._time(
+                    lambda: codec.decode(
+                        encoded.get("text_data"), encoded.get("bytes_data")
+                    ),
+                    options["repeat"],
+                )
+                self.stdout.write(
+                    f"{name:<16} {codec_name:<8} {size:>9} {encode_us:>10.1f} "
+                    f"{decode_us:>10.1f}"
+                )
+
+    def _time(self, func, repeat):
+        started = time.perf_counter()
+        for _ in range(repeat):
+            func()
+        return (time.perf_counter() - started) / repeat * 1_000_000
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from apps.common.metrics import get_counters, reset_counters
+from apps.drivers.metrics import (
+    LOCATION_PING_COUNTERS,
+    PINGS_ACCEPTED,
+    PINGS_PERSISTED,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Shows how many location pings were accepted, coalesced and persisted, "
+        "to tune the location dead-band against database write volume."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Zero the counters afterwards"
+        )
+
+    def handle(self, *args, **options):
+        counters = get_counters(LOCATION_PING_COUNTERS)
+        for name, value in counters.items():
+            self.stdout.write(f"{name.split(':')[-1]:<12} {value:>10}")
+
+        if accepted := counters[PINGS_ACCEPTED]:
+            self.stdout.write(
+                f"{'write ratio':<12} {counters[PINGS_PERSISTED] / accepted:>10.1%}"
+            )
+
+        if options["reset"]:
+            reset_counters(LOCATION_PING_COUNTERS)
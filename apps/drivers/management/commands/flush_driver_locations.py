@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.drivers.services import DriverService, LocationHistoryService
+
+
+class Command(BaseCommand):
+    help = (
+        "Upserts driver positions buffered by the batch location endpoint into "
+        "driver_locations in bulk, and appends queued samples to the "
+        "location history, once per interval."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=settings.DRIVER_LOCATION_FLUSH_SECONDS,
+            help="Seconds between flushes",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Flush once and exit",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            if flushed := DriverService.flush_buffered_locations():
+                self.stdout.write(f"Flushed {flushed} driver locations")
+            if appended := LocationHistoryService.flush_history():
+                self.stdout.write(f"Appended {appended} location history samples")
+
+            if options["once"]:
+                return
+
+            close_old_connections()
+            time.sleep(max(0.0, options["interval"] - (time.monotonic() - started)))
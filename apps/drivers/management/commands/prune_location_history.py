@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from apps.drivers.services import LocationHistoryService
+
+
+class Command(BaseCommand):
+    help = "Deletes location history older than the retention window, a day at a time."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=30, help="Days of history to keep"
+        )
+
+    def handle(self, *args, **options):
+        deleted = LocationHistoryService.prune_history(options["days"])
+        self.stdout.write(f"Deleted {deleted} location history samples")
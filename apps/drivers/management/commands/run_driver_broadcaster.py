@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.drivers.services import DriverService
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends the driver changes queued when DRIVER_BROADCAST_TICK_MS is set "
+        "as one merged frame per group per tick. Run one broadcaster."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tick-ms",
+            type=int,
+            default=settings.DRIVER_BROADCAST_TICK_MS or 250,
+            help="Milliseconds between broadcasts",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Broadcast once and exit",
+        )
+
+    def handle(self, *args, **options):
+        tick_seconds = options["tick_ms"] / 1000
+        while True:
+            started = time.monotonic()
+            stats = DriverService.broadcast_driver_changes()
+            if stats.frames_out and options["verbosity"] > 1:
+                self.stdout.write(
+                    f"changes in {stats.changes_in}, frames out "
+                    f"{stats.frames_out}, bytes out {stats.bytes_out}"
+                )
+
+            if options["once"]:
+                return
+
+            time.sleep(max(0.0, tick_seconds - (time.monotonic() - started)))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from apps.drivers import services  # noqa: F401
+from apps.common.caching import TIER_STATS, get_tier_stats
+from apps.common.metrics import reset_counters
+from apps.users import backends  # noqa: F401
+
+
+class Command(BaseCommand):
+    help = (
+        "Shows hits and misses of the local and shared tier of each tiered "
+        "cache; local hits are reads that never reached Redis."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Zero the counters afterwards"
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'cache':<18} {'local hits':>11} {'local miss':>11} "
+            f"{'shared hits':>12} {'shared miss':>12} {'local rate':>11}"
+        )
+        stats = get_tier_stats()
+        for name, counts in stats.items():
+            lookups = counts["local_hits"] + counts["local_misses"]
+            rate = counts["local_hits"] / lookups if lookups else 0.0
+            self.stdout.write(
+                f"{name:<18} {counts['local_hits']:>11} {counts['local_misses']:>11} "
+                f"{counts['shared_hits']:>12} {counts['shared_misses']:>12} "
+                f"{rate:>11.1%}"
+            )
+
+        if options["reset"]:
+            reset_counters(
+                f"tiered_cache:{name}:{stat}" for name in stats for stat in TIER_STATS
+            )
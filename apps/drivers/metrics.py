@@ -0,0 +1,23 @@
+from typing import Final, Tuple
+
+# Pings received, pings not written on the request path, and driver rows
+# written, whether directly or by the location flush.
+PINGS_ACCEPTED: Final[str] = "location_pings:accepted"
+PINGS_COALESCED: Final[str] = "location_pings:coalesced"
+PINGS_PERSISTED: Final[str] = "location_pings:persisted"
+LOCATION_PING_COUNTERS: Final[Tuple[str, ...]] = (
+    PINGS_ACCEPTED,
+    PINGS_COALESCED,
+    PINGS_PERSISTED,
+)
+
+# Driver changes queued for broadcast, and the merged frames and their bytes
+# sent to the channel layer by the broadcaster.
+BROADCAST_CHANGES_IN: Final[str] = "driver_broadcasts:changes_in"
+BROADCAST_FRAMES_OUT: Final[str] = "driver_broadcasts:frames_out"
+BROADCAST_BYTES_OUT: Final[str] = "driver_broadcasts:bytes_out"
+DRIVER_BROADCAST_COUNTERS: Final[Tuple[str, ...]] = (
+    BROADCAST_CHANGES_IN,
+    BROADCAST_FRAMES_OUT,
+    BROADCAST_BYTES_OUT,
+)
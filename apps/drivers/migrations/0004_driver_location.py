@@ -0,0 +1,111 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:22
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_locations_forward(apps, schema_editor):
+    Driver = apps.get_model("drivers", "Driver")
+    DriverLocation = apps.get_model("drivers", "DriverLocation")
+    located = Driver.objects.filter(latitude__isnull=False, longitude__isnull=False)
+    DriverLocation.objects.bulk_create(
+        (
+            DriverLocation(driver_id=driver_id, latitude=latitude, longitude=longitude)
+            for driver_id, latitude, longitude in located.values_list(
+                "id", "latitude", "longitude"
+            ).iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+def copy_locations_backward(apps, schema_editor):
+    Driver = apps.get_model("drivers", "Driver")
+    DriverLocation = apps.get_model("drivers", "DriverLocation")
+    for location in DriverLocation.objects.iterator():
+        Driver.objects.filter(pk=location.driver_id).update(
+            latitude=location.latitude, longitude=location.longitude
+        )
+
+
+def tune_fillfactor(apps, schema_editor):
+    # Leave room on each page so a row's new version usually fits beside the
+    # old one, which keeps the constantly rewritten table from bloating.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute("ALTER TABLE driver_locations SET (fillfactor = 70)")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("drivers", "0003_alter_driver_vehicle_model_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="DriverLocation",
+            fields=[
+                (
+                    "driver",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="location",
+                        serialize=False,
+                        to="drivers.driver",
+                    ),
+                ),
+                (
+                    "latitude",
+                    models.DecimalField(
+                        decimal_places=6,
+                        help_text="Driver's current latitude",
+                        max_digits=9,
+                        validators=[
+                            django.core.validators.MinValueValidator(-90),
+                            django.core.validators.MaxValueValidator(90),
+                        ],
+                    ),
+                ),
+                (
+                    "longitude",
+                    models.DecimalField(
+                        decimal_places=6,
+                        help_text="Driver's current longitude",
+                        max_digits=9,
+                        validators=[
+                            django.core.validators.MinValueValidator(-180),
+                            django.core.validators.MaxValueValidator(180),
+                        ],
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Driver location",
+                "verbose_name_plural": "Driver locations",
+                "db_table": "driver_locations",
+            },
+        ),
+        migrations.RunPython(tune_fillfactor, migrations.RunPython.noop),
+        migrations.RunPython(copy_locations_forward, copy_locations_backward),
+        migrations.RemoveIndex(
+            model_name="driver",
+            name="drivers_latitud_cba97b_idx",
+        ),
+        migrations.RemoveField(
+            model_name="driver",
+            name="latitude",
+        ),
+        migrations.RemoveField(
+            model_name="driver",
+            name="longitude",
+        ),
+        migrations.AddIndex(
+            model_name="driverlocation",
+            index=models.Index(
+                fields=["latitude", "longitude"], name="driver_loca_latitud_c634eb_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("drivers", "0004_driver_location"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="LocationSample",
+            fields=[
+                ("id", models.BigAutoField(primary_key=True, serialize=False)),
+                (
+                    "day",
+                    models.IntegerField(help_text="Days since the Unix epoch (UTC)"),
+                ),
+                (
+                    "recorded_at",
+                    models.BigIntegerField(help_text="Unix time in seconds"),
+                ),
+                ("latitude_e6", models.IntegerField()),
+                ("longitude_e6", models.IntegerField()),
+                (
+                    "driver",
+                    models.ForeignKey(
+                        db_constraint=False,
+                        db_index=False,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="drivers.driver",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Location sample",
+                "verbose_name_plural": "Location history",
+                "db_table": "driver_location_history",
+                "indexes": [
+                    models.Index(
+                        fields=["driver", "recorded_at"],
+                        name="driver_loca_driver__cba259_idx",
+                    ),
+                    models.Index(fields=["day"], name="driver_loca_day_63df92_idx"),
+                ],
+            },
+        ),
+    ]
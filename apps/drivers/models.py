@@ -1,8 +1,13 @@
+from decimal import Decimal
+from typing import Optional
+
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
 from apps.users.models import User
 
+from .querysets import DriverManager
+
 
 class Driver(models.Model):
     user = models.OneToOneField(
@@ -12,23 +17,6 @@ class Driver(models.Model):
         limit_choices_to={"user_type": User.UserType.DRIVER},
     )
 
-    latitude = models.DecimalField(
-        max_digits=9,
-        decimal_places=6,
-        validators=[MinValueValidator(-90), MaxValueValidator(90)],
-        null=True,
-        blank=True,
-        help_text="Driver's current latitude",
-    )
-    longitude = models.DecimalField(
-        max_digits=9,
-        decimal_places=6,
-        validators=[MinValueValidator(-180), MaxValueValidator(180)],
-        null=True,
-        blank=True,
-        help_text="Driver's current longitude",
-    )
-
     is_online = models.BooleanField(
         default=False,
         help_text="Whether driver is currently online",
@@ -55,6 +43,10 @@ class Driver(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     last_online_at = models.DateTimeField(null=True, blank=True)
 
+    objects = DriverManager()
+
+    _location_changed = False
+
     class Meta:
         db_table = "drivers"
         verbose_name = "Driver"
@@ -62,7 +54,6 @@ class Driver(models.Model):
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["is_online", "is_busy"]),
-            models.Index(fields=["latitude", "longitude"]),
         ]
 
     def __str__(self) -> str:
@@ -71,3 +62,118 @@ class Driver(models.Model):
     @property
     def is_available(self) -> bool:
         return self.is_online and not self.is_busy
+
+    @property
+    def live_location(self) -> Optional["DriverLocation"]:
+        # An unsaved driver has no stored position to look up.
+        if self._state.adding and not Driver.location.is_cached(self):
+            return None
+        try:
+            return self.location
+        except DriverLocation.DoesNotExist:
+            return None
+
+    @property
+    def latitude(self) -> Optional[Decimal]:
+        location = self.live_location
+        return location.latitude if location else None
+
+    @latitude.setter
+    def latitude(self, value: Optional[Decimal]) -> None:
+        self._editable_location().latitude = value
+
+    @property
+    def longitude(self) -> Optional[Decimal]:
+        location = self.live_location
+        return location.longitude if location else None
+
+    @longitude.setter
+    def longitude(self, value: Optional[Decimal]) -> None:
+        self._editable_location().longitude = value
+
+    def save(self, *args, **kwargs) -> None:
+        """
+        A full save also stores a position assigned through ``latitude`` and
+        ``longitude``; saves with ``update_fields`` never touch it.
+        """
+        super().save(*args, **kwargs)
+        if kwargs.get("update_fields") is None and self._location_changed:
+            location = self.location
+            if location.latitude is not None and location.longitude is not None:
+                location.save()
+            self._location_changed = False
+
+    def _editable_location(self) -> "DriverLocation":
+        if (location := self.live_location) is None:
+            location = DriverLocation(driver=self)
+            self.location = location
+        self._location_changed = True
+        return location
+
+
+class DriverLocation(models.Model):
+    """
+    Live position of a driver. Location pings rewrite only this narrow row
+    instead of the wide ``drivers`` profile row and its indexes.
+    """
+
+    driver = models.OneToOneField(
+        Driver,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="location",
+    )
+    latitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        validators=[MinValueValidator(-90), MaxValueValidator(90)],
+        help_text="Driver's current latitude",
+    )
+    longitude = models.DecimalField(
+        max_digits=9,
+        decimal_places=6,
+        validators=[MinValueValidator(-180), MaxValueValidator(180)],
+        help_text="Driver's current longitude",
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "driver_locations"
+        verbose_name = "Driver location"
+        verbose_name_plural = "Driver locations"
+        indexes = [
+            models.Index(fields=["latitude", "longitude"]),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.driver_id}: {self.latitude}, {self.longitude}"
+
+
+class LocationSample(models.Model):
+    """
+    Append-only trace of reported positions. Rows are bucketed by UTC day so
+    old days can be pruned with one indexed delete, and keep coordinates as
+    integer microdegrees and times as epoch seconds to stay narrow.
+    """
+
+    id = models.BigAutoField(primary_key=True)
+    driver = models.ForeignKey(
+        Driver,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        db_index=False,
+        related_name="+",
+    )
+    day = models.IntegerField(help_text="Days since the Unix epoch (UTC)")
+    recorded_at = models.BigIntegerField(help_text="Unix time in seconds")
+    latitude_e6 = models.IntegerField()
+    longitude_e6 = models.IntegerField()
+
+    class Meta:
+        db_table = "driver_location_history"
+        verbose_name = "Location sample"
+        verbose_name_plural = "Location history"
+        indexes = [
+            models.Index(fields=["driver", "recorded_at"]),
+            models.Index(fields=["day"]),
+        ]
@@ -0,0 +1,123 @@
+from typing import Any, Dict, Final, List, Optional
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.conf import settings
+
+from .availability import Position
+from .geo import format_coordinate, region_key
+from .models import Driver
+from .serializers import AvailableDriverSerializer
+from .wire import JsonCodec, encode_frames
+
+AVAILABLE_DRIVERS_GROUP: Final[str] = "available_drivers"
+TILE_GROUP_PREFIX: Final[str] = "available_drivers.tile."
+DRIVER_POSITION_GROUP_PREFIX: Final[str] = "driver_position."
+
+DRIVER_ADDED: Final[str] = "added"
+DRIVER_MOVED: Final[str] = "moved"
+DRIVER_REMOVED: Final[str] = "removed"
+
+DriverChanges = Dict[str, List[Dict[str, Any]]]
+
+
+def driver_tile(latitude: float, longitude: float) -> int:
+    return region_key(latitude, longitude, settings.DRIVER_TILE_SIZE_DEG)
+
+
+def tile_group_name(tile: int) -> str:
+    return f"{TILE_GROUP_PREFIX}{tile}"
+
+
+def driver_position_group_name(driver_id: int) -> str:
+    return f"{DRIVER_POSITION_GROUP_PREFIX}{driver_id}"
+
+
+def driver_added(driver: Driver) -> Dict[str, Any]:
+    return {"action": DRIVER_ADDED, **AvailableDriverSerializer(driver).data}
+
+
+def driver_moved(driver: Driver) -> Dict[str, Any]:
+    return {
+        "action": DRIVER_MOVED,
+        "id": driver.pk,
+        "latitude": format_coordinate(driver.latitude),
+        "longitude": format_coordinate(driver.longitude),
+    }
+
+
+def driver_removed(driver_id: int) -> Dict[str, Any]:
+    return {"action": DRIVER_REMOVED, "id": driver_id}
+
+
+def driver_changes(
+    driver_id: int, previous: Optional[Position], driver: Optional[Driver] = None
+) -> DriverChanges:
+    """
+    The change per group for a driver that was at ``previous`` (None if it
+    was not available) and is now ``driver`` (None if it no longer is).
+    Tile watchers only hear about drivers in their tiles, so a driver
+    crossing tiles leaves one and is added to the other.
+    """
+    if driver is None:
+        if previous is None:
+            return {}
+        removed = driver_removed(driver_id)
+        return {
+            AVAILABLE_DRIVERS_GROUP: [removed],
+            tile_group_name(driver_tile(*previous)): [removed],
+        }
+
+    new_tile = driver_tile(
+        float(driver.latitude), float(driver.longitude)  # type: ignore[arg-type]
+    )
+    if previous is None:
+        added = driver_added(driver)
+        return {AVAILABLE_DRIVERS_GROUP: [added], tile_group_name(new_tile): [added]}
+
+    moved = driver_moved(driver)
+    old_tile = driver_tile(*previous)
+    if old_tile == new_tile:
+        return {AVAILABLE_DRIVERS_GROUP: [moved], tile_group_name(new_tile): [moved]}
+    return {
+        AVAILABLE_DRIVERS_GROUP: [moved],
+        tile_group_name(old_tile): [driver_removed(driver_id)],
+        tile_group_name(new_tile): [driver_added(driver)],
+    }
+
+
+def publish_driver_changes(changes: DriverChanges) -> int:
+    """
+    Sends each group its ``driver_delta`` frame, encoded once for all of the
+    group's sockets, and returns the size of the JSON frames.
+    """
+    if not changes or not (channel_layer := get_channel_layer()):
+        return 0
+    bytes_out = 0
+    for group, group_changes in changes.items():
+        frames = encode_frames({"type": "driver_delta", "changes": group_changes})
+        bytes_out += len(frames[JsonCodec.name]["text_data"])
+        async_to_sync(channel_layer.group_send)(
+            group, {"type": "driver.delta", "frames": frames}
+        )
+    return bytes_out
+
+
+def driver_position(driver: Driver) -> Dict[str, Any]:
+    return {
+        "type": "driver_position",
+        "driver": driver.pk,
+        "latitude": format_coordinate(driver.latitude),
+        "longitude": format_coordinate(driver.longitude),
+    }
+
+
+def publish_driver_position(position: Dict[str, Any]) -> None:
+    """
+    Sends a busy driver's position to the watchers of their trip.
+    """
+    if channel_layer := get_channel_layer():
+        async_to_sync(channel_layer.group_send)(
+            driver_position_group_name(position["driver"]),
+            {"type": "driver.position", "frames": encode_frames(position)},
+        )
@@ -0,0 +1,101 @@
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+from operator import attrgetter
+from typing import Final, List, Optional
+
+from django.conf import settings
+from django.db import models
+
+from .geo import bounding_box, haversine_km, region_keys_within
+
+COORDINATE_QUANTUM: Final[Decimal] = Decimal("0.000001")
+
+
+class GeoQuerySet(models.QuerySet):
+    """
+    Radius lookups without PostGIS. "Within R km" becomes a bounding-box range
+    on plain latitude/longitude columns (and optionally an ``IN`` over stored
+    region keys) that an ordinary B-tree index can serve, and only the rows
+    inside the box get the exact haversine check.
+    """
+
+    latitude_field: str = "latitude"
+    longitude_field: str = "longitude"
+    region_field: Optional[str] = None
+
+    def within_bounding_box(
+        self, latitude: float, longitude: float, radius_km: float
+    ) -> "GeoQuerySet":
+        latitude, longitude = float(latitude), float(longitude)
+        min_lat, max_lat, min_lon, max_lon = bounding_box(
+            latitude, longitude, radius_km
+        )
+        lookups = {
+            f"{self.latitude_field}__range": (
+                _round_coordinate(min_lat, ROUND_FLOOR),
+                _round_coordinate(max_lat, ROUND_CEILING),
+            ),
+            f"{self.longitude_field}__range": (
+                _round_coordinate(min_lon, ROUND_FLOOR),
+                _round_coordinate(max_lon, ROUND_CEILING),
+            ),
+        }
+        if self.region_field:
+            lookups[f"{self.region_field}__in"] = region_keys_within(
+                latitude, longitude, radius_km, settings.DISPATCH_REGION_SIZE_DEG
+            )
+        return self.filter(**lookups)
+
+    def within_radius(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_km: float,
+        scan_limit: Optional[int] = None,
+        nearest_first: bool = True,
+    ) -> List[models.Model]:
+        """
+        Objects within ``radius_km``, each with a ``distance_km`` attribute.
+        ``scan_limit`` caps how many bounding-box rows are read, in the
+        queryset's own ordering, which is kept when ``nearest_first`` is off.
+        """
+        latitude, longitude = float(latitude), float(longitude)
+        candidates = self.within_bounding_box(latitude, longitude, radius_km)
+        if scan_limit is not None:
+            candidates = candidates[:scan_limit]
+
+        get_latitude = attrgetter(self.latitude_field.replace("__", "."))
+        get_longitude = attrgetter(self.longitude_field.replace("__", "."))
+        result = []
+        for obj in candidates:
+            distance = haversine_km(
+                latitude,
+                longitude,
+                float(get_latitude(obj)),
+                float(get_longitude(obj)),
+            )
+            if distance <= radius_km:
+                obj.distance_km = distance
+                result.append(obj)
+
+        if nearest_first:
+            result.sort(key=attrgetter("distance_km"))
+        return result
+
+
+class DriverQuerySet(GeoQuerySet):
+    latitude_field = "location__latitude"
+    longitude_field = "location__longitude"
+
+    def available(self) -> "DriverQuerySet":
+        return self.filter(is_online=True, is_busy=False, location__isnull=False)
+
+
+class DriverManager(models.Manager.from_queryset(DriverQuerySet)):  # type: ignore[misc]
+    def get_queryset(self) -> DriverQuerySet:
+        # Positions live in their own table; join it so reading one is free.
+        return super().get_queryset().select_related("location")
+
+
+def _round_coordinate(value: float, rounding: str) -> Decimal:
+    # Round outwards so the box never loses a row to the 6-digit column scale.
+    return Decimal(value).quantize(COORDINATE_QUANTUM, rounding=rounding)
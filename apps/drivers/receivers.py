@@ -0,0 +1,15 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Driver, DriverLocation
+from .services import driver_cache
+
+
+@receiver([post_save, post_delete], sender=Driver)
+def invalidate_cached_driver(sender, instance, **kwargs) -> None:
+    driver_cache.invalidate([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=DriverLocation)
+def invalidate_cached_driver_location(sender, instance, **kwargs) -> None:
+    driver_cache.invalidate([instance.driver_id])
@@ -7,4 +7,8 @@ websocket_urlpatterns = [
         r"^ws/drivers/$",
         consumers.AvailableDriversConsumer.as_asgi(),  # type: ignore[arg-type]
     ),
+    re_path(
+        r"^ws/drivers/telemetry/$",
+        consumers.DriverTelemetryConsumer.as_asgi(),  # type: ignore[arg-type]
+    ),
 ]
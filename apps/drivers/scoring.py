@@ -0,0 +1,63 @@
+import math
+from array import array
+from typing import Iterable, Tuple
+
+from django.conf import settings
+
+from .geo import haversine_many_km
+
+
+def estimate_eta_seconds(distance_km: float) -> float:
+    """
+    Straight-line distance stretched by a road detour factor and driven at
+    the average city speed.
+    """
+    return (
+        distance_km
+        * settings.DISPATCH_ROUTE_FACTOR
+        / settings.DISPATCH_AVERAGE_SPEED_KMH
+        * 3600
+    )
+
+
+class DriverPositions:
+    """
+    Snapshot of driver positions held in parallel float64 arrays, with the
+    radians and latitude cosines precomputed, so every driver can be scored
+    against a point in one batched call instead of per-object Decimal math.
+    """
+
+    def __init__(
+        self,
+        ids: Iterable[int],
+        latitudes: Iterable[float],
+        longitudes: Iterable[float],
+    ) -> None:
+        self.ids = array("q", ids)
+        self.latitudes = array("d", latitudes)
+        self.longitudes = array("d", longitudes)
+        self.phis = array("d", map(math.radians, self.latitudes))
+        self.lambdas = array("d", map(math.radians, self.longitudes))
+        self.cos_phis = array("d", map(math.cos, self.phis))
+
+    @classmethod
+    def from_entries(
+        cls, entries: Iterable[Tuple[int, float, float]]
+    ) -> "DriverPositions":
+        entries = list(entries)
+        return cls(
+            (driver_id for driver_id, _, _ in entries),
+            (float(latitude) for _, latitude, _ in entries),
+            (float(longitude) for _, _, longitude in entries),
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def distances_km(self, latitude: float, longitude: float) -> array:
+        return array(
+            "d",
+            haversine_many_km(
+                latitude, longitude, self.phis, self.lambdas, self.cos_phis
+            ),
+        )
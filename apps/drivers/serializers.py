@@ -1,14 +1,97 @@
-from typing import Any, Dict
+import math
+from typing import Any, Dict, Optional
 
+from django.conf import settings
+from drf_spectacular.types import OpenApiTypes
+from drf_spectacular.utils import extend_schema_field
 from rest_framework import serializers
 
 from apps.users.serializers import UserSerializer
 
+from .geo import (
+    COORDINATE_DECIMAL_PLACES,
+    MAX_GEO_LATITUDE,
+    Coordinate,
+    format_coordinate,
+    region_key,
+    region_keys_in_box,
+)
 from .models import Driver
 
 
+@extend_schema_field(OpenApiTypes.DECIMAL)
+class CoordinateField(serializers.Field):
+    """
+    Reads and writes coordinates in the same format as
+    ``DecimalField(max_digits=9, decimal_places=6)``, but without Decimal
+    math: input becomes a float rounded to six decimals, and output is
+    formatted straight from the stored Decimal or float.
+    """
+
+    default_error_messages = {
+        "invalid": "A valid number is required.",
+        "max_value": "Ensure this value is less than or equal to {max_value}.",
+        "min_value": "Ensure this value is greater than or equal to {min_value}.",
+        "max_decimal_places": (
+            "Ensure that there are no more than {max_decimal_places} decimal places."
+        ),
+    }
+
+    def __init__(
+        self,
+        min_value: Optional[float] = None,
+        max_value: Optional[float] = None,
+        **kwargs: Any,
+    ) -> None:
+        self.min_value = min_value
+        self.max_value = max_value
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data: Any) -> float:
+        if isinstance(data, bool) or not isinstance(data, (str, int, float)):
+            self.fail("invalid")
+        try:
+            value = float(data)
+        except ValueError:
+            self.fail("invalid")
+        if not math.isfinite(value):
+            self.fail("invalid")
+
+        rounded = round(value, COORDINATE_DECIMAL_PLACES)
+        if isinstance(data, str):
+            _, _, fraction = data.strip().partition(".")
+            too_precise = len(fraction) > COORDINATE_DECIMAL_PLACES
+        else:
+            too_precise = rounded != value
+        if too_precise:
+            self.fail(
+                "max_decimal_places", max_decimal_places=COORDINATE_DECIMAL_PLACES
+            )
+
+        if self.max_value is not None and rounded > self.max_value:
+            self.fail("max_value", max_value=self.max_value)
+        if self.min_value is not None and rounded < self.min_value:
+            self.fail("min_value", min_value=self.min_value)
+        return rounded
+
+    def to_representation(self, value: Coordinate) -> Optional[str]:
+        return format_coordinate(value)
+
+
+class LatitudeField(CoordinateField):
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(min_value=-90, max_value=90, **kwargs)
+
+
+class LongitudeField(CoordinateField):
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(min_value=-180, max_value=180, **kwargs)
+
+
 class DriverSerializer(serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
+    latitude = CoordinateField(allow_null=True, read_only=True)
+    longitude = CoordinateField(allow_null=True, read_only=True)
     is_available = serializers.BooleanField(read_only=True)
 
     class Meta:
@@ -30,18 +113,8 @@ class DriverSerializer(serializers.ModelSerializer):
 
 
 class DriverLocationSerializer(serializers.Serializer):
-    latitude = serializers.DecimalField(
-        max_digits=9,
-        decimal_places=6,
-        min_value=-90,
-        max_value=90,
-    )
-    longitude = serializers.DecimalField(
-        max_digits=9,
-        decimal_places=6,
-        min_value=-180,
-        max_value=180,
-    )
+    latitude = LatitudeField()
+    longitude = LongitudeField()
 
     def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
         if not attrs.get("latitude") or not attrs.get("longitude"):
@@ -51,9 +124,29 @@ class DriverLocationSerializer(serializers.Serializer):
         return attrs
 
 
+class LocationSampleSerializer(DriverLocationSerializer):
+    recorded_at = serializers.DateTimeField()
+
+
+class LocationBatchSerializer(serializers.Serializer):
+    MAX_SAMPLES = 100
+
+    samples = LocationSampleSerializer(
+        many=True, allow_empty=False, max_length=MAX_SAMPLES
+    )
+
+
+class LocationBatchResponseSerializer(serializers.Serializer):
+    accepted = serializers.IntegerField()
+    latitude = CoordinateField()
+    longitude = CoordinateField()
+
+
 class AvailableDriverSerializer(serializers.ModelSerializer):
     username = serializers.CharField(source="user.username", read_only=True)
     phone_number = serializers.CharField(source="user.phone_number", read_only=True)
+    latitude = CoordinateField(allow_null=True, read_only=True)
+    longitude = CoordinateField(allow_null=True, read_only=True)
 
     class Meta:
         model = Driver
@@ -66,3 +159,76 @@ class AvailableDriverSerializer(serializers.ModelSerializer):
             "vehicle_number",
             "vehicle_model",
         ]
+
+
+class DriverSubscriptionSerializer(serializers.Serializer):
+    """
+    A viewport given as ``bbox`` (min_lat, min_lon, max_lat, max_lon) or as
+    ``tiles``; the validated data holds the tiles either way.
+    """
+
+    bbox = serializers.ListField(
+        child=serializers.FloatField(), min_length=4, max_length=4, required=False
+    )
+    tiles = serializers.ListField(
+        child=serializers.IntegerField(min_value=0), allow_empty=False, required=False
+    )
+
+    def validate(self, attrs: Dict[str, Any]) -> Dict[str, Any]:
+        bbox, tiles = attrs.get("bbox"), attrs.get("tiles")
+        if (bbox is None) == (tiles is None):
+            raise serializers.ValidationError("Provide either bbox or tiles")
+
+        size = settings.DRIVER_TILE_SIZE_DEG
+        limit = settings.DRIVER_TILE_SUBSCRIPTION_LIMIT
+        if bbox is not None:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            if not (
+                -90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= max_lon <= 180
+            ):
+                raise serializers.ValidationError(
+                    {"bbox": "Expected min_lat, min_lon, max_lat, max_lon"}
+                )
+            min_lat = max(min_lat, -MAX_GEO_LATITUDE)
+            max_lat = min(max_lat, MAX_GEO_LATITUDE)
+            rows = math.floor((max_lat + 90) / size) - math.floor((min_lat + 90) / size)
+            columns = math.floor((max_lon + 180) / size) - math.floor(
+                (min_lon + 180) / size
+            )
+            if (rows + 1) * (columns + 1) > limit:
+                raise serializers.ValidationError(
+                    {"bbox": f"The area covers more than {limit} tiles"}
+                )
+            tiles = region_keys_in_box(min_lat, max_lat, min_lon, max_lon, size)
+
+        tiles = sorted(set(tiles))
+        if len(tiles) > limit:
+            raise serializers.ValidationError(
+                {"tiles": f"Subscribe to at most {limit} tiles"}
+            )
+        first = region_key(-MAX_GEO_LATITUDE, -180, size)
+        last = region_key(MAX_GEO_LATITUDE, 180, size)
+        if tiles[0] < first or tiles[-1] > last:
+            raise serializers.ValidationError(
+                {"tiles": f"Tile ids range from {first} to {last}"}
+            )
+        return {"tiles": tiles}
+
+
+class NearbyDriversQuerySerializer(serializers.Serializer):
+    latitude = LatitudeField()
+    longitude = LongitudeField()
+    radius_km = serializers.FloatField(min_value=0.1, max_value=50, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, required=False)
+
+
+class NearbyDriverSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    username = serializers.CharField()
+    phone_number = serializers.CharField()
+    latitude = CoordinateField()
+    longitude = CoordinateField()
+    vehicle_number = serializers.CharField()
+    vehicle_model = serializers.CharField()
+    distance_km = serializers.FloatField()
+    eta_seconds = serializers.FloatField()
@@ -1,74 +1,649 @@
-from decimal import Decimal
-from typing import Any, Dict, Final
+import hashlib
+import math
+import random
+import time
+from datetime import datetime, timezone as dt_timezone
+from operator import attrgetter
+from typing import (
+    Any,
+    Dict,
+    Final,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
+from django.conf import settings
 from django.core.cache import cache
-from django.db.models import QuerySet
+from django.db import connection, transaction
+from django.db.models import Case, QuerySet, When
 from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
 
+from apps.common.caching import TieredCache
+from apps.common.metrics import increment_counter
 from apps.users.models import User
 
-from .models import Driver
+from .availability import (
+    PROFILE_FIELDS,
+    AvailableDriver,
+    LoadState,
+    get_availability_backend,
+)
+from .broadcasts import TickStats, get_broadcast_buffer
+from .geo import (
+    Coordinate,
+    format_coordinate,
+    from_microdegrees,
+    haversine_km,
+    region_box,
+    to_microdegrees,
+)
+from .locations import BufferedLocation, get_location_buffer
+from .metrics import (
+    DRIVER_BROADCAST_COUNTERS,
+    PINGS_ACCEPTED,
+    PINGS_COALESCED,
+    PINGS_PERSISTED,
+)
+from .models import Driver, DriverLocation, LocationSample
+from .notifications import (
+    DriverChanges,
+    driver_changes,
+    driver_position,
+    driver_tile,
+    publish_driver_changes,
+    publish_driver_position,
+)
+from .scoring import estimate_eta_seconds
+from .serializers import AvailableDriverSerializer
+from .signals import driver_available
+
+
+PROFILE_FIELDS_LOOKUPS: Final[Tuple[str, ...]] = (
+    "user__username",
+    "user__phone_number",
+    "vehicle_number",
+    "vehicle_model",
+)
+
+
+class RenderedDrivers(NamedTuple):
+    version: int
+    etag: str
+    content: bytes
+
+
+# Driver profiles by pk (and driver pks by user pk), and the rendered list.
+driver_cache = TieredCache(
+    "drivers", max_entries=10_000, local_ttl=30, timeout=120, copy_values=True
+)
+rendered_drivers_cache = TieredCache(
+    "available_drivers", max_entries=1, local_ttl=30, timeout=300
+)
 
 
 class DriverService:
-    CACHE_KEY_PREFIX: Final[str] = "available_drivers"
-    CACHE_TIMEOUT: Final[int] = 60
+    LOCATION_FLUSH_BATCH_SIZE: Final[int] = 500
+    REBUILD_LEASE_KEY: Final[str] = "available_drivers:rebuild_lease"
+    REBUILD_POLL_SECONDS: Final[float] = 0.05
+    RENDERED_CACHE_KEY: Final[str] = "rendered"
 
     @staticmethod
     def get_or_create_driver(user: User) -> Driver:
-        driver, created = Driver.objects.get_or_create(user=user)
+        driver_id = driver_cache.get(f"user:{user.pk}")
+        driver = driver_cache.get(driver_id) if driver_id is not None else None
+        if driver is None:
+            driver, created = Driver.objects.select_related("user").get_or_create(
+                user=user
+            )
+            driver_cache.set(f"user:{user.pk}", driver.pk)
+            driver_cache.set(driver.pk, driver)
+        else:
+            driver.user = user
+        DriverService.with_buffered_locations([driver])
         return driver
 
     @staticmethod
     def set_driver_online(driver: Driver) -> Driver:
+        was_dispatchable = DriverService._is_dispatchable(driver)
         driver.is_online = True
         driver.last_online_at = timezone.now()
         driver.save(update_fields=["is_online", "last_online_at"])
-        cache.delete(DriverService.CACHE_KEY_PREFIX)
+        DriverService._sync_availability(driver, was_dispatchable)
         return driver
 
     @staticmethod
     def set_driver_offline(driver: Driver) -> Driver:
+        was_dispatchable = DriverService._is_dispatchable(driver)
         driver.is_online = False
         driver.save(update_fields=["is_online"])
-        cache.delete(DriverService.CACHE_KEY_PREFIX)
+        DriverService._sync_availability(driver, was_dispatchable)
         return driver
 
     @staticmethod
     def update_driver_location(
-        driver: Driver, latitude: Decimal, longitude: Decimal
+        driver: Driver, latitude: Coordinate, longitude: Coordinate
     ) -> Driver:
+        was_dispatchable = DriverService._is_dispatchable(driver)
+        coalesce = DriverService._within_deadband(driver, latitude, longitude)
+        location = BufferedLocation(latitude, longitude, time.time())
         driver.latitude = latitude
         driver.longitude = longitude
-        driver.save(update_fields=["latitude", "longitude"])
-        cache.delete(DriverService.CACHE_KEY_PREFIX)
+        increment_counter(PINGS_ACCEPTED)
+        get_location_buffer().append_history(driver.pk, [location])
+
+        if coalesce:
+            get_location_buffer().put(driver.pk, location)
+            increment_counter(PINGS_COALESCED)
+        else:
+            get_location_buffer().discard(driver.pk)
+            DriverService._store_location(driver, latitude, longitude)
+            increment_counter(PINGS_PERSISTED)
+
+        DriverService._sync_availability(driver, was_dispatchable)
+        if driver.is_busy:
+            DriverService._publish_position(driver)
         return driver
 
+    @staticmethod
+    def _within_deadband(
+        driver: Driver, latitude: Coordinate, longitude: Coordinate
+    ) -> bool:
+        """
+        Whether a ping is close enough in space or time to the driver's last
+        written position to skip the row write. The buffered ping laid over
+        ``driver`` is not the baseline, or a driver creeping less than the
+        dead-band per ping would never be written.
+        """
+        written = DriverService._persisted_location(driver.pk)
+        if written is None or written.latitude is None or written.longitude is None:
+            return False
+
+        min_interval = settings.DRIVER_LOCATION_MIN_WRITE_INTERVAL_SECONDS
+        if (
+            min_interval
+            and written.updated_at
+            and (timezone.now() - written.updated_at).total_seconds() < min_interval
+        ):
+            return True
+
+        moved_m = 1000 * haversine_km(
+            float(written.latitude),
+            float(written.longitude),
+            float(latitude),
+            float(longitude),
+        )
+        return moved_m < settings.DRIVER_LOCATION_DEADBAND_METERS
+
+    @staticmethod
+    def _persisted_location(driver_id: int) -> Optional[DriverLocation]:
+        # The cached driver is dropped on each stored ping and never holds
+        # buffered positions.
+        cached = driver_cache.get(driver_id)
+        if cached is not None and Driver.location.is_cached(cached):
+            return cached.live_location
+        return DriverLocation.objects.filter(driver_id=driver_id).first()
+
+    @staticmethod
+    def buffer_driver_locations(
+        driver: Driver, samples: Sequence[Dict[str, Any]]
+    ) -> Optional[BufferedLocation]:
+        """
+        Keeps the newest of the samples as the driver's position without
+        writing the row; flush_buffered_locations persists it later. Returns
+        None when a later sample is already buffered.
+        """
+        locations = sorted(
+            (
+                BufferedLocation(
+                    sample["latitude"],
+                    sample["longitude"],
+                    sample["recorded_at"].timestamp(),
+                )
+                for sample in samples
+            ),
+            key=attrgetter("recorded_at"),
+        )
+        location = locations[-1]
+        increment_counter(PINGS_ACCEPTED, len(samples))
+        increment_counter(PINGS_COALESCED, len(samples))
+        get_location_buffer().append_history(driver.pk, locations)
+        if not get_location_buffer().put(driver.pk, location):
+            return None
+
+        was_dispatchable = DriverService._is_dispatchable(driver)
+        driver.latitude = location.latitude
+        driver.longitude = location.longitude
+        DriverService._sync_availability(driver, was_dispatchable)
+        if driver.is_busy:
+            DriverService._publish_position(driver)
+        return location
+
+    @staticmethod
+    def with_buffered_locations(drivers: Iterable[Driver]) -> List[Driver]:
+        drivers = list(drivers)
+        buffered = get_location_buffer().get_many(driver.pk for driver in drivers)
+        for driver in drivers:
+            if location := buffered.get(driver.pk):
+                driver.latitude = location.latitude
+                driver.longitude = location.longitude
+        return drivers
+
+    @staticmethod
+    def flush_buffered_locations() -> int:
+        buffered = get_location_buffer().drain()
+        if not buffered:
+            return 0
+
+        DriverService._store_locations(
+            {
+                driver_id: (location.latitude, location.longitude)
+                for driver_id, location in buffered.items()
+            }
+        )
+        increment_counter(PINGS_PERSISTED, len(buffered))
+        return len(buffered)
+
+    @staticmethod
+    def _store_location(
+        driver: Driver, latitude: Coordinate, longitude: Coordinate
+    ) -> None:
+        # One UPDATE in the common case; the upsert only for a first fix.
+        updated_at = timezone.now()
+        if DriverLocation.objects.filter(driver_id=driver.pk).update(
+            latitude=latitude, longitude=longitude, updated_at=updated_at
+        ):
+            driver.location.updated_at = updated_at
+            # Invalidate rather than write ``driver`` through: its flags may
+            # predate a concurrent claim.
+            driver_cache.invalidate([driver.pk])
+        else:
+            DriverService._store_locations({driver.pk: (latitude, longitude)})
+
+    @staticmethod
+    def _store_locations(locations: Dict[int, Tuple[Coordinate, Coordinate]]) -> None:
+        """
+        Upserts live positions; drivers deleted in the meantime are skipped.
+        """
+        if len(locations) > 1:
+            existing = set(
+                Driver.objects.filter(pk__in=locations).values_list("pk", flat=True)
+            )
+            locations = {
+                driver_id: position
+                for driver_id, position in locations.items()
+                if driver_id in existing
+            }
+
+        DriverLocation.objects.bulk_create(
+            [
+                DriverLocation(
+                    driver_id=driver_id, latitude=latitude, longitude=longitude
+                )
+                for driver_id, (latitude, longitude) in locations.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["driver"],
+            update_fields=["latitude", "longitude", "updated_at"],
+            batch_size=DriverService.LOCATION_FLUSH_BATCH_SIZE,
+        )
+        driver_cache.invalidate(locations)
+
     @staticmethod
     def set_driver_busy(driver: Driver, is_busy: bool) -> Driver:
+        was_dispatchable = DriverService._is_dispatchable(driver)
         driver.is_busy = is_busy
         driver.save(update_fields=["is_busy"])
-        if is_busy:
-            cache.delete(DriverService.CACHE_KEY_PREFIX)
+        DriverService._sync_availability(driver, was_dispatchable)
         return driver
 
+    @staticmethod
+    def claim_driver(driver_id: int) -> bool:
+        claimed = Driver.objects.filter(
+            pk=driver_id, is_online=True, is_busy=False
+        ).update(is_busy=True, updated_at=timezone.now())
+
+        # A lost claim still takes a stale entry out of the set, and watchers
+        # must hear about that too.
+        previous = get_availability_backend().remove(driver_id)
+        DriverService._publish_changes(driver_changes(driver_id, previous))
+        if claimed:
+            driver_cache.invalidate([driver_id])
+        return bool(claimed)
+
+    @staticmethod
+    def claim_nearest_available_driver(
+        latitude: Coordinate, longitude: Coordinate
+    ) -> Optional[AvailableDriver]:
+        candidates = DriverService.search_available_drivers(latitude, longitude)
+        if not candidates:
+            return None
+
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = DriverService._lock_first_free(candidates)
+
+        for candidate in candidates:
+            if DriverService.claim_driver(candidate.id):
+                return candidate
+        return None
+
+    @staticmethod
+    def _lock_first_free(
+        candidates: List[AvailableDriver],
+    ) -> List[AvailableDriver]:
+        ranking = {
+            candidate.id: position for position, candidate in enumerate(candidates)
+        }
+        with transaction.atomic():
+            driver_id = (
+                Driver.objects.select_for_update(skip_locked=True, of=("self",))
+                .filter(id__in=ranking, is_online=True, is_busy=False)
+                .order_by(
+                    Case(
+                        *[
+                            When(id=pk, then=position)
+                            for pk, position in ranking.items()
+                        ]
+                    )
+                )
+                .values_list("id", flat=True)
+                .first()
+            )
+        return [candidates[ranking[driver_id]]] if driver_id is not None else []
+
     @staticmethod
     def get_available_drivers() -> QuerySet[Driver]:
-        if cached_ids := cache.get(DriverService.CACHE_KEY_PREFIX):
-            return Driver.objects.filter(id__in=cached_ids).select_related("user")
+        """
+        Drivers in the availability set. Transitions add or remove single
+        drivers from it, so reads never rebuild it from the ``drivers`` table
+        unless it has expired.
+        """
+        DriverService._ensure_availability_loaded()
+        return Driver.objects.filter(
+            id__in=get_availability_backend().driver_ids()
+        ).select_related("user")
+
+    @staticmethod
+    def get_rendered_available_drivers() -> "RenderedDrivers":
+        """
+        The available-drivers list as JSON bytes, rendered once per
+        availability version and shared by every REST and WebSocket reader.
+        """
+        version = DriverService.get_availability_version()
+        cached = rendered_drivers_cache.get(
+            DriverService.RENDERED_CACHE_KEY,
+            is_valid=lambda rendered: rendered.version == version,
+        )
+        if cached is not None:
+            return cached
+
+        drivers = DriverService.with_buffered_locations(
+            DriverService.get_available_drivers().order_by("id")
+        )
+        content = JSONRenderer().render(
+            AvailableDriverSerializer(drivers, many=True).data
+        )
+        rendered = RenderedDrivers(
+            version=version,
+            etag=f'"{hashlib.blake2b(content, digest_size=8).hexdigest()}"',
+            content=content,
+        )
+        rendered_drivers_cache.set(DriverService.RENDERED_CACHE_KEY, rendered)
+        return rendered
+
+    @staticmethod
+    def get_available_drivers_in_tiles(tiles: Iterable[int]) -> List[Dict[str, Any]]:
+        """
+        List entries of the available drivers inside the given tiles, read
+        from the availability set alone.
+        """
+        tiles = set(tiles)
+        if not tiles:
+            return []
+        DriverService._ensure_availability_loaded()
+        boxes = [region_box(tile, settings.DRIVER_TILE_SIZE_DEG) for tile in tiles]
+        drivers = get_availability_backend().within_box(
+            min(box[0] for box in boxes),
+            max(box[1] for box in boxes),
+            min(box[2] for box in boxes),
+            max(box[3] for box in boxes),
+        )
+        return [
+            {
+                "id": driver.id,
+                "username": driver.username,
+                "phone_number": driver.phone_number,
+                "latitude": format_coordinate(driver.latitude),
+                "longitude": format_coordinate(driver.longitude),
+                "vehicle_number": driver.vehicle_number,
+                "vehicle_model": driver.vehicle_model,
+            }
+            for driver in sorted(drivers, key=attrgetter("id"))
+            if driver_tile(driver.latitude, driver.longitude) in tiles
+        ]
+
+    @staticmethod
+    def get_availability_version() -> int:
+        DriverService._ensure_availability_loaded()
+        return get_availability_backend().version()
+
+    @staticmethod
+    def search_available_drivers(
+        latitude: Coordinate,
+        longitude: Coordinate,
+        radius_km: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> List[AvailableDriver]:
+        DriverService._ensure_availability_loaded()
+        drivers = get_availability_backend().search(
+            float(latitude),
+            float(longitude),
+            radius_km or settings.DISPATCH_SEARCH_RADIUS_KM,
+            limit or settings.DISPATCH_CANDIDATE_LIMIT,
+        )
+        for driver in drivers:
+            driver.eta_seconds = estimate_eta_seconds(driver.distance_km)
+        return drivers
+
+    @staticmethod
+    def find_nearest_available_drivers(
+        latitude: Coordinate,
+        longitude: Coordinate,
+        limit: Optional[int] = None,
+        radius_km: Optional[float] = None,
+    ) -> List[Driver]:
+        nearest = DriverService.search_available_drivers(
+            latitude, longitude, radius_km, limit
+        )
+        if not nearest:
+            return []
 
-        available_drivers = (
-            Driver.objects.filter(is_online=True, is_busy=False)
-            .exclude(latitude__isnull=True, longitude__isnull=True)
+        drivers = (
+            Driver.objects.filter(
+                id__in=[candidate.id for candidate in nearest],
+                is_online=True,
+                is_busy=False,
+            )
             .select_related("user")
+            .in_bulk()
         )
 
-        if driver_ids := list(available_drivers.values_list("id", flat=True)):
-            cache.set(
-                DriverService.CACHE_KEY_PREFIX, driver_ids, DriverService.CACHE_TIMEOUT
+        result = []
+        for candidate in nearest:
+            if driver := drivers.get(candidate.id):
+                driver.distance_km = candidate.distance_km
+                result.append(driver)
+        return result
+
+    @staticmethod
+    def find_candidate_drivers(
+        points: Sequence[Tuple[Coordinate, Coordinate]],
+        limit: Optional[int] = None,
+        radius_km: Optional[float] = None,
+    ) -> List[Driver]:
+        driver_ids = {
+            candidate.id
+            for latitude, longitude in points
+            for candidate in DriverService.search_available_drivers(
+                latitude, longitude, radius_km, limit
             )
+        }
+        if not driver_ids:
+            return []
 
-        return available_drivers
+        return list(
+            Driver.objects.available()
+            .filter(id__in=driver_ids)
+            .select_related("user")
+            .order_by("id")
+        )
+
+    @staticmethod
+    def _is_dispatchable(driver: Driver) -> bool:
+        return (
+            driver.is_available
+            and driver.latitude is not None
+            and driver.longitude is not None
+        )
+
+    @staticmethod
+    def _sync_availability(driver: Driver, was_dispatchable: bool = True) -> None:
+        """
+        Updates the availability set and, after commit, tells watchers of
+        the available drivers whether the driver was added, moved or removed.
+        """
+        if not DriverService._is_dispatchable(driver):
+            previous = get_availability_backend().remove(driver.pk)
+            DriverService._publish_changes(driver_changes(driver.pk, previous))
+            return
+
+        previous = get_availability_backend().add(
+            driver.pk,
+            float(driver.latitude),  # type: ignore[arg-type]
+            float(driver.longitude),  # type: ignore[arg-type]
+            DriverService._availability_profile(driver),
+        )
+        DriverService._publish_changes(driver_changes(driver.pk, previous, driver))
+        if not was_dispatchable:
+            transaction.on_commit(
+                lambda: driver_available.send(sender=Driver, driver=driver)
+            )
+
+    @staticmethod
+    def _publish_changes(changes: DriverChanges) -> None:
+        # Built now, sent (or queued for the next broadcast tick) once the
+        # transition is committed.
+        if not changes:
+            return
+        if settings.DRIVER_BROADCAST_TICK_MS:
+            transaction.on_commit(lambda: get_broadcast_buffer().push(changes))
+        else:
+            transaction.on_commit(lambda: publish_driver_changes(changes))
+
+    @staticmethod
+    def _publish_position(driver: Driver) -> None:
+        position = driver_position(driver)
+        transaction.on_commit(lambda: publish_driver_position(position))
+
+    @staticmethod
+    def broadcast_driver_changes() -> TickStats:
+        """
+        Sends the changes queued since the previous tick as one frame per
+        group, each driver's changes merged into one.
+        """
+        changes, changes_in = get_broadcast_buffer().drain()
+        stats = TickStats(
+            changes_in=changes_in,
+            frames_out=len(changes),
+            bytes_out=publish_driver_changes(changes),
+        )
+        for name, value in zip(DRIVER_BROADCAST_COUNTERS, stats):
+            if value:
+                increment_counter(name, value)
+        return stats
+
+    @staticmethod
+    def _availability_profile(driver: Driver) -> Dict[str, Any]:
+        return {
+            "username": driver.user.username,
+            "phone_number": driver.user.phone_number,
+            "vehicle_number": driver.vehicle_number,
+            "vehicle_model": driver.vehicle_model,
+        }
+
+    @staticmethod
+    def _ensure_availability_loaded() -> None:
+        """
+        Rebuilds the availability set from the database when it has expired,
+        or a little before that with a probability that grows as expiry nears
+        (scaled by how long a rebuild takes), so that one caller refreshes
+        it ahead of the crowd. Only the holder of a short lease rebuilds;
+        other callers keep using the current set and, if it has expired,
+        wait briefly for the rebuild first.
+        """
+        backend = get_availability_backend()
+        state = backend.load_state()
+        if state and not DriverService._should_refresh_early(state):
+            return
+
+        if cache.add(
+            DriverService.REBUILD_LEASE_KEY,
+            1,
+            settings.DRIVER_INDEX_REBUILD_LEASE_SECONDS,
+        ):
+            try:
+                DriverService._rebuild_availability()
+            finally:
+                cache.delete(DriverService.REBUILD_LEASE_KEY)
+            return
+
+        if state is None:
+            deadline = time.monotonic() + settings.DRIVER_INDEX_REBUILD_WAIT_SECONDS
+            while not backend.is_loaded() and time.monotonic() < deadline:
+                time.sleep(DriverService.REBUILD_POLL_SECONDS)
+
+    @staticmethod
+    def _should_refresh_early(state: LoadState) -> bool:
+        # XFetch: -delta * beta * ln(U) with U in (0, 1] exceeds the time left
+        # more often as expiry approaches and for slower rebuilds.
+        return (
+            -state.rebuild_seconds
+            * settings.DRIVER_INDEX_EARLY_REFRESH_BETA
+            * math.log(1.0 - random.random())
+            >= state.expires_in
+        )
+
+    @staticmethod
+    def _rebuild_availability() -> None:
+        started = time.perf_counter()
+        drivers = list(
+            Driver.objects.available().values_list(
+                "id",
+                "location__latitude",
+                "location__longitude",
+                *PROFILE_FIELDS_LOOKUPS,
+            )
+        )
+        buffered = get_location_buffer().get_many(row[0] for row in drivers)
+        entries = []
+        for driver_id, latitude, longitude, *profile in drivers:
+            if location := buffered.get(driver_id):
+                latitude, longitude = location.latitude, location.longitude
+            entries.append(
+                (
+                    driver_id,
+                    float(latitude),
+                    float(longitude),
+                    dict(zip(PROFILE_FIELDS, profile)),
+                )
+            )
+        get_availability_backend().replace(
+            entries, rebuild_seconds=time.perf_counter() - started
+        )
 
     @staticmethod
     def get_driver_status(driver: Driver) -> Dict[str, Any]:
@@ -76,7 +651,73 @@ class DriverService:
             "is_online": driver.is_online,
             "is_busy": driver.is_busy,
             "is_available": driver.is_available,
-            "latitude": driver.latitude,
-            "longitude": driver.longitude,
+            # JSON numbers, as the Decimal fields rendered before.
+            "latitude": None if driver.latitude is None else float(driver.latitude),
+            "longitude": (
+                None if driver.longitude is None else float(driver.longitude)
+            ),
             "last_online_at": driver.last_online_at,
         }
+
+
+class TrackPoint(NamedTuple):
+    latitude: float
+    longitude: float
+    recorded_at: datetime
+
+
+class LocationHistoryService:
+    SECONDS_PER_DAY: Final[int] = 86400
+    FLUSH_BATCH_SIZE: Final[int] = 1000
+
+    @staticmethod
+    def flush_history() -> int:
+        """
+        Appends the queued samples to the history table in bulk inserts.
+        """
+        buffer = get_location_buffer()
+        written = 0
+        while samples := buffer.drain_history(LocationHistoryService.FLUSH_BATCH_SIZE):
+            LocationSample.objects.bulk_create(
+                [
+                    LocationSample(
+                        driver_id=driver_id,
+                        day=int(location.recorded_at)
+                        // LocationHistoryService.SECONDS_PER_DAY,
+                        recorded_at=int(location.recorded_at),
+                        latitude_e6=to_microdegrees(location.latitude),
+                        longitude_e6=to_microdegrees(location.longitude),
+                    )
+                    for driver_id, location in samples
+                ]
+            )
+            written += len(samples)
+        return written
+
+    @staticmethod
+    def get_track(driver_id: int, start: datetime, end: datetime) -> List[TrackPoint]:
+        samples = (
+            LocationSample.objects.filter(
+                driver_id=driver_id,
+                recorded_at__range=(int(start.timestamp()), int(end.timestamp())),
+            )
+            .order_by("recorded_at", "id")
+            .values_list("recorded_at", "latitude_e6", "longitude_e6")
+        )
+        return [
+            TrackPoint(
+                latitude=from_microdegrees(latitude_e6),
+                longitude=from_microdegrees(longitude_e6),
+                recorded_at=datetime.fromtimestamp(recorded_at, tz=dt_timezone.utc),
+            )
+            for recorded_at, latitude_e6, longitude_e6 in samples
+        ]
+
+    @staticmethod
+    def prune_history(keep_days: int) -> int:
+        """
+        Deletes whole days older than ``keep_days``, newest day included.
+        """
+        today = int(time.time()) // LocationHistoryService.SECONDS_PER_DAY
+        deleted, _ = LocationSample.objects.filter(day__lte=today - keep_days).delete()
+        return deleted
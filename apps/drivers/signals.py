@@ -0,0 +1,5 @@
+from django.dispatch import Signal
+
+# Sent after commit when a driver becomes online, not busy and located.
+# Provides the ``driver`` argument.
+driver_available = Signal()
@@ -0,0 +1,150 @@
+import heapq
+import math
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, NamedTuple, Set, Tuple
+
+from .geo import bounding_box, haversine_many_km
+
+Cell = Tuple[int, int]
+
+
+class _Entry(NamedTuple):
+    latitude: float
+    longitude: float
+    cell: Cell
+    phi: float
+    lambda_: float
+    cos_phi: float
+
+
+class GridIndex:
+    """
+    Fixed-cell grid over latitude/longitude used to answer nearest-driver
+    queries without scanning every online driver.
+    """
+
+    def __init__(self, cell_size_deg: float) -> None:
+        self.cell_size_deg = cell_size_deg
+        self._cells: Dict[Cell, Set[int]] = defaultdict(set)
+        self._positions: Dict[int, _Entry] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, driver_id: int) -> bool:
+        return driver_id in self._positions
+
+    def position(self, driver_id: int) -> Tuple[float, float]:
+        entry = self._positions[driver_id]
+        return entry.latitude, entry.longitude
+
+    def _cell(self, latitude: float, longitude: float) -> Cell:
+        return (
+            math.floor(latitude / self.cell_size_deg),
+            math.floor(longitude / self.cell_size_deg),
+        )
+
+    def upsert(self, driver_id: int, latitude: float, longitude: float) -> None:
+        cell = self._cell(latitude, longitude)
+        phi = math.radians(latitude)
+        entry = _Entry(
+            latitude, longitude, cell, phi, math.radians(longitude), math.cos(phi)
+        )
+        with self._lock:
+            if (previous := self._positions.get(driver_id)) and previous.cell != cell:
+                self._discard_from_cell(driver_id, previous.cell)
+            self._positions[driver_id] = entry
+            self._cells[cell].add(driver_id)
+
+    def remove(self, driver_id: int) -> None:
+        with self._lock:
+            if previous := self._positions.pop(driver_id, None):
+                self._discard_from_cell(driver_id, previous.cell)
+
+    def _discard_from_cell(self, driver_id: int, cell: Cell) -> None:
+        members = self._cells[cell]
+        members.discard(driver_id)
+        if not members:
+            del self._cells[cell]
+
+    def rebuild(self, entries: Iterable[Tuple[int, float, float]]) -> None:
+        with self._lock:
+            self._cells.clear()
+            self._positions.clear()
+            for driver_id, latitude, longitude in entries:
+                self.upsert(driver_id, float(latitude), float(longitude))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cells.clear()
+            self._positions.clear()
+
+    def within_box(
+        self, min_lat: float, max_lat: float, min_lon: float, max_lon: float
+    ) -> List[int]:
+        min_x, min_y = self._cell(min_lat, min_lon)
+        max_x, max_y = self._cell(max_lat, max_lon)
+        with self._lock:
+            return [
+                driver_id
+                for (x, y), members in self._cells.items()
+                if min_x <= x <= max_x and min_y <= y <= max_y
+                for driver_id in members
+                if min_lat <= self._positions[driver_id].latitude <= max_lat
+                and min_lon <= self._positions[driver_id].longitude <= max_lon
+            ]
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        limit: int,
+        radius_km: float,
+    ) -> List[Tuple[int, float]]:
+        """
+        Returns up to ``limit`` (driver_id, distance_km) pairs within
+        ``radius_km``, closest first.
+        """
+        min_lat, max_lat, min_lon, max_lon = bounding_box(
+            latitude, longitude, radius_km
+        )
+        min_x, min_y = self._cell(min_lat, min_lon)
+        max_x, max_y = self._cell(max_lat, max_lon)
+
+        with self._lock:
+            if len(self._cells) < (max_x - min_x + 1) * (max_y - min_y + 1):
+                cells = [
+                    members
+                    for (x, y), members in self._cells.items()
+                    if min_x <= x <= max_x and min_y <= y <= max_y
+                ]
+            else:
+                cells = [
+                    self._cells[(x, y)]
+                    for x in range(min_x, max_x + 1)
+                    for y in range(min_y, max_y + 1)
+                    if (x, y) in self._cells
+                ]
+            driver_ids = [driver_id for members in cells for driver_id in members]
+            entries = [self._positions[driver_id] for driver_id in driver_ids]
+
+        distances = haversine_many_km(
+            latitude,
+            longitude,
+            [entry.phi for entry in entries],
+            [entry.lambda_ for entry in entries],
+            [entry.cos_phi for entry in entries],
+        )
+        return [
+            (driver_id, distance)
+            for distance, driver_id in heapq.nsmallest(
+                limit,
+                (
+                    (distance, driver_id)
+                    for distance, driver_id in zip(distances, driver_ids)
+                    if distance <= radius_km
+                ),
+            )
+        ]
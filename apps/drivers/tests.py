@@ -1,10 +1,68 @@
+import json
+import random
+import time
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
+from operator import itemgetter
 
+import msgpack
 import pytest
+import redis
+from channels.db import database_sync_to_async
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import serializers
+from rest_framework.test import APIClient
 
-from .models import Driver
-from .services import DriverService
+from apps.common.metrics import get_counters, reset_counters
+from apps.users.backends import CachedModelBackend
+
+from .availability import (
+    InMemoryAvailabilityBackend,
+    RedisGeoAvailabilityBackend,
+    get_availability_backend,
+)
+from .broadcasts import InMemoryBroadcastBuffer, RedisBroadcastBuffer
+from .consumers import AvailableDriversConsumer, DriverTelemetryConsumer
+from .geo import haversine_km
+from .locations import (
+    BufferedLocation,
+    InMemoryLocationBuffer,
+    RedisLocationBuffer,
+    get_location_buffer,
+)
+from .metrics import (
+    DRIVER_BROADCAST_COUNTERS,
+    LOCATION_PING_COUNTERS,
+    PINGS_ACCEPTED,
+    PINGS_COALESCED,
+    PINGS_PERSISTED,
+)
+from .models import Driver, DriverLocation, LocationSample
+from .scoring import DriverPositions, estimate_eta_seconds
+from .notifications import (
+    AVAILABLE_DRIVERS_GROUP,
+    driver_position_group_name,
+    driver_tile,
+    publish_driver_changes,
+    tile_group_name,
+)
+from .serializers import CoordinateField, DriverSubscriptionSerializer
+from .services import DriverService, LocationHistoryService
+from .spatial import GridIndex
+from .wire import (
+    MSGPACK_SUBPROTOCOL,
+    JsonCodec,
+    MsgpackCodec,
+    WireFormatError,
+    encode_frames,
+    negotiate_codec,
+)
 
 User = get_user_model()
 
@@ -27,6 +85,31 @@ class TestDriverModel:
         driver_profile.save()
         assert driver_profile.is_available is False
 
+    def test_position_is_stored_in_location_table(self, driver_user):
+        driver = Driver.objects.create(user=driver_user)
+        assert driver.latitude is None
+        assert not DriverLocation.objects.exists()
+
+        driver.latitude = Decimal("40.712776")
+        driver.longitude = Decimal("-74.005974")
+        driver.save(update_fields=["is_online"])
+        assert not DriverLocation.objects.exists()
+
+        driver.save()
+        location = DriverLocation.objects.get(driver=driver)
+        assert location.latitude == Decimal("40.712776")
+        assert Driver.objects.get(pk=driver.pk).longitude == Decimal("-74.005974")
+
+    def test_location_update_leaves_driver_row_alone(self, driver_profile):
+        with CaptureQueriesContext(connection) as queries:
+            DriverService.update_driver_location(
+                driver_profile, Decimal("40.758896"), Decimal("-73.985130")
+            )
+        assert not [q for q in queries if 'UPDATE "drivers"' in q["sql"]]
+        assert DriverLocation.objects.get(driver=driver_profile).latitude == Decimal(
+            "40.758896"
+        )
+
 
 @pytest.mark.django_db
 class TestDriverService:
@@ -58,6 +141,57 @@ class TestDriverService:
         assert driver.latitude == new_lat
         assert driver.longitude == new_lng
 
+    def test_update_within_deadband_is_coalesced(self, settings, driver_profile):
+        settings.DRIVER_LOCATION_DEADBAND_METERS = 20
+        before = get_counters(LOCATION_PING_COUNTERS)
+
+        DriverService.update_driver_location(
+            driver_profile, Decimal("40.712800"), Decimal("-74.005974")
+        )
+        driver_profile.refresh_from_db()
+        assert driver_profile.latitude == Decimal("40.712776")
+        assert DriverService.get_or_create_driver(
+            driver_profile.user
+        ).latitude == Decimal("40.712800")
+
+        DriverService.update_driver_location(
+            driver_profile, Decimal("40.713800"), Decimal("-74.005974")
+        )
+        driver_profile.refresh_from_db()
+        assert driver_profile.latitude == Decimal("40.713800")
+        assert DriverService.flush_buffered_locations() == 0
+
+        after = get_counters(LOCATION_PING_COUNTERS)
+        assert after[PINGS_ACCEPTED] - before[PINGS_ACCEPTED] == 2
+        assert after[PINGS_COALESCED] - before[PINGS_COALESCED] == 1
+        assert after[PINGS_PERSISTED] - before[PINGS_PERSISTED] == 1
+
+    def test_slow_creep_is_written_once_past_deadband(self, settings, driver_profile):
+        settings.DRIVER_LOCATION_DEADBAND_METERS = 20
+        latitude = 40.712776
+        for _ in range(20):
+            latitude += 0.000135  # about 15 m north per ping
+            driver = DriverService.get_or_create_driver(driver_profile.user)
+            DriverService.update_driver_location(driver, latitude, -74.005974)
+
+            row = DriverLocation.objects.get(driver=driver_profile)
+            moved_m = 1000 * haversine_km(
+                float(row.latitude), float(row.longitude), latitude, -74.005974
+            )
+            assert moved_m < 20
+
+    def test_min_write_interval_defers_to_flush(self, settings, driver_profile):
+        settings.DRIVER_LOCATION_MIN_WRITE_INTERVAL_SECONDS = 60
+        DriverService.update_driver_location(
+            driver_profile, Decimal("40.758896"), Decimal("-73.985130")
+        )
+        driver_profile.refresh_from_db()
+        assert driver_profile.latitude == Decimal("40.712776")
+
+        assert DriverService.flush_buffered_locations() == 1
+        driver_profile.refresh_from_db()
+        assert driver_profile.latitude == Decimal("40.758896")
+
     def test_get_available_drivers(self, driver_profile):
         available_drivers = DriverService.get_available_drivers()
         assert driver_profile in available_drivers
@@ -65,3 +199,1131 @@ class TestDriverService:
         DriverService.set_driver_busy(driver_profile, is_busy=True)
         available_drivers = DriverService.get_available_drivers()
         assert driver_profile not in available_drivers
+
+    def test_find_nearest_available_drivers(self, driver_profile):
+        far_user = User.objects.create_user(
+            username="driver2", password="testpass123", user_type=User.UserType.DRIVER
+        )
+        far_driver = Driver.objects.create(
+            user=far_user,
+            latitude=Decimal("40.758896"),
+            longitude=Decimal("-73.985130"),
+            is_online=True,
+        )
+
+        drivers = DriverService.find_nearest_available_drivers(
+            Decimal("40.760000"), Decimal("-73.980000")
+        )
+        assert drivers == [far_driver, driver_profile]
+        assert drivers[0].distance_km < drivers[1].distance_km
+
+        DriverService.set_driver_offline(far_driver)
+        drivers = DriverService.find_nearest_available_drivers(
+            Decimal("40.760000"), Decimal("-73.980000"), radius_km=1
+        )
+        assert drivers == []
+
+    def test_claim_driver_is_exclusive(self, driver_profile):
+        assert DriverService.claim_driver(driver_profile.pk) is True
+        assert DriverService.claim_driver(driver_profile.pk) is False
+
+        driver_profile.refresh_from_db()
+        assert driver_profile.is_busy is True
+
+    def test_claim_nearest_falls_through_stale_candidates(self, driver_profile):
+        other_user = User.objects.create_user(
+            username="driver2", password="testpass123", user_type=User.UserType.DRIVER
+        )
+        other_driver = Driver.objects.create(
+            user=other_user,
+            latitude=Decimal("40.720000"),
+            longitude=Decimal("-74.000000"),
+            is_online=True,
+        )
+        DriverService.search_available_drivers(Decimal("40.71"), Decimal("-74.0"))
+        Driver.objects.filter(pk=driver_profile.pk).update(is_busy=True)
+
+        claimed = DriverService.claim_nearest_available_driver(
+            Decimal("40.712776"), Decimal("-74.005974")
+        )
+        assert claimed.id == other_driver.pk
+
+
+class TestGridIndex:
+    def test_nearest_orders_by_distance(self):
+        index = GridIndex(cell_size_deg=0.01)
+        index.upsert(1, 40.7128, -74.0060)
+        index.upsert(2, 40.7300, -74.0000)
+        index.upsert(3, 41.5000, -74.0000)
+
+        nearest = index.nearest(40.7130, -74.0050, limit=5, radius_km=10)
+        assert [driver_id for driver_id, _ in nearest] == [1, 2]
+        assert nearest[0][1] < 0.1
+
+    def test_upsert_moves_and_remove(self):
+        index = GridIndex(cell_size_deg=0.01)
+        index.upsert(1, 40.7128, -74.0060)
+        index.upsert(1, 41.5000, -74.0000)
+        assert len(index) == 1
+        assert index.nearest(40.7128, -74.0060, limit=1, radius_km=5) == []
+
+        index.remove(1)
+        assert 1 not in index
+        assert index.nearest(41.5000, -74.0000, limit=1, radius_km=5) == []
+
+
+class TestDriverPositions:
+    def test_distances_match_scalar_haversine(self):
+        positions = DriverPositions.from_entries(
+            [(1, Decimal("40.712776"), Decimal("-74.005974")), (2, 41.5, -74.0)]
+        )
+        distances = positions.distances_km(40.758896, -73.985130)
+        assert distances[0] == pytest.approx(
+            haversine_km(40.758896, -73.985130, 40.712776, -74.005974)
+        )
+        assert distances[1] == pytest.approx(
+            haversine_km(40.758896, -73.985130, 41.5, -74.0)
+        )
+
+    def test_estimates_eta(self, settings):
+        settings.DISPATCH_AVERAGE_SPEED_KMH = 30
+        settings.DISPATCH_ROUTE_FACTOR = 1.5
+        assert estimate_eta_seconds(10) == pytest.approx(1800)
+        assert estimate_eta_seconds(0) == 0
+        assert len(DriverPositions.from_entries([])) == 0
+
+
+@pytest.mark.django_db
+class TestDriverGeoQuerySet:
+    def make_driver(self, username, latitude, longitude, **fields):
+        user = User.objects.create_user(
+            username=username, password="testpass123", user_type=User.UserType.DRIVER
+        )
+        return Driver.objects.create(
+            user=user,
+            latitude=Decimal(latitude),
+            longitude=Decimal(longitude),
+            is_online=True,
+            **fields,
+        )
+
+    def test_within_radius_refines_bounding_box(self):
+        near = self.make_driver("near", "40.720000", "-74.000000")
+        corner = self.make_driver("corner", "40.790000", "-73.900000")
+        self.make_driver("far", "41.500000", "-74.000000")
+
+        in_box = Driver.objects.within_bounding_box(40.71, -74.0, 10)
+        assert set(in_box) == {near, corner}
+
+        nearby = Driver.objects.within_radius(40.71, -74.0, 10)
+        assert nearby == [near]
+        assert nearby[0].distance_km == pytest.approx(
+            haversine_km(40.71, -74.0, 40.72, -74.0)
+        )
+
+    def test_available_excludes_busy_drivers(self):
+        free = self.make_driver("free", "40.720000", "-74.000000")
+        self.make_driver("busy", "40.715000", "-74.000000", is_busy=True)
+
+        assert Driver.objects.available().within_radius(40.71, -74.0, 5) == [free]
+
+
+@pytest.fixture
+def availability_backend(backend_factory):
+    return backend_factory(InMemoryAvailabilityBackend, RedisGeoAvailabilityBackend)
+
+
+class TestAvailabilityBackends:
+    PROFILE = {
+        "username": "driver1",
+        "phone_number": "",
+        "vehicle_number": "ABC123",
+        "vehicle_model": "Toyota Camry",
+    }
+
+    def test_search_returns_closest_first(self, availability_backend):
+        availability_backend.add(1, 40.7128, -74.0060, self.PROFILE)
+        availability_backend.add(2, 40.7300, -74.0000, self.PROFILE)
+        availability_backend.add(3, 41.5000, -74.0000, self.PROFILE)
+
+        found = availability_backend.search(40.7130, -74.0050, 10, 5)
+        assert [driver.id for driver in found] == [1, 2]
+        assert found[0].vehicle_number == "ABC123"
+        assert found[0].latitude == pytest.approx(40.7128, abs=1e-5)
+
+    def test_driver_ids_and_version(self, availability_backend):
+        version = availability_backend.version()
+        availability_backend.add(1, 40.7128, -74.0060, self.PROFILE)
+        availability_backend.add(2, 40.7300, -74.0000, self.PROFILE)
+        assert sorted(availability_backend.driver_ids()) == [1, 2]
+        assert availability_backend.version() == version + 2
+
+        availability_backend.remove(1)
+        availability_backend.remove(1)
+        assert availability_backend.driver_ids() == [2]
+        assert availability_backend.version() == version + 3
+
+    def test_remove_and_replace(self, availability_backend):
+        availability_backend.add(1, 40.7128, -74.0060, self.PROFILE)
+        availability_backend.remove(1)
+        assert availability_backend.search(40.7128, -74.0060, 10, 5) == []
+        assert not availability_backend.is_loaded()
+
+        availability_backend.replace([(2, 40.7300, -74.0000, self.PROFILE)])
+        assert availability_backend.is_loaded()
+        assert [d.id for d in availability_backend.search(40.73, -74.0, 1, 5)] == [2]
+
+    def test_add_and_remove_return_previous_position(self, availability_backend):
+        assert availability_backend.add(1, 40.7128, -74.0060, self.PROFILE) is None
+        previous = availability_backend.add(1, 40.7300, -74.0000, self.PROFILE)
+        assert previous == pytest.approx((40.7128, -74.0060), abs=1e-5)
+
+        previous = availability_backend.remove(1)
+        assert previous == pytest.approx((40.7300, -74.0000), abs=1e-5)
+        assert availability_backend.remove(1) is None
+
+    def test_within_box(self, availability_backend):
+        availability_backend.add(1, 40.7128, -74.0060, self.PROFILE)
+        availability_backend.add(2, 40.7300, -73.9000, self.PROFILE)
+        availability_backend.add(3, 41.5000, -74.0000, self.PROFILE)
+
+        found = availability_backend.within_box(40.70, 40.75, -74.01, -73.95)
+        assert [driver.id for driver in found] == [1]
+        assert found[0].vehicle_number == "ABC123"
+
+
+@pytest.mark.django_db
+class TestAvailabilitySet:
+    def assert_consistent(self):
+        expected = set(Driver.objects.available().values_list("id", flat=True))
+        assert set(get_availability_backend().driver_ids()) == expected
+        assert {
+            driver.id for driver in DriverService.get_available_drivers()
+        } == expected
+
+    def test_follows_every_transition(self):
+        rng = random.Random(7)
+        drivers = [
+            Driver.objects.create(
+                user=User.objects.create_user(
+                    username=f"driver_{i}", user_type=User.UserType.DRIVER
+                )
+            )
+            for i in range(6)
+        ]
+        self.assert_consistent()
+
+        for _ in range(200):
+            driver = rng.choice(drivers)
+            action = rng.choice(["online", "offline", "busy", "free", "move", "claim"])
+            if action == "online":
+                DriverService.set_driver_online(driver)
+            elif action == "offline":
+                DriverService.set_driver_offline(driver)
+            elif action == "busy":
+                DriverService.set_driver_busy(driver, is_busy=True)
+            elif action == "free":
+                DriverService.set_driver_busy(driver, is_busy=False)
+            elif action == "move":
+                DriverService.update_driver_location(
+                    driver,
+                    round(40.7 + rng.uniform(-0.05, 0.05), 6),
+                    round(-74.0 + rng.uniform(-0.05, 0.05), 6),
+                )
+            elif DriverService.claim_driver(driver.pk):
+                driver.is_busy = True
+            self.assert_consistent()
+
+    def test_freed_driver_is_listed_without_rebuild(self, driver_profile):
+        DriverService.set_driver_busy(driver_profile, is_busy=True)
+        assert not DriverService.get_available_drivers().exists()
+        busy_version = DriverService.get_availability_version()
+
+        with CaptureQueriesContext(connection) as queries:
+            DriverService.set_driver_busy(driver_profile, is_busy=False)
+            listed = list(DriverService.get_available_drivers())
+
+        assert listed == [driver_profile]
+        assert len(queries) == 2
+        assert DriverService.get_availability_version() > busy_version
+
+    def test_version_ignores_noop_removal(self, driver_profile):
+        DriverService.set_driver_offline(driver_profile)
+        version = DriverService.get_availability_version()
+        DriverService.set_driver_offline(driver_profile)
+        assert DriverService.get_availability_version() == version
+
+
+@pytest.mark.django_db
+class TestAvailabilityRebuild:
+    @pytest.fixture
+    def rebuilds(self, monkeypatch):
+        backend = get_availability_backend()
+        calls = []
+        original = backend.replace
+
+        def replace(entries, rebuild_seconds=0.0):
+            calls.append(rebuild_seconds)
+            original(entries, rebuild_seconds)
+
+        monkeypatch.setattr(backend, "replace", replace)
+        yield calls
+        cache.delete(DriverService.REBUILD_LEASE_KEY)
+
+    def test_expired_set_is_rebuilt_once(self, driver_profile, rebuilds):
+        get_availability_backend().clear()
+
+        assert list(DriverService.get_available_drivers()) == [driver_profile]
+        assert list(DriverService.get_available_drivers()) == [driver_profile]
+        assert len(rebuilds) == 1
+        assert cache.get(DriverService.REBUILD_LEASE_KEY) is None
+
+    def test_waits_for_lease_holder_instead_of_rebuilding(
+        self, settings, driver_profile, rebuilds
+    ):
+        settings.DRIVER_INDEX_REBUILD_WAIT_SECONDS = 0.1
+        get_availability_backend().clear()
+        cache.add(DriverService.REBUILD_LEASE_KEY, 1, 10)
+
+        started = time.monotonic()
+        assert list(DriverService.get_available_drivers()) == []
+        assert time.monotonic() - started >= 0.1
+        assert rebuilds == []
+
+    def test_refreshes_early_near_expiry(
+        self, settings, monkeypatch, driver_profile, rebuilds
+    ):
+        get_availability_backend().replace([], rebuild_seconds=1.0)
+
+        monkeypatch.setattr("apps.drivers.services.random.random", lambda: 0.0)
+        list(DriverService.get_available_drivers())
+        assert rebuilds == [1.0]
+
+        settings.DRIVER_INDEX_REFRESH_SECONDS = 1
+        monkeypatch.setattr("apps.drivers.services.random.random", lambda: 0.9)
+        assert list(DriverService.get_available_drivers()) == [driver_profile]
+        assert len(rebuilds) == 2
+
+
+@pytest.mark.django_db
+class TestDriverDeltas:
+    @pytest.fixture
+    def published(self, monkeypatch):
+        published = []
+        monkeypatch.setattr(
+            "apps.drivers.services.publish_driver_changes", published.append
+        )
+        return published
+
+    def test_deltas_are_published_after_commit(
+        self, driver_profile, published, django_capture_on_commit_callbacks
+    ):
+        DriverService.get_available_drivers()
+        with django_capture_on_commit_callbacks(execute=True):
+            DriverService.set_driver_offline(driver_profile)
+            DriverService.set_driver_offline(driver_profile)
+            assert published == []
+
+        removed = {"action": "removed", "id": driver_profile.pk}
+        assert published == [
+            {
+                AVAILABLE_DRIVERS_GROUP: [removed],
+                tile_group_name(driver_tile(40.712776, -74.005974)): [removed],
+            }
+        ]
+
+    def test_lost_claim_publishes_stale_entry_removal(
+        self, driver_profile, published, django_capture_on_commit_callbacks
+    ):
+        DriverService.get_available_drivers()
+        Driver.objects.filter(pk=driver_profile.pk).update(is_busy=True)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            assert not DriverService.claim_driver(driver_profile.pk)
+
+        assert driver_profile.pk not in get_availability_backend().driver_ids()
+        assert published[-1][AVAILABLE_DRIVERS_GROUP] == [
+            {"action": "removed", "id": driver_profile.pk}
+        ]
+
+    def test_tiles_hear_about_drivers_crossing_them(
+        self, settings, driver_profile, published, django_capture_on_commit_callbacks
+    ):
+        settings.DRIVER_TILE_SIZE_DEG = 0.05
+        DriverService.get_available_drivers()
+        old_tile = tile_group_name(driver_tile(40.712776, -74.005974))
+        new_tile = tile_group_name(driver_tile(40.8, -74.0))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            DriverService.update_driver_location(driver_profile, 40.713, -74.006)
+        moved = {
+            "action": "moved",
+            "id": driver_profile.pk,
+            "latitude": "40.713000",
+            "longitude": "-74.006000",
+        }
+        assert published[-1] == {AVAILABLE_DRIVERS_GROUP: [moved], old_tile: [moved]}
+
+        with django_capture_on_commit_callbacks(execute=True):
+            DriverService.update_driver_location(driver_profile, 40.8, -74.0)
+        changes = published[-1]
+        assert changes[AVAILABLE_DRIVERS_GROUP][0]["action"] == "moved"
+        assert changes[old_tile] == [{"action": "removed", "id": driver_profile.pk}]
+        assert changes[new_tile][0]["action"] == "added"
+        assert changes[new_tile][0]["vehicle_number"] == "ABC123"
+
+    def test_tile_snapshot(self, settings, driver_profile):
+        settings.DRIVER_TILE_SIZE_DEG = 0.05
+        tile = driver_tile(40.712776, -74.005974)
+
+        drivers = DriverService.get_available_drivers_in_tiles([tile])
+        assert [driver["id"] for driver in drivers] == [driver_profile.pk]
+        assert drivers[0]["latitude"] == "40.712776"
+        assert DriverService.get_available_drivers_in_tiles([tile + 1]) == []
+
+
+@pytest.fixture
+def broadcast_buffer(backend_factory):
+    return backend_factory(InMemoryBroadcastBuffer, RedisBroadcastBuffer)
+
+
+class TestBroadcastBuffers:
+    def moved(self, driver_id, latitude):
+        return {
+            "action": "moved",
+            "id": driver_id,
+            "latitude": latitude,
+            "longitude": "-74.000000",
+        }
+
+    def test_keeps_last_change_per_driver_and_group(self, broadcast_buffer):
+        added = {**self.moved(1, "40.1"), "action": "added", "username": "driver1"}
+        broadcast_buffer.push({"all": [added], "tile.1": [added]})
+        broadcast_buffer.push({"all": [self.moved(1, "40.2"), self.moved(2, "40.3")]})
+        broadcast_buffer.push({"tile.1": [{"action": "removed", "id": 1}]})
+
+        changes, pushed = broadcast_buffer.drain()
+        assert pushed == 5
+        assert sorted(changes["all"], key=itemgetter("id")) == [
+            {**added, "latitude": "40.2"},
+            self.moved(2, "40.3"),
+        ]
+        assert changes["tile.1"] == [{"action": "removed", "id": 1}]
+        assert broadcast_buffer.drain() == ({}, 0)
+
+
+@pytest.mark.django_db
+class TestDriverBroadcaster:
+    def test_ticks_send_one_merged_frame_per_group(
+        self, settings, monkeypatch, driver_profile, django_capture_on_commit_callbacks
+    ):
+        settings.DRIVER_BROADCAST_TICK_MS = 250
+        published = []
+
+        def publish(changes):
+            published.append(changes)
+            return publish_driver_changes(changes)
+
+        monkeypatch.setattr("apps.drivers.services.publish_driver_changes", publish)
+        DriverService.get_available_drivers()
+        reset_counters(DRIVER_BROADCAST_COUNTERS)
+
+        with django_capture_on_commit_callbacks(execute=True):
+            for latitude in (40.713, 40.714, 40.715):
+                DriverService.update_driver_location(driver_profile, latitude, -74.006)
+        assert published == []
+
+        stats = DriverService.broadcast_driver_changes()
+        changes = published[-1]
+        assert len(changes) == 2
+        assert changes[AVAILABLE_DRIVERS_GROUP] == [
+            {
+                "action": "moved",
+                "id": driver_profile.pk,
+                "latitude": "40.715000",
+                "longitude": "-74.006000",
+            }
+        ]
+        assert stats.changes_in == 6
+        assert stats.frames_out == 2
+        assert stats.bytes_out > 0
+        assert get_counters(DRIVER_BROADCAST_COUNTERS) == dict(
+            zip(DRIVER_BROADCAST_COUNTERS, stats)
+        )
+        assert DriverService.broadcast_driver_changes() == (0, 0, 0)
+        reset_counters(DRIVER_BROADCAST_COUNTERS)
+
+
+class TestDriverSubscriptionSerializer:
+    def test_bbox_becomes_tiles(self, settings):
+        settings.DRIVER_TILE_SIZE_DEG = 0.05
+        serializer = DriverSubscriptionSerializer(
+            data={"bbox": ["40.71", "-74.01", "40.74", "-73.99"]}
+        )
+        assert serializer.is_valid(), serializer.errors
+        assert len(serializer.validated_data["tiles"]) == 2
+        assert driver_tile(40.712776, -74.005974) in serializer.validated_data["tiles"]
+
+    def test_rejects_large_or_ambiguous_areas(self, settings):
+        settings.DRIVER_TILE_SIZE_DEG = 0.05
+        settings.DRIVER_TILE_SUBSCRIPTION_LIMIT = 10
+        for data in (
+            {"bbox": [40.0, -75.0, 41.0, -73.0]},
+            {"bbox": [41.0, -74.0, 40.0, -73.0]},
+            {"tiles": list(range(11))},
+            {"bbox": [40.7, -74.0, 40.8, -73.9], "tiles": [1]},
+            {},
+        ):
+            assert not DriverSubscriptionSerializer(data=data).is_valid()
+
+    def test_stays_within_the_geo_latitude_range(self, settings):
+        settings.DRIVER_TILE_SIZE_DEG = 0.05
+        serializer = DriverSubscriptionSerializer(data={"bbox": [85, 10, 90, 10.01]})
+        assert serializer.is_valid(), serializer.errors
+        assert serializer.validated_data["tiles"] == sorted(
+            {driver_tile(lat, lon) for lat in (85.0, 85.05) for lon in (10.0, 10.01)}
+        )
+
+        for tiles in ([driver_tile(86.0, 10.0)], [driver_tile(-86.0, 10.0)], [10**12]):
+            assert not DriverSubscriptionSerializer(data={"tiles": tiles}).is_valid()
+
+
+@pytest.mark.django_db
+class TestCachedProfiles:
+    def test_driver_profile_is_served_from_cache(self, driver_user, driver_profile):
+        DriverService.get_or_create_driver(driver_user)
+        with CaptureQueriesContext(connection) as queries:
+            driver = DriverService.get_or_create_driver(driver_user)
+        assert driver == driver_profile
+        assert len(queries) == 0
+
+    def test_driver_writes_invalidate_profile(self, driver_user, driver_profile):
+        DriverService.get_or_create_driver(driver_user)
+        assert DriverService.claim_driver(driver_profile.pk)
+        assert DriverService.get_or_create_driver(driver_user).is_busy is True
+
+        driver = DriverService.get_or_create_driver(driver_user)
+        DriverService.set_driver_offline(driver)
+        assert DriverService.get_or_create_driver(driver_user).is_online is False
+
+        DriverService.update_driver_location(driver, 41.0, -73.0)
+        driver = DriverService.get_or_create_driver(driver_user)
+        assert (driver.latitude, driver.longitude) == (41.0, -73.0)
+
+    def test_stored_ping_keeps_concurrent_claim(
+        self, settings, driver_user, driver_profile
+    ):
+        settings.DRIVER_LOCATION_DEADBAND_METERS = 0
+        driver = DriverService.get_or_create_driver(driver_user)
+        assert DriverService.claim_driver(driver_profile.pk)
+
+        DriverService.update_driver_location(driver, 41.0, -73.0)
+        assert DriverService.get_or_create_driver(driver_user).is_busy is True
+
+    def test_session_user_is_served_from_cache(self, driver_user):
+        backend = CachedModelBackend()
+        assert backend.get_user(driver_user.pk) == driver_user
+        with CaptureQueriesContext(connection) as queries:
+            assert backend.get_user(str(driver_user.pk)) == driver_user
+        assert len(queries) == 0
+
+        driver_user.is_active = False
+        driver_user.save()
+        assert backend.get_user(driver_user.pk) is None
+
+    def test_cached_user_leaves_out_the_password(self, driver_user):
+        backend = CachedModelBackend()
+        backend.get_user(driver_user.pk)
+        assert "password" not in cache.get(f"users:{driver_user.pk}").__dict__
+
+        with CaptureQueriesContext(connection) as queries:
+            user = backend.get_user(driver_user.pk)
+            session_auth_hash = user.get_session_auth_hash()
+        assert len(queries) == 0
+        assert session_auth_hash == driver_user.get_session_auth_hash()
+
+        user.first_name = "Changed"
+        user.save()
+        driver_user.refresh_from_db()
+        assert driver_user.first_name == "Changed"
+        assert driver_user.check_password("testpass123")
+
+    def test_sessions_from_model_backend_still_authenticate(
+        self, client, driver_user, driver_profile
+    ):
+        client.force_login(
+            driver_user, backend="django.contrib.auth.backends.ModelBackend"
+        )
+        response = client.get(reverse("drivers:driver-status"))
+        assert response.status_code == 200
+
+
+@pytest.fixture
+def location_buffer(backend_factory):
+    return backend_factory(InMemoryLocationBuffer, RedisLocationBuffer)
+
+
+class TestLocationBuffers:
+    def test_keeps_latest_sample(self, location_buffer):
+        newer = BufferedLocation(40.713, -74.006, 20.0)
+        older = BufferedLocation(40.7, -74.0, 10.0)
+
+        assert location_buffer.put(1, newer) is True
+        assert location_buffer.put(1, older) is False
+        assert location_buffer.get_many([1, 2]) == {1: newer}
+
+    def test_drain_takes_changes_once(self, location_buffer):
+        location = BufferedLocation(40.713, -74.006, 20.0)
+        location_buffer.put(1, location)
+
+        assert location_buffer.drain() == {1: location}
+        assert location_buffer.drain() == {}
+        assert location_buffer.get_many([1]) == {1: location}
+
+        location_buffer.discard(1)
+        assert location_buffer.get_many([1]) == {}
+
+    def test_history_keeps_every_sample_in_order(self, location_buffer):
+        first = BufferedLocation(40.713, -74.006, 10.0)
+        second = BufferedLocation(40.714, -74.007, 20.0)
+        location_buffer.append_history(1, [first, second])
+        location_buffer.append_history(2, [first])
+
+        assert location_buffer.drain_history(2) == [(1, first), (1, second)]
+        assert location_buffer.drain_history(10) == [(2, first)]
+        assert location_buffer.drain_history(10) == []
+
+    def test_history_drops_oldest_samples_past_the_cap(self, settings, backend_factory):
+        settings.DRIVER_LOCATION_HISTORY_MAX_ITEMS = 2
+        buffer = backend_factory(InMemoryLocationBuffer, RedisLocationBuffer)
+        samples = [BufferedLocation(41.3, 69.2, float(i)) for i in range(3)]
+        buffer.append_history(1, samples[:2])
+        buffer.append_history(2, samples[2:])
+
+        assert buffer.drain_history(10) == [(1, samples[1]), (2, samples[2])]
+
+
+@pytest.mark.django_db
+class TestDriverStatusView:
+    def test_coordinates_are_json_numbers(self, driver_user, driver_profile):
+        api_client = APIClient()
+        api_client.force_authenticate(driver_user)
+        response = api_client.get(reverse("drivers:driver-status"))
+
+        data = json.loads(response.content)
+        assert data["latitude"] == 40.712776
+        assert data["longitude"] == -74.005974
+
+
+@pytest.mark.django_db
+class TestDriverLocationBatchView:
+    URL = "drivers:driver-location-batch"
+
+    def post_samples(self, driver_user, samples):
+        api_client = APIClient()
+        api_client.force_authenticate(driver_user)
+        return api_client.post(reverse(self.URL), {"samples": samples}, format="json")
+
+    def test_buffers_newest_sample_until_flush(self, driver_user, driver_profile):
+        response = self.post_samples(
+            driver_user,
+            [
+                {
+                    "latitude": "40.720000",
+                    "longitude": "-74.000000",
+                    "recorded_at": "2024-01-15T10:30:05Z",
+                },
+                {
+                    "latitude": "40.710000",
+                    "longitude": "-74.010000",
+                    "recorded_at": "2024-01-15T10:30:00Z",
+                },
+            ],
+        )
+        assert response.status_code == 202
+        assert response.data == {
+            "accepted": 2,
+            "latitude": "40.720000",
+            "longitude": "-74.000000",
+        }
+
+        driver_profile.refresh_from_db()
+        assert driver_profile.latitude == Decimal("40.712776")
+        assert DriverService.get_or_create_driver(driver_user).latitude == 40.72
+        nearest = DriverService.search_available_drivers(
+            Decimal("40.720000"), Decimal("-74.000000"), radius_km=0.1
+        )
+        assert [driver.id for driver in nearest] == [driver_profile.id]
+
+        assert DriverService.flush_buffered_locations() == 1
+        assert DriverService.flush_buffered_locations() == 0
+        driver_profile.refresh_from_db()
+        assert driver_profile.latitude == Decimal("40.720000")
+        assert driver_profile.longitude == Decimal("-74.000000")
+
+    def test_direct_update_supersedes_buffer(self, driver_user, driver_profile):
+        self.post_samples(
+            driver_user,
+            [
+                {
+                    "latitude": "40.720000",
+                    "longitude": "-74.000000",
+                    "recorded_at": "2024-01-15T10:30:05Z",
+                }
+            ],
+        )
+        DriverService.update_driver_location(
+            driver_profile, Decimal("40.750000"), Decimal("-73.990000")
+        )
+
+        assert get_location_buffer().get_many([driver_profile.id]) == {}
+        assert DriverService.flush_buffered_locations() == 0
+
+    def test_rejects_empty_batch(self, driver_user, driver_profile):
+        assert self.post_samples(driver_user, []).status_code == 400
+
+
+@pytest.mark.django_db
+class TestLocationHistory:
+    def test_every_ping_is_appended(self, settings, driver_profile):
+        settings.DRIVER_LOCATION_DEADBAND_METERS = 1000.0
+        DriverService.update_driver_location(
+            driver_profile, Decimal("40.750000"), Decimal("-73.990000")
+        )
+        DriverService.update_driver_location(
+            driver_profile, Decimal("40.750100"), Decimal("-73.990100")
+        )
+
+        assert LocationHistoryService.flush_history() == 2
+        assert LocationHistoryService.flush_history() == 0
+        sample = LocationSample.objects.order_by("id").last()
+        assert sample.latitude_e6 == 40750100
+        assert sample.longitude_e6 == -73990100
+
+    def test_track_is_range_of_driver_samples(self, driver_profile):
+        started = datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc)
+        DriverService.buffer_driver_locations(
+            driver_profile,
+            [
+                {
+                    "latitude": Decimal("40.720000"),
+                    "longitude": Decimal("-74.000000"),
+                    "recorded_at": started + timedelta(seconds=10),
+                },
+                {
+                    "latitude": Decimal("40.710000"),
+                    "longitude": Decimal("-74.010000"),
+                    "recorded_at": started,
+                },
+                {
+                    "latitude": Decimal("40.730000"),
+                    "longitude": Decimal("-74.020000"),
+                    "recorded_at": started + timedelta(hours=1),
+                },
+            ],
+        )
+        LocationHistoryService.flush_history()
+
+        track = LocationHistoryService.get_track(
+            driver_profile.pk, started, started + timedelta(minutes=5)
+        )
+        assert [(point.latitude, point.recorded_at) for point in track] == [
+            (40.71, started),
+            (40.72, started + timedelta(seconds=10)),
+        ]
+
+    def test_prune_drops_whole_days(self, driver_profile):
+        today = int(time.time()) // LocationHistoryService.SECONDS_PER_DAY
+        for day in (today - 10, today - 1, today):
+            LocationSample.objects.create(
+                driver_id=driver_profile.pk,
+                day=day,
+                recorded_at=day * LocationHistoryService.SECONDS_PER_DAY,
+                latitude_e6=40712776,
+                longitude_e6=-74005974,
+            )
+
+        assert LocationHistoryService.prune_history(keep_days=2) == 1
+        assert sorted(LocationSample.objects.values_list("day", flat=True)) == [
+            today - 1,
+            today,
+        ]
+
+
+@pytest.mark.django_db
+class TestAvailableDriversListView:
+    def test_radius_search(self, client_user, driver_profile):
+        api_client = APIClient()
+        api_client.force_authenticate(client_user)
+        url = reverse("drivers:available-drivers")
+
+        response = api_client.get(
+            url, {"latitude": "40.713000", "longitude": "-74.006000", "radius_km": 2}
+        )
+        assert response.status_code == 200
+        assert response.data[0]["id"] == driver_profile.id
+        assert response.data[0]["latitude"] == "40.712776"
+        assert response.data[0]["username"] == "driver1"
+
+        response = api_client.get(url, {"latitude": "41.5", "longitude": "-74.0"})
+        assert response.data == []
+
+    def test_full_list_is_rendered_once_per_version(self, client_user, driver_profile):
+        api_client = APIClient()
+        api_client.force_authenticate(client_user)
+        url = reverse("drivers:available-drivers")
+
+        response = api_client.get(url)
+        assert response.status_code == 200
+        assert response.json()[0]["latitude"] == "40.712776"
+        etag = response["ETag"]
+
+        with CaptureQueriesContext(connection) as queries:
+            assert api_client.get(url).content == response.content
+            response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response["ETag"] == etag
+        assert len(queries) == 0
+
+        DriverService.set_driver_busy(driver_profile, is_busy=True)
+        response = api_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+        assert response.json() == []
+        assert response["ETag"] != etag
+
+    def test_radius_search_requires_both_coordinates(self, client_user):
+        api_client = APIClient()
+        api_client.force_authenticate(client_user)
+
+        response = api_client.get(
+            reverse("drivers:available-drivers"), {"latitude": "40.7"}
+        )
+        assert response.status_code == 400
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+class TestAvailableDriversConsumer:
+    async def test_sends_rendered_list(self, driver_profile):
+        communicator = WebsocketCommunicator(
+            AvailableDriversConsumer.as_asgi(), "/ws/drivers/"
+        )
+        await communicator.connect()
+        response = await communicator.receive_json_from()
+        assert response["type"] == "driver_list"
+        assert [driver["latitude"] for driver in response["drivers"]] == ["40.712776"]
+
+        await communicator.send_json_to({"type": "get_drivers"})
+        assert await communicator.receive_json_from() == response
+        await communicator.disconnect()
+
+    async def test_sends_msgpack_list(self, driver_profile):
+        communicator = WebsocketCommunicator(
+            AvailableDriversConsumer.as_asgi(),
+            "/ws/drivers/",
+            subprotocols=[MSGPACK_SUBPROTOCOL],
+        )
+        await communicator.connect()
+        response = msgpack.unpackb(await communicator.receive_from())
+        assert response["type"] == "driver_list"
+        assert response["drivers"][0]["latitude"] == 40712776
+        await communicator.disconnect()
+
+    async def test_forwards_driver_update_messages(self, driver_profile):
+        communicator = WebsocketCommunicator(
+            AvailableDriversConsumer.as_asgi(), "/ws/drivers/"
+        )
+        await communicator.connect()
+        await communicator.receive_json_from()
+
+        drivers = [{"id": driver_profile.pk, "latitude": "40.712776"}]
+        await get_channel_layer().group_send(
+            AVAILABLE_DRIVERS_GROUP, {"type": "driver.update", "drivers": drivers}
+        )
+        assert await communicator.receive_json_from() == {
+            "type": "driver_update",
+            "drivers": drivers,
+        }
+        await communicator.disconnect()
+
+    async def test_sends_deltas_for_transitions(self, driver_profile):
+        communicator = WebsocketCommunicator(
+            AvailableDriversConsumer.as_asgi(), "/ws/drivers/"
+        )
+        await communicator.connect()
+        await communicator.receive_json_from()
+
+        await database_sync_to_async(DriverService.update_driver_location)(
+            driver_profile, 40.8, -74.1
+        )
+        assert await communicator.receive_json_from() == {
+            "type": "driver_delta",
+            "changes": [
+                {
+                    "action": "moved",
+                    "id": driver_profile.pk,
+                    "latitude": "40.800000",
+                    "longitude": "-74.100000",
+                }
+            ],
+        }
+
+        await database_sync_to_async(DriverService.set_driver_offline)(driver_profile)
+        response = await communicator.receive_json_from()
+        assert response["changes"] == [{"action": "removed", "id": driver_profile.pk}]
+
+        await database_sync_to_async(DriverService.set_driver_online)(driver_profile)
+        response = await communicator.receive_json_from()
+        assert response["changes"][0]["action"] == "added"
+        assert response["changes"][0]["vehicle_number"] == "ABC123"
+
+        await database_sync_to_async(DriverService.claim_driver)(driver_profile.pk)
+        response = await communicator.receive_json_from()
+        assert response["changes"] == [{"action": "removed", "id": driver_profile.pk}]
+        assert await communicator.receive_nothing()
+        await communicator.disconnect()
+
+    async def test_viewport_subscription(self, settings, driver_profile):
+        settings.DRIVER_TILE_SIZE_DEG = 0.05
+        communicator = WebsocketCommunicator(
+            AvailableDriversConsumer.as_asgi(),
+            "/ws/drivers/?bbox=40.71,-74.01,40.74,-73.99",
+        )
+        await communicator.connect()
+        response = await communicator.receive_json_from()
+        assert response["type"] == "driver_list"
+        assert len(response["tiles"]) == 2
+        assert [driver["id"] for driver in response["drivers"]] == [driver_profile.pk]
+
+        far_away = WebsocketCommunicator(
+            AvailableDriversConsumer.as_asgi(), "/ws/drivers/"
+        )
+        await far_away.connect()
+        await far_away.receive_json_from()
+        await far_away.send_json_to(
+            {"type": "subscribe", "bbox": [41, -75, 41.01, -74.99]}
+        )
+        assert (await far_away.receive_json_from())["drivers"] == []
+
+        await database_sync_to_async(DriverService.update_driver_location)(
+            driver_profile, 40.72, -74.003
+        )
+        response = await communicator.receive_json_from()
+        assert response["changes"][0]["action"] == "moved"
+
+        await database_sync_to_async(DriverService.update_driver_location)(
+            driver_profile, 40.9, -74.003
+        )
+        response = await communicator.receive_json_from()
+        assert response["changes"] == [{"action": "removed", "id": driver_profile.pk}]
+        assert await far_away.receive_nothing()
+
+        await communicator.send_json_to({"type": "subscribe", "tiles": [-1]})
+        assert (await communicator.receive_json_from())["type"] == "error"
+        await communicator.disconnect()
+        await far_away.disconnect()
+
+    async def test_backend_errors_become_error_frames(self, settings, monkeypatch):
+        def fail(tiles):
+            raise redis.ResponseError("invalid latitude")
+
+        monkeypatch.setattr(DriverService, "get_available_drivers_in_tiles", fail)
+        communicator = WebsocketCommunicator(
+            AvailableDriversConsumer.as_asgi(),
+            f"/ws/drivers/?tiles={driver_tile(40.71, -74.0)}",
+        )
+        await communicator.connect()
+        response = await communicator.receive_json_from()
+        assert response == {
+            "type": "error",
+            "errors": "Available drivers could not be loaded",
+        }
+        await communicator.disconnect()
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+class TestDriverTelemetryConsumer:
+    async def connect(self, user, subprotocols=None):
+        communicator = WebsocketCommunicator(
+            DriverTelemetryConsumer.as_asgi(),
+            "/ws/drivers/telemetry/",
+            subprotocols=subprotocols,
+        )
+        communicator.scope["user"] = user
+        connected, _ = await communicator.connect()
+        return communicator, connected
+
+    async def test_streams_location_and_status(self, driver_user, driver_profile):
+        communicator, connected = await self.connect(driver_user)
+        assert connected
+
+        await communicator.send_json_to(
+            {"type": "location", "latitude": "40.720000", "longitude": "-74.000000"}
+        )
+        response = await communicator.receive_json_from()
+        assert response == {
+            "type": "location",
+            "accepted": True,
+            "latitude": "40.720000",
+            "longitude": "-74.000000",
+        }
+
+        await communicator.send_json_to({"type": "offline"})
+        response = await communicator.receive_json_from()
+        assert response["type"] == "status"
+        assert response["is_online"] is False
+
+        await communicator.send_json_to({"type": "heartbeat"})
+        assert (await communicator.receive_json_from())["type"] == "heartbeat"
+
+        await communicator.send_json_to({"type": "location", "latitude": "100"})
+        assert (await communicator.receive_json_from())["type"] == "error"
+        await communicator.disconnect()
+
+        buffered = get_location_buffer().get_many([driver_profile.id])
+        assert buffered[driver_profile.id].latitude == 40.72
+
+    async def test_location_after_claim_elsewhere(self, driver_user, driver_profile):
+        communicator, connected = await self.connect(driver_user)
+        assert connected
+        channel_layer = get_channel_layer()
+        watcher = await channel_layer.new_channel()
+        await channel_layer.group_add(
+            driver_position_group_name(driver_profile.pk), watcher
+        )
+
+        assert await database_sync_to_async(DriverService.claim_driver)(
+            driver_profile.pk
+        )
+        await communicator.send_json_to(
+            {"type": "location", "latitude": "40.720000", "longitude": "-74.000000"}
+        )
+        assert (await communicator.receive_json_from())["accepted"] is True
+
+        assert driver_profile.pk not in get_availability_backend().driver_ids()
+        message = await channel_layer.receive(watcher)
+        assert message["type"] == "driver.position"
+        assert json.loads(message["frames"]["json"]["text_data"]) == {
+            "type": "driver_position",
+            "driver": driver_profile.pk,
+            "latitude": "40.720000",
+            "longitude": "-74.000000",
+        }
+        await communicator.disconnect()
+
+    async def test_rejects_non_drivers(self, client_user):
+        communicator, connected = await self.connect(client_user)
+        assert not connected
+
+    async def test_msgpack_subprotocol(self, driver_user, driver_profile):
+        communicator, connected = await self.connect(
+            driver_user, subprotocols=[MSGPACK_SUBPROTOCOL]
+        )
+        assert connected
+
+        await communicator.send_to(
+            bytes_data=msgpack.packb(
+                {
+                    "type": "location",
+                    "latitude": 40720000,
+                    "longitude": -74000000,
+                    "recorded_at": 1705314600,
+                }
+            )
+        )
+        response = msgpack.unpackb(await communicator.receive_from())
+        assert response == {
+            "type": "location",
+            "accepted": True,
+            "latitude": 40720000,
+            "longitude": -74000000,
+        }
+
+        await communicator.send_to(text_data='{"type": "heartbeat"}')
+        assert msgpack.unpackb(await communicator.receive_from())["type"] == "error"
+        await communicator.disconnect()
+
+
+class TestCoordinateField:
+    @pytest.mark.parametrize(
+        "value", ["40.712776", "-74.5", 40.712776, -180, "  12.000001", "0"]
+    )
+    def test_matches_decimal_field(self, value):
+        decimal_field = serializers.DecimalField(
+            max_digits=9, decimal_places=6, min_value=-180, max_value=180
+        )
+        field = CoordinateField(min_value=-180, max_value=180)
+
+        parsed = field.to_internal_value(value)
+        assert isinstance(parsed, float)
+        assert Decimal(field.to_representation(parsed)) == (
+            decimal_field.to_internal_value(value)
+        )
+        assert field.to_representation(parsed) == decimal_field.to_representation(
+            decimal_field.to_internal_value(value)
+        )
+
+    @pytest.mark.parametrize(
+        "value", ["abc", "", "nan", "inf", True, None, "40.7127761", 40.7127761, 181]
+    )
+    def test_rejects_what_decimal_field_rejects(self, value):
+        field = CoordinateField(min_value=-180, max_value=180)
+        with pytest.raises(serializers.ValidationError):
+            field.to_internal_value(value)
+
+    def test_renders_stored_decimals(self):
+        assert CoordinateField().to_representation(Decimal("40.7")) == "40.700000"
+
+
+class TestWireCodecs:
+    def test_msgpack_round_trip(self):
+        codec = negotiate_codec(["other", MSGPACK_SUBPROTOCOL])
+        recorded_at = datetime(2024, 1, 15, 10, 30, tzinfo=timezone.utc)
+        content = {
+            "type": "driver_list",
+            "drivers": [
+                {"id": 1, "latitude": "40.712776", "longitude": "-74.005974"},
+                {"id": 2, "latitude": None, "longitude": None},
+            ],
+            "recorded_at": recorded_at,
+        }
+
+        encoded = codec.encode(content)
+        assert "text_data" not in encoded
+        assert codec.decode(None, encoded["bytes_data"]) == {
+            "type": "driver_list",
+            "drivers": [
+                {
+                    "id": 1,
+                    "latitude": 40.712776,
+                    "longitude": -74.005974,
+                },
+                {"id": 2, "latitude": None, "longitude": None},
+            ],
+            "recorded_at": recorded_at,
+        }
+        assert len(encoded["bytes_data"]) < len(
+            JsonCodec().encode(content)["text_data"]
+        )
+
+    def test_frames_are_encoded_once_per_codec(self):
+        content = {
+            "type": "driver_delta",
+            "changes": [{"action": "moved", "id": 1, "latitude": Decimal("40.7")}],
+        }
+
+        frames = encode_frames(content)
+        assert frames.keys() == {"json", "msgpack"}
+        assert JsonCodec().decode(frames["json"]["text_data"], None) == {
+            "type": "driver_delta",
+            "changes": [{"action": "moved", "id": 1, "latitude": "40.7"}],
+        }
+        assert frames["msgpack"] == MsgpackCodec().encode(content)
+
+    def test_json_is_default(self):
+        codec = negotiate_codec([])
+        assert codec.subprotocol is None
+        assert codec.decode('{"type": "heartbeat"}', None) == {"type": "heartbeat"}
+        with pytest.raises(WireFormatError):
+            codec.decode(None, b"\x81")
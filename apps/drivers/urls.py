@@ -8,6 +8,11 @@ urlpatterns = [
     path("online/", views.DriverOnlineView.as_view(), name="driver-online"),
     path("offline/", views.DriverOfflineView.as_view(), name="driver-offline"),
     path("location/", views.DriverLocationUpdateView.as_view(), name="driver-location"),
+    path(
+        "location/batch/",
+        views.DriverLocationBatchView.as_view(),
+        name="driver-location-batch",
+    ),
     path("status/", views.DriverStatusView.as_view(), name="driver-status"),
     path(
         "available/", views.AvailableDriversListView.as_view(), name="available-drivers"
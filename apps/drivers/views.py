@@ -1,4 +1,6 @@
-from drf_spectacular.utils import extend_schema
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from drf_spectacular.utils import OpenApiParameter, extend_schema
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -11,6 +13,10 @@ from .serializers import (
     AvailableDriverSerializer,
     DriverLocationSerializer,
     DriverSerializer,
+    LocationBatchResponseSerializer,
+    LocationBatchSerializer,
+    NearbyDriverSerializer,
+    NearbyDriversQuerySerializer,
 )
 from .services import DriverService
 
@@ -103,6 +109,44 @@ class DriverLocationUpdateView(APIView):
         return Response(response_serializer.data, status=status.HTTP_200_OK)
 
 
+class DriverLocationBatchView(APIView):
+    permission_classes = [IsDriver]
+
+    @extend_schema(
+        tags=["Drivers"],
+        summary="Report a batch of driver locations",
+        description=(
+            "Accepts several timestamped GPS samples in one call. The newest "
+            "sample becomes the driver's current position immediately; it is "
+            "written to the database by the periodic location flush."
+        ),
+        request=LocationBatchSerializer,
+        responses={
+            202: LocationBatchResponseSerializer,
+            400: {"description": "Invalid location samples provided"},
+            401: {"description": "Authentication credentials were not provided"},
+            403: {"description": "Only drivers can perform this action"},
+        },
+    )
+    def post(self, request):
+        user: User = request.user
+        serializer = LocationBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        driver = DriverService.get_or_create_driver(user)
+        samples = serializer.validated_data["samples"]  # type: ignore
+        DriverService.buffer_driver_locations(driver, samples)
+
+        response_serializer = LocationBatchResponseSerializer(
+            {
+                "accepted": len(samples),
+                "latitude": driver.latitude,
+                "longitude": driver.longitude,
+            }
+        )
+        return Response(response_serializer.data, status=status.HTTP_202_ACCEPTED)
+
+
 class DriverStatusView(APIView):
     permission_classes = [IsDriver]
 
@@ -149,14 +193,65 @@ class AvailableDriversListView(APIView):
         description=(
             "Returns a list of all drivers who are currently online, not busy, "
             "and have their location set. These drivers are available for "
-            "automatic order assignments."
+            "automatic order assignments. When latitude and longitude are "
+            "given, only drivers within radius_km are returned, closest first, "
+            "with their distance_km. The full list carries an ETag; send it "
+            "back in If-None-Match to get 304 Not Modified while the list "
+            "is unchanged."
         ),
+        parameters=[
+            OpenApiParameter(
+                name="latitude",
+                type=float,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Latitude of the search center",
+            ),
+            OpenApiParameter(
+                name="longitude",
+                type=float,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Longitude of the search center",
+            ),
+            OpenApiParameter(
+                name="radius_km",
+                type=float,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Search radius in kilometers",
+            ),
+            OpenApiParameter(
+                name="limit",
+                type=int,
+                location=OpenApiParameter.QUERY,
+                required=False,
+                description="Maximum number of drivers to return",
+            ),
+        ],
         responses={
             200: AvailableDriverSerializer(many=True),
+            304: {"description": "The list matches the If-None-Match ETag"},
+            400: {"description": "Invalid search parameters provided"},
             401: {"description": "Authentication credentials were not provided"},
         },
     )
     def get(self, request):
-        available_drivers = DriverService.get_available_drivers()
-        serializer = AvailableDriverSerializer(available_drivers, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        if "latitude" in request.query_params or "longitude" in request.query_params:
+            query_serializer = NearbyDriversQuerySerializer(data=request.query_params)
+            query_serializer.is_valid(raise_exception=True)
+
+            nearby_drivers = DriverService.search_available_drivers(
+                **query_serializer.validated_data  # type: ignore
+            )
+            serializer = NearbyDriverSerializer(nearby_drivers, many=True)
+            return Response(serializer.data, status=status.HTTP_200_OK)
+
+        rendered = DriverService.get_rendered_available_drivers()
+        if rendered.etag in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(rendered.content, content_type="application/json")
+        response["ETag"] = rendered.etag
+        response["Cache-Control"] = "no-cache"
+        return response
@@ -0,0 +1,162 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Any, Dict, Final, FrozenSet, Iterable, Optional
+
+import msgpack
+import orjson
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .geo import from_microdegrees, to_microdegrees
+
+MSGPACK_SUBPROTOCOL: Final[str] = "drivers.msgpack.v1"
+COORDINATE_FIELDS: Final[FrozenSet[str]] = frozenset({"latitude", "longitude"})
+TIMESTAMP_FIELDS: Final[FrozenSet[str]] = frozenset({"recorded_at", "server_time"})
+
+
+# The keyword arguments for a consumer's ``send``: text_data or bytes_data.
+Frame = Dict[str, Any]
+
+
+class WireFormatError(ValueError):
+    pass
+
+
+class BaseCodec:
+    name: str = ""
+    subprotocol: Optional[str] = None
+
+    def encode(self, content: Any) -> Frame:
+        raise NotImplementedError
+
+    def decode(self, text_data: Optional[str], bytes_data: Optional[bytes]) -> Any:
+        raise NotImplementedError
+
+    def encode_rendered(
+        self, content: Dict[str, Any], field: str, rendered: bytes
+    ) -> Frame:
+        """
+        Encodes ``content`` with ``field`` set to an already rendered JSON
+        value.
+        """
+        return self.encode({**content, field: orjson.loads(rendered)})
+
+
+class JsonCodec(BaseCodec):
+    """
+    The default text frames: JSON with coordinates as decimal strings.
+    """
+
+    name = "json"
+
+    def encode(self, content: Any) -> Frame:
+        return {"text_data": _dump_json(content).decode()}
+
+    def encode_rendered(
+        self, content: Dict[str, Any], field: str, rendered: bytes
+    ) -> Frame:
+        # Splice the rendered bytes in rather than parsing and dumping them.
+        head = _dump_json(content)[:-1]
+        separator = b"," if content else b""
+        return {
+            "text_data": b"".join(
+                [head, separator, _dump_json(field), b":", rendered, b"}"]
+            ).decode()
+        }
+
+    def decode(self, text_data: Optional[str], bytes_data: Optional[bytes]) -> Any:
+        if text_data is None:
+            raise WireFormatError("Expected a text frame")
+        try:
+            return orjson.loads(text_data)
+        except orjson.JSONDecodeError as exc:
+            raise WireFormatError("Invalid JSON") from exc
+
+
+class MsgpackCodec(BaseCodec):
+    """
+    Binary frames carrying the same messages as MessagePack maps, with
+    latitude/longitude as integer microdegrees and timestamps as Unix seconds.
+    """
+
+    name = "msgpack"
+    subprotocol = MSGPACK_SUBPROTOCOL
+
+    def encode(self, content: Any) -> Frame:
+        return {"bytes_data": msgpack.packb(_pack(content), default=_pack_default)}
+
+    def decode(self, text_data: Optional[str], bytes_data: Optional[bytes]) -> Any:
+        if bytes_data is None:
+            raise WireFormatError("Expected a binary frame")
+        try:
+            return _unpack(msgpack.unpackb(bytes_data))
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise WireFormatError("Invalid MessagePack") from exc
+
+
+def negotiate_codec(subprotocols: Iterable[str]) -> BaseCodec:
+    """
+    Picks the binary codec when the client offers its subprotocol, JSON
+    otherwise, so existing clients are unaffected.
+    """
+    if MSGPACK_SUBPROTOCOL in subprotocols:
+        return MsgpackCodec()
+    return JsonCodec()
+
+
+CODECS: Final = (JsonCodec(), MsgpackCodec())
+
+
+def encode_frames(content: Any) -> Dict[str, Frame]:
+    """
+    Encodes a group message once per codec, keyed by codec name, so each
+    consumer forwards its frame instead of encoding the message again.
+    """
+    return {codec.name: codec.encode(content) for codec in CODECS}
+
+
+def _dump_json(value: Any) -> bytes:
+    return orjson.dumps(value, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value)
+    return DjangoJSONEncoder().default(value)
+
+
+def _pack(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {key: _pack_field(key, item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_pack(item) for item in value]
+    return value
+
+
+def _pack_field(field: str, value: Any) -> Any:
+    if value is None:
+        return None
+    if field in COORDINATE_FIELDS:
+        return to_microdegrees(value)
+    if field in TIMESTAMP_FIELDS and isinstance(value, str):
+        return datetime.fromisoformat(value).timestamp()
+    return _pack(value)
+
+
+def _pack_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot pack {type(value).__name__}")
+
+
+def _unpack(value: Any, field: Optional[str] = None) -> Any:
+    if isinstance(value, dict):
+        return {key: _unpack(item, key) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_unpack(item) for item in value]
+    if field in COORDINATE_FIELDS and isinstance(value, int):
+        return from_microdegrees(value)
+    if field in TIMESTAMP_FIELDS and isinstance(value, (int, float)):
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    return value
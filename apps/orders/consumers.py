@@ -0,0 +1,76 @@
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncWebsocketConsumer
+
+from apps.drivers.consumers import CodecConsumerMixin, GroupsConsumerMixin
+from apps.drivers.notifications import driver_position, driver_position_group_name
+from apps.drivers.services import DriverService
+
+from .models import Order
+from .notifications import order_group_name, order_update_payload
+from .services import OrderService
+
+
+class OrderStatusConsumer(
+    GroupsConsumerMixin, CodecConsumerMixin, AsyncWebsocketConsumer
+):
+    """
+    Pushes an order's status to its client and assigned driver instead of
+    them polling the order details: the current status on connect, then
+    every transition, and the driver's position while the order is assigned.
+    """
+
+    async def connect(self):
+        self.joined_groups = set()
+        order_id = int(self.scope["url_route"]["kwargs"]["order_id"])
+        user = self.scope.get("user")
+        if not user or not user.is_authenticated:
+            await self.close(code=4403)
+            return
+
+        # Join before reading the order so no transition falls in between.
+        await self.join_groups({order_group_name(order_id)})
+        order = await database_sync_to_async(self.get_order)(order_id)
+        if order is None or not (
+            order.client_id == user.pk
+            or (order.driver and order.driver.user_id == user.pk)
+        ):
+            await self.join_groups(set())
+            await self.close(code=4404 if order is None else 4403)
+            return
+
+        await self.accept_with_codec()
+        payload = order_update_payload(order)
+        await self.send_json({"type": "order_update", "order": payload})
+        await self.follow_driver(payload)
+        if self.is_assigned(payload) and order.driver.latitude is not None:
+            await self.send_json(driver_position(order.driver))
+
+    async def disconnect(self, close_code):
+        await self.join_groups(set())
+
+    async def order_update(self, event):
+        await self.send_frames(event["frames"])
+        await self.follow_driver(event["order"])
+
+    async def driver_position(self, event):
+        await self.send_frames(event["frames"])
+
+    async def follow_driver(self, payload):
+        """
+        Receives the driver's positions only while the order is assigned.
+        """
+        groups = {order_group_name(payload["id"])}
+        if self.is_assigned(payload):
+            groups.add(driver_position_group_name(payload["driver"]))
+        await self.join_groups(groups)
+
+    @staticmethod
+    def is_assigned(payload):
+        return payload["status"] == Order.OrderStatus.ASSIGNED and payload["driver"]
+
+    @staticmethod
+    def get_order(order_id):
+        order = OrderService.get_order_details(order_id)
+        if order and order.driver:
+            DriverService.with_buffered_locations([order.driver])
+        return order
@@ -0,0 +1,124 @@
+import math
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from django.db import connection
+
+
+@dataclass(frozen=True)
+class DispatchReport:
+    mode: str
+    orders: int
+    assigned: int
+    total_pickup_km: float
+    latency_ms: float
+
+
+def min_cost_assignment(cost: Sequence[Sequence[float]]) -> List[Tuple[int, int]]:
+    """
+    Hungarian algorithm: returns (row, column) pairs minimising the total
+    cost, matching min(rows, columns) pairs of a rectangular matrix.
+    """
+    rows = len(cost)
+    if rows == 0 or len(cost[0]) == 0:
+        return []
+
+    columns = len(cost[0])
+    if rows > columns:
+        transposed = [list(column) for column in zip(*cost)]
+        return sorted((row, col) for col, row in min_cost_assignment(transposed))
+
+    u = [0.0] * (rows + 1)
+    v = [0.0] * (columns + 1)
+    match = [0] * (columns + 1)
+    way = [0] * (columns + 1)
+
+    for row in range(1, rows + 1):
+        match[0] = row
+        col0 = 0
+        min_slack = [math.inf] * (columns + 1)
+        used = [False] * (columns + 1)
+
+        while True:
+            used[col0] = True
+            row0 = match[col0]
+            row_cost = cost[row0 - 1]
+            delta = math.inf
+            col1 = 0
+            for col in range(1, columns + 1):
+                if used[col]:
+                    continue
+                slack = row_cost[col - 1] - u[row0] - v[col]
+                if slack < min_slack[col]:
+                    min_slack[col] = slack
+                    way[col] = col0
+                if min_slack[col] < delta:
+                    delta = min_slack[col]
+                    col1 = col
+
+            for col in range(columns + 1):
+                if used[col]:
+                    u[match[col]] += delta
+                    v[col] -= delta
+                else:
+                    min_slack[col] -= delta
+
+            col0 = col1
+            if match[col0] == 0:
+                break
+
+        while col0:
+            col1 = way[col0]
+            match[col0] = match[col1]
+            col0 = col1
+
+    return sorted(
+        (match[col] - 1, col - 1) for col in range(1, columns + 1) if match[col]
+    )
+
+
+class BatchDispatcher:
+    """
+    Collects order IDs for a short window and hands them to ``dispatch`` in
+    one call so they can be matched against drivers together.
+    """
+
+    def __init__(
+        self,
+        window_seconds: float,
+        dispatch: Callable[[List[int]], DispatchReport],
+    ) -> None:
+        self.window_seconds = window_seconds
+        self._dispatch = dispatch
+        self._pending: List[int] = []
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+
+    @property
+    def pending(self) -> List[int]:
+        with self._lock:
+            return list(self._pending)
+
+    def submit(self, order_id: int) -> None:
+        with self._lock:
+            self._pending.append(order_id)
+            if self._timer is None:
+                self._timer = threading.Timer(self.window_seconds, self._on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self) -> Optional[DispatchReport]:
+        with self._lock:
+            order_ids, self._pending = self._pending, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        return self._dispatch(order_ids) if order_ids else None
+
+    def _on_timer(self) -> None:
+        try:
+            self.flush()
+        finally:
+            connection.close()
@@ -0,0 +1,151 @@
+import random
+import threading
+import time
+import uuid
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+
+from apps.drivers.availability import get_availability_backend
+from apps.drivers.models import Driver
+from apps.drivers.services import DriverService
+from apps.orders.models import Order
+from apps.orders.services import OrderService
+from apps.users.models import User
+
+USERNAME_PREFIX = "bench_claim_"
+
+
+class Command(BaseCommand):
+    help = (
+        "Creates orders from N parallel clients against a shared driver pool "
+        "and reports orders/sec and double assignments. Needs a database that "
+        "supports concurrent writers (PostgreSQL); benchmark data is removed "
+        "afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--clients", type=int, default=8)
+        parser.add_argument("--orders-per-client", type=int, default=50)
+        parser.add_argument("--drivers", type=int, default=200)
+        parser.add_argument("--latitude", type=float, default=41.311081)
+        parser.add_argument("--longitude", type=float, default=69.240562)
+        parser.add_argument("--spread-km", type=float, default=5.0)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        # A prefix per run, so only the users created here are ever deleted.
+        self.prefix = f"{USERNAME_PREFIX}{uuid.uuid4().hex[:8]}_"
+        self.user_ids = []
+
+        try:
+            clients = self._create_pool(rng, options)
+            elapsed, errors = self._run_clients(rng, clients, options)
+            self._report(elapsed, errors, options)
+        finally:
+            self._cleanup()
+
+    def _create_pool(self, rng, options):
+        spread = options["spread_km"] / 111.0
+        driver_users = User.objects.bulk_create(
+            User(username=f"{self.prefix}driver_{i}", user_type=User.UserType.DRIVER)
+            for i in range(options["drivers"])
+        )
+        self.user_ids += [user.pk for user in driver_users]
+        # Through the service, so the drivers reach the availability set.
+        for user in driver_users:
+            driver = Driver.objects.create(
+                user=user,
+                latitude=Decimal(
+                    f"{options['latitude'] + rng.uniform(-spread, spread):.6f}"
+                ),
+                longitude=Decimal(
+                    f"{options['longitude'] + rng.uniform(-spread, spread):.6f}"
+                ),
+            )
+            DriverService.set_driver_online(driver)
+
+        clients = User.objects.bulk_create(
+            User(username=f"{self.prefix}client_{i}", user_type=User.UserType.CLIENT)
+            for i in range(options["clients"])
+        )
+        self.user_ids += [user.pk for user in clients]
+        return clients
+
+    def _cleanup(self):
+        backend = get_availability_backend()
+        for driver_id in Driver.objects.filter(user__in=self.user_ids).values_list(
+            "pk", flat=True
+        ):
+            backend.remove(driver_id)
+        User.objects.filter(pk__in=self.user_ids).delete()
+
+    def _run_clients(self, rng, clients, options):
+        spread = options["spread_km"] / 111.0
+        errors = []
+        barrier = threading.Barrier(len(clients) + 1)
+
+        def run(client, seed):
+            client_rng = random.Random(seed)
+            barrier.wait()
+            try:
+                for _ in range(options["orders_per_client"]):
+                    OrderService.create_order(
+                        client=client,
+                        pickup_latitude=Decimal(
+                            f"{options['latitude'] + client_rng.uniform(-spread, spread):.6f}"
+                        ),
+                        pickup_longitude=Decimal(
+                            f"{options['longitude'] + client_rng.uniform(-spread, spread):.6f}"
+                        ),
+                    )
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=run, args=(client, rng.random()))
+            for client in clients
+        ]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - started, errors
+
+    def _report(self, elapsed, errors, options):
+        orders = Order.objects.filter(client__in=self.user_ids)
+        total = orders.count()
+        assigned = orders.filter(status=Order.OrderStatus.ASSIGNED)
+        double_assigned = (
+            assigned.values("driver")
+            .annotate(orders=Count("id"))
+            .filter(orders__gt=1)
+            .count()
+        )
+        busy_without_order = (
+            Driver.objects.filter(user__in=self.user_ids, is_busy=True).count()
+            - assigned.count()
+        )
+
+        self.stdout.write(f"Clients:              {options['clients']}")
+        self.stdout.write(f"Drivers:              {options['drivers']}")
+        self.stdout.write(f"Orders created:       {total}")
+        self.stdout.write(f"Orders assigned:      {assigned.count()}")
+        self.stdout.write(f"Elapsed:              {elapsed:.3f}s")
+        self.stdout.write(f"Throughput:           {total / elapsed:.1f} orders/sec")
+        self.stdout.write(f"Errors:               {len(errors)}")
+        self.stdout.write(f"Double assignments:   {double_assigned}")
+        self.stdout.write(f"Busy without order:   {busy_without_order}")
+
+        if double_assigned or busy_without_order or errors:
+            raise CommandError("Claiming is not consistent")
+        if not assigned.exists():
+            raise CommandError("No orders were assigned, so claiming was not exercised")
+        self.stdout.write(self.style.SUCCESS("No double assignments"))
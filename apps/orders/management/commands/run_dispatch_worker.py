@@ -0,0 +1,70 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from apps.orders.queues import get_dispatch_queue
+from apps.orders.services import OrderService
+
+
+class Command(BaseCommand):
+    help = (
+        "Assigns drivers to orders queued by create_order when "
+        "ORDER_DISPATCH_MODE is 'async'. Run several workers to scale dispatch."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch",
+            action="store_true",
+            help="Match each window of orders with min-cost assignment",
+        )
+        parser.add_argument(
+            "--window-ms",
+            type=int,
+            default=settings.ORDER_DISPATCH_WINDOW_MS,
+            help="How long to collect orders for one batch",
+        )
+        parser.add_argument("--max-batch", type=int, default=100)
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit as soon as the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        queue = get_dispatch_queue()
+        poll_timeout = 0.1 if options["once"] else 1.0
+
+        while True:
+            order_ids = queue.pop(options["max_batch"], timeout=poll_timeout)
+            if not order_ids:
+                if options["once"]:
+                    return
+                continue
+
+            if options["batch"]:
+                order_ids += self._collect_window(
+                    queue,
+                    options["window_ms"] / 1000,
+                    options["max_batch"] - len(order_ids),
+                )
+                report = OrderService.dispatch_orders_batch(order_ids)
+                self.stdout.write(str(report))
+            else:
+                for order_id in order_ids:
+                    if report := OrderService.dispatch_queued_order(order_id):
+                        self.stdout.write(f"Order #{order_id}: {report}")
+
+            if not options["once"]:
+                close_old_connections()
+
+    def _collect_window(self, queue, window_seconds, capacity):
+        collected = []
+        deadline = time.monotonic() + window_seconds
+        while len(collected) < capacity:
+            if (remaining := deadline - time.monotonic()) <= 0:
+                break
+            collected += queue.pop(capacity - len(collected), timeout=remaining)
+        return collected
@@ -0,0 +1,89 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from apps.orders.simulation import CitySimulation
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs a synthetic city through the dispatch services and reports "
+        "orders/sec, latency percentiles, queries per operation and cache hit "
+        "rate. Simulation data is removed afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--drivers", type=int, default=200)
+        parser.add_argument("--clients", type=int, default=50)
+        parser.add_argument(
+            "--duration", type=float, default=600.0, help="Simulated seconds"
+        )
+        parser.add_argument(
+            "--order-rate", type=float, default=1.0, help="Orders per simulated second"
+        )
+        parser.add_argument(
+            "--browse-rate",
+            type=float,
+            default=0.5,
+            help="Available-driver list requests per simulated second",
+        )
+        parser.add_argument("--ping-interval", type=float, default=5.0)
+        parser.add_argument("--trip-duration", type=float, default=300.0)
+        parser.add_argument("--step-km", type=float, default=0.05)
+        parser.add_argument("--latitude", type=float, default=41.311081)
+        parser.add_argument("--longitude", type=float, default=69.240562)
+        parser.add_argument("--spread-km", type=float, default=5.0)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument(
+            "--migrate",
+            action="store_true",
+            help="Apply migrations first, e.g. for the in-memory test database",
+        )
+
+    def handle(self, *args, **options):
+        if options["migrate"]:
+            call_command("migrate", verbosity=0)
+
+        report = CitySimulation(
+            drivers=options["drivers"],
+            clients=options["clients"],
+            duration_s=options["duration"],
+            order_rate=options["order_rate"],
+            browse_rate=options["browse_rate"],
+            ping_interval_s=options["ping_interval"],
+            trip_duration_s=options["trip_duration"],
+            step_km=options["step_km"],
+            latitude=options["latitude"],
+            longitude=options["longitude"],
+            spread_km=options["spread_km"],
+            seed=options["seed"],
+        ).run()
+
+        self.stdout.write(f"Simulated:            {report.simulated_seconds:.0f}s")
+        self.stdout.write(f"Elapsed:              {report.wall_seconds:.3f}s")
+        self.stdout.write(f"Orders created:       {report.orders_created}")
+        self.stdout.write(f"Orders assigned:      {report.orders_assigned}")
+        self.stdout.write(f"Orders completed:     {report.orders_completed}")
+        self.stdout.write(
+            f"Throughput:           {report.orders_per_second:.1f} orders/sec"
+        )
+        self.stdout.write(
+            f"Cache hit rate:       {report.cache_hit_rate:.1%} "
+            f"({report.cache_hits} hits, {report.cache_misses} misses)"
+        )
+        self.stdout.write(
+            "Location pings:       "
+            + ", ".join(
+                f"{count} {name}" for name, count in report.location_pings.items()
+            )
+        )
+        self.stdout.write("")
+        self.stdout.write(
+            f"{'operation':<10} {'calls':>7} {'p50 ms':>8} {'p95 ms':>8} "
+            f"{'p99 ms':>8} {'queries':>8}"
+        )
+        for name, stats in sorted(report.operations.items()):
+            self.stdout.write(
+                f"{name:<10} {stats.calls:>7} {stats.percentile(50):>8.2f} "
+                f"{stats.percentile(95):>8.2f} {stats.percentile(99):>8.2f} "
+                f"{stats.queries_per_call:>8.1f}"
+            )
@@ -0,0 +1,57 @@
+# Generated by Django 5.0.1 on 2026-10-17 18:03
+
+from django.conf import settings
+from django.db import migrations, models
+
+from apps.drivers.geo import region_key
+
+
+def populate_pickup_region(apps, schema_editor):
+    Order = apps.get_model("orders", "Order")
+    pending = Order.objects.filter(status="CREATED", pickup_region__isnull=True)
+    for order in pending.iterator():
+        order.pickup_region = region_key(
+            float(order.pickup_latitude),
+            float(order.pickup_longitude),
+            settings.DISPATCH_REGION_SIZE_DEG,
+        )
+        order.save(update_fields=["pickup_region"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("drivers", "0003_alter_driver_vehicle_model_and_more"),
+        ("orders", "0003_alter_order_dropoff_address_alter_order_notes_and_more"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="pickup_region",
+            field=models.BigIntegerField(
+                blank=True,
+                editable=False,
+                help_text="Dispatch region of the pickup location",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(populate_pickup_region, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("status", "CREATED")),
+                fields=["pickup_region", "created_at"],
+                name="orders_pending_region_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="order",
+            index=models.Index(
+                condition=models.Q(("status", "CREATED")),
+                fields=["created_at"],
+                name="orders_pending_idx",
+            ),
+        ),
+    ]
@@ -1,10 +1,22 @@
+from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
+from apps.drivers.geo import region_key
 from apps.drivers.models import Driver
+from apps.drivers.querysets import GeoQuerySet
 from apps.users.models import User
 
 
+class OrderQuerySet(GeoQuerySet):
+    latitude_field = "pickup_latitude"
+    longitude_field = "pickup_longitude"
+    region_field = "pickup_region"
+
+    def pending(self) -> "OrderQuerySet":
+        return self.filter(status=Order.OrderStatus.CREATED)
+
+
 class Order(models.Model):
     class OrderStatus(models.TextChoices):
         CREATED = "CREATED", "Created"
@@ -46,6 +58,12 @@ class Order(models.Model):
         default="",
         help_text="Pickup location address",
     )
+    pickup_region = models.BigIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        help_text="Dispatch region of the pickup location",
+    )
 
     dropoff_latitude = models.DecimalField(
         max_digits=9,
@@ -78,6 +96,8 @@ class Order(models.Model):
     assigned_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         db_table = "orders"
         verbose_name = "Order"
@@ -87,7 +107,26 @@ class Order(models.Model):
             models.Index(fields=["status", "created_at"]),
             models.Index(fields=["client", "status"]),
             models.Index(fields=["driver", "status"]),
+            models.Index(
+                fields=["pickup_region", "created_at"],
+                condition=models.Q(status="CREATED"),
+                name="orders_pending_region_idx",
+            ),
+            models.Index(
+                fields=["created_at"],
+                condition=models.Q(status="CREATED"),
+                name="orders_pending_idx",
+            ),
         ]
 
     def __str__(self) -> str:
         return f"Order #{self.pk} - {self.get_status_display()}"
+
+    def save(self, *args, **kwargs) -> None:
+        if self.pickup_latitude is not None and self.pickup_longitude is not None:
+            self.pickup_region = region_key(
+                float(self.pickup_latitude),
+                float(self.pickup_longitude),
+                settings.DISPATCH_REGION_SIZE_DEG,
+            )
+        super().save(*args, **kwargs)
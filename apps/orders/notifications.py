@@ -0,0 +1,37 @@
+from typing import Any, Dict
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+
+from apps.drivers.wire import encode_frames
+
+from .models import Order
+
+
+def order_group_name(order_id: int) -> str:
+    return f"order_{order_id}"
+
+
+def order_update_payload(order: Order) -> Dict[str, Any]:
+    return {
+        "id": order.pk,
+        "status": order.status,
+        "driver": order.driver_id,
+        "assigned_at": order.assigned_at.isoformat() if order.assigned_at else None,
+        "completed_at": (
+            order.completed_at.isoformat() if order.completed_at else None
+        ),
+    }
+
+
+def publish_order_update(order: Order) -> None:
+    if channel_layer := get_channel_layer():
+        payload = order_update_payload(order)
+        async_to_sync(channel_layer.group_send)(
+            order_group_name(order.pk),
+            {
+                "type": "order.update",
+                "order": payload,
+                "frames": encode_frames({"type": "order_update", "order": payload}),
+            },
+        )
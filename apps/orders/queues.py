@@ -0,0 +1,84 @@
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Final, List, Optional
+
+import redis
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+class BaseDispatchQueue:
+    """
+    FIFO of order IDs waiting for a dispatch worker.
+    """
+
+    def push(self, order_id: int) -> None:
+        raise NotImplementedError
+
+    def pop(self, max_items: int, timeout: float) -> List[int]:
+        """
+        Blocks up to ``timeout`` seconds for the first item, then returns it
+        together with whatever else is queued, up to ``max_items``.
+        """
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+
+class InMemoryDispatchQueue(BaseDispatchQueue):
+    def __init__(self) -> None:
+        self._items: Deque[int] = deque()
+        self._ready = threading.Condition()
+
+    def push(self, order_id: int) -> None:
+        with self._ready:
+            self._items.append(order_id)
+            self._ready.notify()
+
+    def pop(self, max_items: int, timeout: float) -> List[int]:
+        deadline = time.monotonic() + timeout
+        with self._ready:
+            while not self._items:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return []
+                self._ready.wait(remaining)
+
+            return [
+                self._items.popleft() for _ in range(min(max_items, len(self._items)))
+            ]
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class RedisDispatchQueue(BaseDispatchQueue):
+    KEY: Final[str] = "dispatch:orders"
+
+    def __init__(self, client: Optional[redis.Redis] = None) -> None:
+        self.client = client or redis.Redis.from_url(settings.REDIS_URL)
+
+    def push(self, order_id: int) -> None:
+        self.client.lpush(self.KEY, order_id)
+
+    def pop(self, max_items: int, timeout: float) -> List[int]:
+        if not (first := self.client.brpop(self.KEY, timeout=timeout)):
+            return []
+
+        order_ids = [int(first[1])]
+        if max_items > 1:
+            order_ids += [
+                int(item) for item in self.client.rpop(self.KEY, max_items - 1) or []
+            ]
+        return order_ids
+
+    def __len__(self) -> int:
+        return self.client.llen(self.KEY)
+
+
+@lru_cache(maxsize=None)
+def get_dispatch_queue() -> BaseDispatchQueue:
+    return import_string(settings.ORDER_DISPATCH_QUEUE_BACKEND)()
@@ -0,0 +1,10 @@
+from django.dispatch import receiver
+
+from apps.drivers.signals import driver_available
+
+from .services import OrderService
+
+
+@receiver(driver_available)
+def offer_pending_order(sender, driver, **kwargs) -> None:
+    OrderService.assign_pending_order(driver)
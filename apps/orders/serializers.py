@@ -2,7 +2,12 @@ from typing import Any, Dict
 
 from rest_framework import serializers
 
-from apps.drivers.serializers import AvailableDriverSerializer
+from apps.drivers.serializers import (
+    AvailableDriverSerializer,
+    CoordinateField,
+    LatitudeField,
+    LongitudeField,
+)
 from apps.users.serializers import UserSerializer
 
 from .models import Order
@@ -11,6 +16,10 @@ from .models import Order
 class OrderSerializer(serializers.ModelSerializer):
     client = UserSerializer(read_only=True)
     driver_detail = AvailableDriverSerializer(source="driver", read_only=True)
+    pickup_latitude = LatitudeField()
+    pickup_longitude = LongitudeField()
+    dropoff_latitude = LatitudeField(required=False, allow_null=True)
+    dropoff_longitude = LongitudeField(required=False, allow_null=True)
 
     class Meta:
         model = Order
@@ -44,6 +53,11 @@ class OrderSerializer(serializers.ModelSerializer):
 
 
 class OrderCreateSerializer(serializers.ModelSerializer):
+    pickup_latitude = LatitudeField()
+    pickup_longitude = LongitudeField()
+    dropoff_latitude = LatitudeField(required=False, allow_null=True)
+    dropoff_longitude = LongitudeField(required=False, allow_null=True)
+
     class Meta:
         model = Order
         fields = [
@@ -83,3 +97,9 @@ class OrderListSerializer(serializers.ModelSerializer):
             "assigned_at",
             "completed_at",
         ]
+
+
+class TrackPointSerializer(serializers.Serializer):
+    latitude = CoordinateField()
+    longitude = CoordinateField()
+    recorded_at = serializers.DateTimeField()
@@ -1,16 +1,25 @@
-from decimal import Decimal
-from typing import Optional
+import logging
+import time
+from typing import List, Optional, Sequence
 
+from django.conf import settings
 from django.db import transaction
 from django.db.models import QuerySet
 from django.utils import timezone
 from rest_framework.exceptions import ValidationError
 
+from apps.drivers.geo import Coordinate
 from apps.drivers.models import Driver
-from apps.drivers.services import DriverService
+from apps.drivers.scoring import DriverPositions
+from apps.drivers.services import DriverService, LocationHistoryService, TrackPoint
 from apps.users.models import User
 
+from .dispatch import BatchDispatcher, DispatchReport, min_cost_assignment
 from .models import Order
+from .notifications import publish_order_update
+from .queues import get_dispatch_queue
+
+logger = logging.getLogger(__name__)
 
 
 class OrderService:
@@ -18,11 +27,11 @@ class OrderService:
     @transaction.atomic
     def create_order(
         client: User,
-        pickup_latitude: Decimal,
-        pickup_longitude: Decimal,
+        pickup_latitude: Coordinate,
+        pickup_longitude: Coordinate,
         pickup_address: str = "",
-        dropoff_latitude: Optional[Decimal] = None,
-        dropoff_longitude: Optional[Decimal] = None,
+        dropoff_latitude: Optional[Coordinate] = None,
+        dropoff_longitude: Optional[Coordinate] = None,
         dropoff_address: str = "",
         notes: str = "",
     ) -> Order:
@@ -41,15 +50,90 @@ class OrderService:
             status=Order.OrderStatus.CREATED,
         )
 
-        if available_driver := OrderService._find_available_driver():
-            OrderService.assign_order_to_driver(order, available_driver)
+        if settings.ORDER_DISPATCH_MODE == "batch":
+            transaction.on_commit(lambda: batch_dispatcher.submit(order.pk))
+        elif settings.ORDER_DISPATCH_MODE == "async":
+            transaction.on_commit(lambda: get_dispatch_queue().push(order.pk))
+        else:
+            OrderService.dispatch_order(order)
 
         return order
 
     @staticmethod
-    def _find_available_driver() -> Optional[Driver]:
-        available_drivers = DriverService.get_available_drivers()
-        return available_drivers.first() if available_drivers.exists() else None
+    @transaction.atomic
+    def dispatch_queued_order(order_id: int) -> Optional[DispatchReport]:
+        order = (
+            Order.objects.select_for_update()
+            .filter(pk=order_id, status=Order.OrderStatus.CREATED)
+            .first()
+        )
+        return OrderService.dispatch_order(order) if order else None
+
+    @staticmethod
+    def dispatch_order(order: Order) -> DispatchReport:
+        started = time.perf_counter()
+
+        if candidate := DriverService.claim_nearest_available_driver(
+            order.pickup_latitude, order.pickup_longitude
+        ):
+            if not OrderService._mark_assigned(order, candidate.id):
+                DriverService.set_driver_busy(
+                    Driver.objects.get(pk=candidate.id), is_busy=False
+                )
+                candidate = None
+
+        report = DispatchReport(
+            mode="greedy",
+            orders=1,
+            assigned=int(candidate is not None),
+            total_pickup_km=candidate.distance_km if candidate else 0.0,
+            latency_ms=(time.perf_counter() - started) * 1000,
+        )
+        logger.debug("Dispatch report: %s", report)
+        return report
+
+    @staticmethod
+    def dispatch_orders_batch(order_ids: Sequence[int]) -> DispatchReport:
+        started = time.perf_counter()
+        orders: List[Order] = list(
+            Order.objects.filter(id__in=order_ids, status=Order.OrderStatus.CREATED)
+        )
+        pickups = [(o.pickup_latitude, o.pickup_longitude) for o in orders]
+        drivers = DriverService.find_candidate_drivers(pickups) if orders else []
+
+        radius_km = settings.DISPATCH_SEARCH_RADIUS_KM
+        positions = DriverPositions.from_entries(
+            (d.pk, d.latitude, d.longitude) for d in drivers  # type: ignore[misc]
+        )
+        distances = [
+            positions.distances_km(float(lat), float(lon)) for lat, lon in pickups
+        ]
+        unreachable = radius_km * (len(orders) + len(drivers) + 1)
+        cost = [
+            [km if km <= radius_km else unreachable for km in row] for row in distances
+        ]
+
+        assigned = 0
+        total_pickup_km = 0.0
+        for row, col in min_cost_assignment(cost):
+            if distances[row][col] > radius_km:
+                continue
+            try:
+                OrderService.assign_order_to_driver(orders[row], drivers[col])
+            except ValidationError:
+                continue
+            assigned += 1
+            total_pickup_km += distances[row][col]
+
+        report = DispatchReport(
+            mode="batch",
+            orders=len(orders),
+            assigned=assigned,
+            total_pickup_km=total_pickup_km,
+            latency_ms=(time.perf_counter() - started) * 1000,
+        )
+        logger.info("Dispatch report: %s", report)
+        return report
 
     @staticmethod
     @transaction.atomic
@@ -57,17 +141,40 @@ class OrderService:
         if order.status != Order.OrderStatus.CREATED:
             raise ValidationError("Order is not in CREATED status")
 
-        if not driver.is_available:
+        if not DriverService.claim_driver(driver.pk):
             raise ValidationError("Driver is not available")
 
+        if not OrderService._mark_assigned(order, driver.pk):
+            # The rollback undoes the claim's row but not the availability
+            # set, so hand the driver back explicitly.
+            DriverService.set_driver_busy(driver, is_busy=False)
+            raise ValidationError("Order is not in CREATED status")
+
+        driver.is_busy = True
         order.driver = driver
-        order.status = Order.OrderStatus.ASSIGNED
-        order.assigned_at = timezone.now()
-        order.save(update_fields=["driver", "status", "assigned_at"])
+        return order
 
-        DriverService.set_driver_busy(driver, is_busy=True)
+    @staticmethod
+    def _mark_assigned(order: Order, driver_id: int) -> bool:
+        """
+        Assigns the order unless it left CREATED after ``order`` was read, as
+        when the pending-order drain assigned it in the meantime.
+        """
+        assigned_at = timezone.now()
+        if not Order.objects.filter(
+            pk=order.pk, status=Order.OrderStatus.CREATED
+        ).update(
+            driver=driver_id,
+            status=Order.OrderStatus.ASSIGNED,
+            assigned_at=assigned_at,
+        ):
+            return False
 
-        return order
+        order.driver_id = driver_id
+        order.status = Order.OrderStatus.ASSIGNED
+        order.assigned_at = assigned_at
+        transaction.on_commit(lambda: publish_order_update(order))
+        return True
 
     @staticmethod
     @transaction.atomic
@@ -78,16 +185,59 @@ class OrderService:
         order.status = Order.OrderStatus.COMPLETED
         order.completed_at = timezone.now()
         order.save(update_fields=["status", "completed_at"])
+        transaction.on_commit(lambda: publish_order_update(order))
 
         if order.driver:
             DriverService.set_driver_busy(order.driver, is_busy=False)
 
         return order
 
+    @staticmethod
+    @transaction.atomic
+    def assign_pending_order(driver: Driver) -> Optional[Order]:
+        if driver.latitude is None or driver.longitude is None:
+            return None
+
+        pending = (
+            Order.objects.pending()
+            .order_by("created_at")
+            .within_radius(
+                driver.latitude,
+                driver.longitude,
+                settings.DISPATCH_SEARCH_RADIUS_KM,
+                scan_limit=settings.DISPATCH_BACKLOG_SCAN_LIMIT,
+                nearest_first=False,
+            )
+        )
+
+        for order in pending:
+            claimed = Order.objects.filter(
+                pk=order.pk, status=Order.OrderStatus.CREATED
+            ).update(
+                driver=driver,
+                status=Order.OrderStatus.ASSIGNED,
+                assigned_at=timezone.now(),
+            )
+            if not claimed:
+                continue
+
+            if not DriverService.claim_driver(driver.pk):
+                transaction.set_rollback(True)
+                return None
+
+            driver.is_busy = True
+            order.refresh_from_db()
+            transaction.on_commit(lambda: publish_order_update(order))
+            return order
+
+        return None
+
     @staticmethod
     def get_user_orders(user: User) -> QuerySet[Order]:
         if user.user_type == User.UserType.CLIENT:
-            return Order.objects.filter(client=user).select_related("driver__user")
+            return Order.objects.filter(client=user).select_related(
+                "driver__user", "driver__location"
+            )
 
         if user.user_type == User.UserType.DRIVER:
             if driver := Driver.objects.filter(user=user).first():
@@ -95,10 +245,28 @@ class OrderService:
 
         return Order.objects.none()
 
+    @staticmethod
+    def get_order_track(order: Order) -> List[TrackPoint]:
+        """
+        The assigned driver's path from assignment until completion, or until
+        now while the trip is in progress.
+        """
+        if not order.driver_id or not order.assigned_at:
+            return []
+        return LocationHistoryService.get_track(
+            order.driver_id, order.assigned_at, order.completed_at or timezone.now()
+        )
+
     @staticmethod
     def get_order_details(order_id: int) -> Optional[Order]:
         return (
             Order.objects.filter(id=order_id)
-            .select_related("client", "driver__user")
+            .select_related("client", "driver__user", "driver__location")
             .first()
         )
+
+
+batch_dispatcher = BatchDispatcher(
+    window_seconds=settings.ORDER_DISPATCH_WINDOW_MS / 1000,
+    dispatch=OrderService.dispatch_orders_batch,
+)
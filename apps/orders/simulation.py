@@ -0,0 +1,322 @@
+import heapq
+import math
+import random
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, Final, Iterator, List, Set, Tuple
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+
+from apps.common.metrics import get_counters
+from apps.drivers.availability import get_availability_backend
+from apps.drivers.geo import KM_PER_DEGREE
+from apps.drivers.metrics import LOCATION_PING_COUNTERS
+from apps.drivers.models import Driver
+from apps.drivers.services import DriverService
+from apps.users.models import User
+
+from .models import Order
+from .services import OrderService
+
+USERNAME_PREFIX: Final[str] = "sim_"
+
+_MISSING = object()
+
+
+@dataclass
+class OperationStats:
+    latencies_ms: List[float] = field(default_factory=list)
+    queries: int = 0
+
+    @property
+    def calls(self) -> int:
+        return len(self.latencies_ms)
+
+    @property
+    def queries_per_call(self) -> float:
+        return self.queries / self.calls if self.calls else 0.0
+
+    def percentile(self, percent: float) -> float:
+        if not self.latencies_ms:
+            return 0.0
+        ordered = sorted(self.latencies_ms)
+        rank = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+        return ordered[rank]
+
+
+@dataclass
+class SimulationReport:
+    simulated_seconds: float
+    wall_seconds: float = 0.0
+    orders_created: int = 0
+    orders_assigned: int = 0
+    orders_completed: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    operations: Dict[str, OperationStats] = field(default_factory=dict)
+    location_pings: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def orders_per_second(self) -> float:
+        return self.orders_created / self.wall_seconds if self.wall_seconds else 0.0
+
+    @property
+    def cache_hit_rate(self) -> float:
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else 0.0
+
+
+@contextmanager
+def count_cache_lookups() -> Iterator[Counter]:
+    """
+    Counts hits and misses on the default cache, plus availability set reads,
+    which miss when the set has to be rebuilt from the database.
+    """
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    original_get = backend.get
+    availability = get_availability_backend()
+    original_load_state = availability.load_state
+    counter: Counter = Counter()
+
+    def get(key, default=None, version=None):
+        value = original_get(key, _MISSING, version)
+        counter["hits" if value is not _MISSING else "misses"] += 1
+        return default if value is _MISSING else value
+
+    def load_state():
+        state = original_load_state()
+        counter["hits" if state else "misses"] += 1
+        return state
+
+    backend.get = get
+    availability.load_state = load_state  # type: ignore[method-assign]
+    try:
+        yield counter
+    finally:
+        del backend.get
+        del availability.load_state
+
+
+class CitySimulation:
+    """
+    Discrete-event run of a synthetic city through the real services: drivers
+    random-walk and report their location every ``ping_interval_s``, clients
+    order and browse drivers as Poisson processes, and trips end after about
+    ``trip_duration_s``. Simulated time is not slept, so the wall clock
+    measures only the service code.
+    """
+
+    def __init__(
+        self,
+        drivers: int = 200,
+        clients: int = 50,
+        duration_s: float = 600.0,
+        order_rate: float = 1.0,
+        browse_rate: float = 0.5,
+        ping_interval_s: float = 5.0,
+        trip_duration_s: float = 300.0,
+        step_km: float = 0.05,
+        latitude: float = 41.311081,
+        longitude: float = 69.240562,
+        spread_km: float = 5.0,
+        seed: int = 42,
+    ) -> None:
+        self.drivers = drivers
+        self.clients = clients
+        self.duration_s = duration_s
+        self.order_rate = order_rate
+        self.browse_rate = browse_rate
+        self.ping_interval_s = ping_interval_s
+        self.trip_duration_s = trip_duration_s
+        self.step_deg = step_km / KM_PER_DEGREE
+        self.latitude = latitude
+        self.longitude = longitude
+        self.spread_deg = spread_km / KM_PER_DEGREE
+        self.rng = random.Random(seed)
+
+        self._events: List[Tuple[float, int, str, int]] = []
+        self._sequence = 0
+        self._positions: Dict[int, Tuple[float, float]] = {}
+        self._waiting: Set[int] = set()
+        # A prefix per run, so only the users created here are ever deleted.
+        self._prefix = f"{USERNAME_PREFIX}{uuid.uuid4().hex[:8]}_"
+        self._user_ids: List[int] = []
+
+    def run(self) -> SimulationReport:
+        report = SimulationReport(simulated_seconds=self.duration_s)
+
+        try:
+            driver_users, client_users = self._populate()
+            self._schedule_initial(driver_users)
+
+            pings_before = get_counters(LOCATION_PING_COUNTERS)
+            with count_cache_lookups() as cache_lookups:
+                started = time.perf_counter()
+                self._run_events(report, driver_users, client_users)
+                report.wall_seconds = time.perf_counter() - started
+
+            report.location_pings = {
+                name.split(":")[-1]: value - pings_before[name]
+                for name, value in get_counters(LOCATION_PING_COUNTERS).items()
+            }
+
+            report.cache_hits = cache_lookups["hits"]
+            report.cache_misses = cache_lookups["misses"]
+            return report
+        finally:
+            self._cleanup()
+
+    def _populate(self) -> Tuple[List[User], List[User]]:
+        driver_users = User.objects.bulk_create(
+            User(username=f"{self._prefix}driver_{i}", user_type=User.UserType.DRIVER)
+            for i in range(self.drivers)
+        )
+        self._user_ids += [user.pk for user in driver_users]
+        for user in driver_users:
+            latitude, longitude = self._random_point()
+            self._positions[user.pk] = (latitude, longitude)
+            driver = Driver.objects.create(
+                user=user,
+                latitude=_coordinate(latitude),
+                longitude=_coordinate(longitude),
+            )
+            DriverService.set_driver_online(driver)
+
+        client_users = User.objects.bulk_create(
+            User(username=f"{self._prefix}client_{i}", user_type=User.UserType.CLIENT)
+            for i in range(self.clients)
+        )
+        self._user_ids += [user.pk for user in client_users]
+        return driver_users, client_users
+
+    def _schedule_initial(self, driver_users: List[User]) -> None:
+        for index, user in enumerate(driver_users):
+            offset = self.ping_interval_s * index / max(1, len(driver_users))
+            self._schedule(offset, "ping", index)
+        self._schedule(self.rng.expovariate(self.order_rate), "order", 0)
+        if self.browse_rate > 0:
+            self._schedule(self.rng.expovariate(self.browse_rate), "browse", 0)
+
+    def _schedule(self, at: float, kind: str, subject: int) -> None:
+        self._sequence += 1
+        heapq.heappush(self._events, (at, self._sequence, kind, subject))
+
+    def _run_events(
+        self,
+        report: SimulationReport,
+        driver_users: List[User],
+        client_users: List[User],
+    ) -> None:
+        while self._events:
+            now, _, kind, subject = heapq.heappop(self._events)
+            if now >= self.duration_s:
+                break
+
+            stats = report.operations.setdefault(kind, OperationStats())
+            reset_queries()
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                self._handle(now, kind, subject, report, driver_users, client_users)
+                stats.latencies_ms.append((time.perf_counter() - started) * 1000)
+            stats.queries += len(queries)
+
+    def _handle(
+        self,
+        now: float,
+        kind: str,
+        subject: int,
+        report: SimulationReport,
+        driver_users: List[User],
+        client_users: List[User],
+    ) -> None:
+        if kind == "ping":
+            user = driver_users[subject]
+            latitude, longitude = self._walk(*self._positions[user.pk])
+            self._positions[user.pk] = (latitude, longitude)
+            driver = DriverService.get_or_create_driver(user)
+            DriverService.update_driver_location(
+                driver, _coordinate(latitude), _coordinate(longitude)
+            )
+            self._schedule(now + self.ping_interval_s, "ping", subject)
+
+        elif kind == "order":
+            latitude, longitude = self._random_point()
+            order = OrderService.create_order(
+                client=self.rng.choice(client_users),
+                pickup_latitude=_coordinate(latitude),
+                pickup_longitude=_coordinate(longitude),
+            )
+            report.orders_created += 1
+            if order.status == Order.OrderStatus.ASSIGNED:
+                self._start_trip(now, order.pk, report)
+            else:
+                self._waiting.add(order.pk)
+            self._schedule(now + self.rng.expovariate(self.order_rate), "order", 0)
+
+        elif kind == "complete":
+            order = OrderService.get_order_details(subject)
+            OrderService.complete_order(order)  # type: ignore[arg-type]
+            report.orders_completed += 1
+            self._pick_up_drained_orders(now, report)
+
+        elif kind == "browse":
+            DriverService.get_rendered_available_drivers()
+            self._schedule(now + self.rng.expovariate(self.browse_rate), "browse", 0)
+
+    def _start_trip(self, now: float, order_id: int, report: SimulationReport) -> None:
+        report.orders_assigned += 1
+        duration = self.trip_duration_s * self.rng.uniform(0.5, 1.5)
+        self._schedule(now + duration, "complete", order_id)
+
+    def _pick_up_drained_orders(self, now: float, report: SimulationReport) -> None:
+        # A freed driver may have been handed a waiting order by the drain.
+        if not self._waiting:
+            return
+        for order_id in Order.objects.filter(
+            pk__in=self._waiting, status=Order.OrderStatus.ASSIGNED
+        ).values_list("pk", flat=True):
+            self._waiting.discard(order_id)
+            self._start_trip(now, order_id, report)
+
+    def _random_point(self) -> Tuple[float, float]:
+        return (
+            self.latitude + self.rng.uniform(-self.spread_deg, self.spread_deg),
+            self.longitude + self.rng.uniform(-self.spread_deg, self.spread_deg),
+        )
+
+    def _walk(self, latitude: float, longitude: float) -> Tuple[float, float]:
+        bearing = self.rng.uniform(0, 2 * math.pi)
+        latitude += self.step_deg * math.cos(bearing)
+        longitude += (
+            self.step_deg * math.sin(bearing) / math.cos(math.radians(latitude))
+        )
+        return (
+            _reflect(latitude, self.latitude, self.spread_deg),
+            _reflect(longitude, self.longitude, self.spread_deg),
+        )
+
+    def _cleanup(self) -> None:
+        backend = get_availability_backend()
+        for driver_id in Driver.objects.filter(user__in=self._user_ids).values_list(
+            "pk", flat=True
+        ):
+            backend.remove(driver_id)
+        User.objects.filter(pk__in=self._user_ids).delete()
+
+
+def _coordinate(value: float) -> Decimal:
+    return Decimal(f"{value:.6f}")
+
+
+def _reflect(value: float, center: float, spread: float) -> float:
+    if value > center + spread:
+        return 2 * (center + spread) - value
+    if value < center - spread:
+        return 2 * (center - spread) - value
+    return value
@@ -1,11 +1,27 @@
 from decimal import Decimal
+from io import StringIO
 
 import pytest
+from channels.db import database_sync_to_async
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
 from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.management import call_command
+from django.urls import reverse
 from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
 
+from apps.drivers.availability import get_availability_backend
+from apps.drivers.models import Driver
+from apps.drivers.services import DriverService, LocationHistoryService
+
+from .dispatch import min_cost_assignment
 from .models import Order
-from .services import OrderService
+from .queues import get_dispatch_queue
+from .routing import websocket_urlpatterns
+from .services import OrderService, batch_dispatcher
+from .simulation import USERNAME_PREFIX, CitySimulation
 
 User = get_user_model()
 
@@ -39,6 +55,25 @@ class TestOrderService:
         assert order.client == client_user
         assert order.status in [Order.OrderStatus.CREATED, Order.OrderStatus.ASSIGNED]
 
+    def test_create_order_assigns_nearest_driver(self, client_user, driver_profile):
+        near_user = User.objects.create_user(
+            username="driver2", password="testpass123", user_type=User.UserType.DRIVER
+        )
+        near_driver = Driver.objects.create(
+            user=near_user,
+            latitude=Decimal("40.758000"),
+            longitude=Decimal("-73.985000"),
+            is_online=True,
+        )
+
+        order = OrderService.create_order(
+            client=client_user,
+            pickup_latitude=Decimal("40.758896"),
+            pickup_longitude=Decimal("-73.985130"),
+        )
+        assert order.status == Order.OrderStatus.ASSIGNED
+        assert order.driver == near_driver
+
     def test_create_order_non_client(self, driver_user):
         with pytest.raises(ValidationError):
             OrderService.create_order(
@@ -57,6 +92,14 @@ class TestOrderService:
         assert assigned_order.status == Order.OrderStatus.ASSIGNED
         assert assigned_order.assigned_at is not None
 
+    def test_assign_order_to_stale_driver(self, order, driver_profile):
+        Driver.objects.filter(pk=driver_profile.pk).update(is_busy=True)
+
+        with pytest.raises(ValidationError):
+            OrderService.assign_order_to_driver(order, driver_profile)
+        order.refresh_from_db()
+        assert order.status == Order.OrderStatus.CREATED
+
     def test_complete_order(self, order, driver_profile):
         order.status = Order.OrderStatus.ASSIGNED
         order.driver = driver_profile
@@ -76,3 +119,332 @@ class TestOrderService:
 
         orders = OrderService.get_user_orders(driver_user)
         assert order in orders
+
+
+def make_driver(username, latitude, longitude):
+    user = User.objects.create_user(
+        username=username, password="testpass123", user_type=User.UserType.DRIVER
+    )
+    return Driver.objects.create(
+        user=user,
+        latitude=Decimal(latitude),
+        longitude=Decimal(longitude),
+        is_online=True,
+    )
+
+
+class TestMinCostAssignment:
+    def test_beats_greedy_choice(self):
+        assert min_cost_assignment([[1, 2], [1, 10]]) == [(0, 1), (1, 0)]
+
+    def test_rectangular_matrices(self):
+        assert min_cost_assignment([[5, 1, 3]]) == [(0, 1)]
+        assert min_cost_assignment([[4], [2], [3]]) == [(1, 0)]
+        assert min_cost_assignment([]) == []
+
+
+@pytest.mark.django_db
+class TestBatchDispatch:
+    def test_batch_minimises_total_pickup_distance(self, client_user):
+        driver_a = make_driver("driver_a", "40.700000", "-74.000000")
+        driver_b = make_driver("driver_b", "40.710000", "-74.000000")
+        first = Order.objects.create(
+            client=client_user,
+            pickup_latitude=Decimal("40.704900"),
+            pickup_longitude=Decimal("-74.000000"),
+        )
+        second = Order.objects.create(
+            client=client_user,
+            pickup_latitude=Decimal("40.690000"),
+            pickup_longitude=Decimal("-74.000000"),
+        )
+
+        report = OrderService.dispatch_orders_batch([first.pk, second.pk])
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        assert report.assigned == 2
+        assert first.driver == driver_b
+        assert second.driver == driver_a
+        assert report.total_pickup_km < 2
+
+    def test_create_order_in_batch_mode_defers_assignment(
+        self, settings, client_user, driver_profile, django_capture_on_commit_callbacks
+    ):
+        settings.ORDER_DISPATCH_MODE = "batch"
+        with django_capture_on_commit_callbacks(execute=True):
+            order = OrderService.create_order(
+                client=client_user,
+                pickup_latitude=Decimal("40.712776"),
+                pickup_longitude=Decimal("-74.005974"),
+            )
+        assert order.status == Order.OrderStatus.CREATED
+        assert batch_dispatcher.pending == [order.pk]
+
+        report = batch_dispatcher.flush()
+        order.refresh_from_db()
+        assert report.assigned == 1
+        assert order.driver == driver_profile
+
+    def test_order_assigned_during_batch_is_not_reassigned(
+        self, monkeypatch, client_user, driver_profile
+    ):
+        drained_by = make_driver("driver_b", "40.800000", "-74.100000")
+        order = Order.objects.create(
+            client=client_user,
+            pickup_latitude=Decimal("40.712776"),
+            pickup_longitude=Decimal("-74.005974"),
+        )
+        find_candidate_drivers = DriverService.find_candidate_drivers
+
+        def drain_meanwhile(pickups):
+            candidates = find_candidate_drivers(pickups)
+            Order.objects.filter(pk=order.pk).update(
+                driver=drained_by, status=Order.OrderStatus.ASSIGNED
+            )
+            return candidates
+
+        monkeypatch.setattr(
+            DriverService, "find_candidate_drivers", staticmethod(drain_meanwhile)
+        )
+        report = OrderService.dispatch_orders_batch([order.pk])
+
+        order.refresh_from_db()
+        driver_profile.refresh_from_db()
+        assert report.assigned == 0
+        assert order.driver == drained_by
+        assert driver_profile.is_busy is False
+        assert driver_profile.pk in get_availability_backend().driver_ids()
+
+
+@pytest.mark.django_db
+class TestPendingOrderDrain:
+    def create_pending(self, client_user, latitude, longitude):
+        return Order.objects.create(
+            client=client_user,
+            pickup_latitude=Decimal(latitude),
+            pickup_longitude=Decimal(longitude),
+        )
+
+    def test_pickup_region_is_stored(self, client_user):
+        order = self.create_pending(client_user, "40.712776", "-74.005974")
+        assert order.pickup_region is not None
+
+    def test_pending_pickups_within_radius(self, client_user):
+        near = self.create_pending(client_user, "40.720000", "-74.000000")
+        self.create_pending(client_user, "40.790000", "-73.900000")
+        assigned = self.create_pending(client_user, "40.711000", "-74.000000")
+        assigned.status = Order.OrderStatus.ASSIGNED
+        assigned.save()
+
+        nearby = Order.objects.pending().within_radius(40.71, -74.0, 10)
+        assert nearby == [near]
+        assert Order.objects.within_radius(40.71, -74.0, 10) == [assigned, near]
+
+    def test_freed_driver_takes_oldest_nearby_order(
+        self, order, driver_profile, client_user, django_capture_on_commit_callbacks
+    ):
+        Order.objects.filter(pk=order.pk).update(
+            status=Order.OrderStatus.ASSIGNED, driver=driver_profile
+        )
+        order.refresh_from_db()
+        driver_profile.is_busy = True
+        driver_profile.save()
+
+        far = self.create_pending(client_user, "41.500000", "-74.000000")
+        oldest = self.create_pending(client_user, "40.720000", "-74.000000")
+        newer = self.create_pending(client_user, "40.713000", "-74.006000")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            OrderService.complete_order(order)
+
+        oldest.refresh_from_db()
+        newer.refresh_from_db()
+        far.refresh_from_db()
+        driver_profile.refresh_from_db()
+        assert oldest.status == Order.OrderStatus.ASSIGNED
+        assert oldest.driver == driver_profile
+        assert newer.status == Order.OrderStatus.CREATED
+        assert far.status == Order.OrderStatus.CREATED
+        assert driver_profile.is_busy is True
+
+    def test_driver_going_online_takes_pending_order(
+        self, client_user, driver_profile, django_capture_on_commit_callbacks
+    ):
+        driver_profile.is_online = False
+        driver_profile.save()
+        pending = self.create_pending(client_user, "40.712776", "-74.005974")
+
+        with django_capture_on_commit_callbacks(execute=True):
+            DriverService.set_driver_online(driver_profile)
+
+        pending.refresh_from_db()
+        assert pending.driver == driver_profile
+
+
+@pytest.mark.django_db
+class TestAsyncDispatch:
+    def test_create_order_only_enqueues(
+        self, settings, client_user, driver_profile, django_capture_on_commit_callbacks
+    ):
+        settings.ORDER_DISPATCH_MODE = "async"
+        with django_capture_on_commit_callbacks(execute=True):
+            order = OrderService.create_order(
+                client=client_user,
+                pickup_latitude=Decimal("40.712776"),
+                pickup_longitude=Decimal("-74.005974"),
+            )
+        assert order.status == Order.OrderStatus.CREATED
+        assert len(get_dispatch_queue()) == 1
+
+        call_command("run_dispatch_worker", "--once", stdout=StringIO())
+
+        order.refresh_from_db()
+        assert order.status == Order.OrderStatus.ASSIGNED
+        assert order.driver == driver_profile
+        assert len(get_dispatch_queue()) == 0
+
+    def test_queued_order_is_dispatched_once(self, order, driver_profile):
+        assert OrderService.dispatch_queued_order(order.pk).assigned == 1
+        assert OrderService.dispatch_queued_order(order.pk) is None
+
+
+@pytest.mark.django_db
+class TestOrderTrackView:
+    def test_returns_driver_path_since_assignment(
+        self, order, client_user, driver_profile
+    ):
+        OrderService.assign_order_to_driver(order, driver_profile)
+        DriverService.update_driver_location(
+            driver_profile, Decimal("40.750000"), Decimal("-73.990000")
+        )
+        LocationHistoryService.flush_history()
+
+        api_client = APIClient()
+        api_client.force_authenticate(client_user)
+        response = api_client.get(reverse("orders:order-track", args=[order.pk]))
+
+        assert response.status_code == 200
+        assert [(point["latitude"], point["longitude"]) for point in response.data] == [
+            ("40.750000", "-73.990000")
+        ]
+
+    def test_other_clients_are_forbidden(self, order):
+        other = User.objects.create_user(
+            username="client2", password="testpass123", user_type=User.UserType.CLIENT
+        )
+        api_client = APIClient()
+        api_client.force_authenticate(other)
+        response = api_client.get(reverse("orders:order-track", args=[order.pk]))
+        assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+@pytest.mark.django_db(transaction=True)
+class TestOrderStatusConsumer:
+    async def connect(self, user, order_id):
+        communicator = WebsocketCommunicator(
+            URLRouter(websocket_urlpatterns), f"/ws/orders/{order_id}/"
+        )
+        communicator.scope["user"] = user
+        connected, code = await communicator.connect()
+        return communicator, connected, code
+
+    async def test_pushes_transitions_and_driver_positions(
+        self, order, client_user, driver_profile
+    ):
+        communicator, connected, _ = await self.connect(client_user, order.pk)
+        assert connected
+        response = await communicator.receive_json_from()
+        assert response["type"] == "order_update"
+        assert response["order"]["status"] == Order.OrderStatus.CREATED
+
+        await database_sync_to_async(OrderService.assign_order_to_driver)(
+            order, driver_profile
+        )
+        response = await communicator.receive_json_from()
+        assert response["order"]["status"] == Order.OrderStatus.ASSIGNED
+        assert response["order"]["driver"] == driver_profile.pk
+
+        await database_sync_to_async(DriverService.update_driver_location)(
+            driver_profile, 40.75, -73.99
+        )
+        assert await communicator.receive_json_from() == {
+            "type": "driver_position",
+            "driver": driver_profile.pk,
+            "latitude": "40.750000",
+            "longitude": "-73.990000",
+        }
+
+        await database_sync_to_async(OrderService.complete_order)(order)
+        response = await communicator.receive_json_from()
+        assert response["order"]["status"] == Order.OrderStatus.COMPLETED
+        assert response["order"]["completed_at"] is not None
+
+        await database_sync_to_async(DriverService.update_driver_location)(
+            driver_profile, 40.76, -73.98
+        )
+        assert await communicator.receive_nothing()
+        await communicator.disconnect()
+
+    async def test_assigned_order_starts_with_driver_position(
+        self, order, driver_user, driver_profile
+    ):
+        await database_sync_to_async(OrderService.assign_order_to_driver)(
+            order, driver_profile
+        )
+        communicator, connected, _ = await self.connect(driver_user, order.pk)
+        assert connected
+        assert (await communicator.receive_json_from())["order"]["status"] == (
+            Order.OrderStatus.ASSIGNED
+        )
+        response = await communicator.receive_json_from()
+        assert response["type"] == "driver_position"
+        assert response["latitude"] == "40.712776"
+        await communicator.disconnect()
+
+    async def test_rejects_other_users_and_unknown_orders(self, order, client_user):
+        other = await database_sync_to_async(User.objects.create_user)(
+            username="client2", password="testpass123", user_type=User.UserType.CLIENT
+        )
+        for user, order_id, expected_code in [
+            (other, order.pk, 4403),
+            (client_user, order.pk + 1, 4404),
+            (AnonymousUser(), order.pk, 4403),
+        ]:
+            communicator, connected, code = await self.connect(user, order_id)
+            assert (connected, code) == (False, expected_code)
+            await communicator.wait()
+
+
+@pytest.mark.django_db
+class TestCitySimulation:
+    def test_reports_throughput_latency_and_queries(self):
+        report = CitySimulation(
+            drivers=10, clients=3, duration_s=60, order_rate=0.5, trip_duration_s=20
+        ).run()
+
+        assert report.orders_created > 0
+        assert report.orders_assigned > 0
+        assert report.orders_per_second > 0
+        assert set(report.operations) == {"ping", "order", "browse", "complete"}
+        assert report.operations["ping"].calls == 10 * 60 // 5
+        assert report.operations["order"].queries_per_call > 0
+        assert report.operations["order"].percentile(95) > 0
+        assert report.cache_hits + report.cache_misses > 0
+        assert not User.objects.filter(username__startswith=USERNAME_PREFIX).exists()
+
+    def test_keeps_existing_users_with_the_prefix(self):
+        existing = User.objects.create_user(
+            username=f"{USERNAME_PREFIX}driver_0", password="testpass123"
+        )
+        CitySimulation(drivers=3, clients=1, duration_s=10).run()
+        assert User.objects.filter(pk=existing.pk).exists()
+
+    def test_command_output(self):
+        out = StringIO()
+        call_command(
+            "simulate_dispatch", "--drivers", "5", "--duration", "30", stdout=out
+        )
+        assert "orders/sec" in out.getvalue()
+        assert "p95 ms" in out.getvalue()
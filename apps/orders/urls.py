@@ -13,4 +13,5 @@ urlpatterns = [
         views.OrderCompleteView.as_view(),
         name="order-complete",
     ),
+    path("<int:order_id>/track/", views.OrderTrackView.as_view(), name="order-track"),
 ]
@@ -13,6 +13,7 @@ from .serializers import (
     OrderCreateSerializer,
     OrderListSerializer,
     OrderSerializer,
+    TrackPointSerializer,
 )
 from .services import OrderService
 
@@ -112,6 +113,49 @@ class OrderDetailView(APIView):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+class OrderTrackView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        tags=["Orders"],
+        summary="Get order track",
+        description=(
+            "Returns the assigned driver's recorded positions from assignment "
+            "until completion (or until now for a trip in progress), oldest "
+            "first. Only the order's client and assigned driver can view it."
+        ),
+        parameters=[
+            OpenApiParameter(
+                name="order_id",
+                type=int,
+                location=OpenApiParameter.PATH,
+                description="ID of the order",
+            ),
+        ],
+        responses={
+            200: TrackPointSerializer(many=True),
+            401: {"description": "Authentication credentials were not provided"},
+            403: {"description": "You don't have permission to view this order"},
+            404: {"description": "Order not found"},
+        },
+    )
+    def get(self, request, order_id):
+        order = OrderService.get_order_details(order_id)
+        if not order:
+            raise NotFound("Order not found")
+
+        user: User = request.user
+        if order.client != user and (
+            not hasattr(user, "driver_profile") or order.driver != user.driver_profile
+        ):
+            raise PermissionDenied("You don't have permission to view this order")
+
+        serializer = TrackPointSerializer(
+            OrderService.get_order_track(order), many=True
+        )
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
+
 class OrderCompleteView(APIView):
     permission_classes = [IsDriver]
     serializer_class = OrderSerializer
@@ -0,0 +1,39 @@
+import copy
+from typing import Any, Optional
+
+from django.contrib.auth.backends import ModelBackend
+
+from apps.common.caching import TieredCache
+
+from .models import User
+
+user_cache = TieredCache(
+    "users", max_entries=10_000, local_ttl=30, timeout=300, copy_values=True
+)
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    Loads the session's user through the tiered cache instead of querying
+    the ``users`` table on every request and WebSocket connect.
+    """
+
+    def get_user(self, user_id: Any) -> Optional[User]:
+        user = user_cache.get(user_id)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                user_cache.set(user_id, _without_password(user))
+            return user
+        return user if self.user_can_authenticate(user) else None
+
+
+def _without_password(user: User) -> User:
+    """
+    A copy to cache without the password hash. The field stays deferred:
+    reading it loads it from the database and ``save`` leaves it alone.
+    """
+    cached = copy.copy(user)
+    cached.cached_session_auth_hash = user.get_session_auth_hash()
+    del cached.password
+    return cached
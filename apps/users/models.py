@@ -1,3 +1,5 @@
+from typing import Optional
+
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
@@ -28,5 +30,12 @@ class User(AbstractUser):
         verbose_name_plural = "Users"
         ordering = ["-created_at"]
 
+    # Set on users served by CachedModelBackend, whose password hash is not
+    # cached, so that session checks don't load it.
+    cached_session_auth_hash: Optional[str] = None
+
     def __str__(self) -> str:
         return f"{self.username} ({self.get_user_type_display()})"
+
+    def get_session_auth_hash(self) -> str:
+        return self.cached_session_auth_hash or super().get_session_auth_hash()
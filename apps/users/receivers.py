@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import user_cache
+from .models import User
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs) -> None:
+    user_cache.invalidate([instance.pk])
@@ -10,12 +10,18 @@ os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 django_asgi_app = get_asgi_application()
 
 from apps.drivers import routing as drivers_routing  # noqa: E402
+from apps.orders import routing as orders_routing  # noqa: E402
 
 application = ProtocolTypeRouter(
     {
         "http": django_asgi_app,
         "websocket": AllowedHostsOriginValidator(
-            AuthMiddlewareStack(URLRouter(drivers_routing.websocket_urlpatterns))
+            AuthMiddlewareStack(
+                URLRouter(
+                    drivers_routing.websocket_urlpatterns
+                    + orders_routing.websocket_urlpatterns
+                )
+            )
         ),
     }
 )
@@ -100,6 +100,11 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "users.User"
+# ModelBackend stays listed so sessions stored under it keep authenticating.
+AUTHENTICATION_BACKENDS = [
+    "apps.users.backends.CachedModelBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
 
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
@@ -128,6 +133,11 @@ CORS_ALLOWED_ORIGINS = config(
 )
 CORS_ALLOW_CREDENTIALS = True
 
+REDIS_URL = (
+    f"redis://{config('REDIS_HOST', default='localhost')}:"
+    f"{config('REDIS_PORT', default=6379, cast=int)}"
+)
+
 CHANNEL_LAYERS = {
     "default": {
         "BACKEND": "channels_redis.core.RedisChannelLayer",
@@ -145,12 +155,91 @@ CHANNEL_LAYERS = {
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.redis.RedisCache",
-        "LOCATION": (
-            f"redis://{config('REDIS_HOST', default='localhost')}:"
-            f"{config('REDIS_PORT', default=6379, cast=int)}"
-        ),
+        "LOCATION": REDIS_URL,
     }
 }
+# Drops invalidated keys from the per-process tier of every tiered cache.
+TIERED_CACHE_INVALIDATION_BUS_BACKEND = config(
+    "TIERED_CACHE_INVALIDATION_BUS_BACKEND",
+    default="apps.common.caching.RedisInvalidationBus",
+)
+
+# Dispatch
+DRIVER_AVAILABILITY_BACKEND = config(
+    "DRIVER_AVAILABILITY_BACKEND",
+    default="apps.drivers.availability.RedisGeoAvailabilityBackend",
+)
+DRIVER_INDEX_CELL_SIZE_DEG = config(
+    "DRIVER_INDEX_CELL_SIZE_DEG", default=0.01, cast=float
+)
+DRIVER_INDEX_REFRESH_SECONDS = config(
+    "DRIVER_INDEX_REFRESH_SECONDS", default=60, cast=int
+)
+# Only the holder of the rebuild lease reloads an expired availability set;
+# other callers wait up to DRIVER_INDEX_REBUILD_WAIT_SECONDS for it. A higher
+# beta refreshes earlier ahead of expiry, 0 disables early refresh.
+DRIVER_INDEX_REBUILD_LEASE_SECONDS = config(
+    "DRIVER_INDEX_REBUILD_LEASE_SECONDS", default=10, cast=int
+)
+DRIVER_INDEX_REBUILD_WAIT_SECONDS = config(
+    "DRIVER_INDEX_REBUILD_WAIT_SECONDS", default=2.0, cast=float
+)
+DRIVER_INDEX_EARLY_REFRESH_BETA = config(
+    "DRIVER_INDEX_EARLY_REFRESH_BETA", default=1.0, cast=float
+)
+# WebSocket watchers can subscribe to the tiles of their viewport instead of
+# receiving every driver change; tiles are squares of this many degrees.
+DRIVER_TILE_SIZE_DEG = config("DRIVER_TILE_SIZE_DEG", default=0.05, cast=float)
+DRIVER_TILE_SUBSCRIPTION_LIMIT = config(
+    "DRIVER_TILE_SUBSCRIPTION_LIMIT", default=100, cast=int
+)
+# With a tick, driver changes are queued and run_driver_broadcaster sends
+# one merged frame per group per tick; 0 sends each change on commit.
+DRIVER_BROADCAST_TICK_MS = config("DRIVER_BROADCAST_TICK_MS", default=0, cast=int)
+DRIVER_BROADCAST_BUFFER_BACKEND = config(
+    "DRIVER_BROADCAST_BUFFER_BACKEND",
+    default="apps.drivers.broadcasts.RedisBroadcastBuffer",
+)
+DRIVER_LOCATION_BUFFER_BACKEND = config(
+    "DRIVER_LOCATION_BUFFER_BACKEND",
+    default="apps.drivers.locations.RedisLocationBuffer",
+)
+DRIVER_LOCATION_FLUSH_SECONDS = config(
+    "DRIVER_LOCATION_FLUSH_SECONDS", default=5.0, cast=float
+)
+# Oldest queued history samples are dropped past this, so a stopped flusher
+# can't grow the queue without bound.
+DRIVER_LOCATION_HISTORY_MAX_ITEMS = config(
+    "DRIVER_LOCATION_HISTORY_MAX_ITEMS", default=1_000_000, cast=int
+)
+# Pings that moved less than the dead-band, or that arrive sooner than the
+# minimum write interval after the last write, skip the row write and are
+# buffered for the location flush instead. 0 disables either check.
+DRIVER_LOCATION_DEADBAND_METERS = config(
+    "DRIVER_LOCATION_DEADBAND_METERS", default=20.0, cast=float
+)
+DRIVER_LOCATION_MIN_WRITE_INTERVAL_SECONDS = config(
+    "DRIVER_LOCATION_MIN_WRITE_INTERVAL_SECONDS", default=0.0, cast=float
+)
+DISPATCH_SEARCH_RADIUS_KM = config(
+    "DISPATCH_SEARCH_RADIUS_KM", default=10.0, cast=float
+)
+DISPATCH_CANDIDATE_LIMIT = config("DISPATCH_CANDIDATE_LIMIT", default=5, cast=int)
+DISPATCH_REGION_SIZE_DEG = config("DISPATCH_REGION_SIZE_DEG", default=0.05, cast=float)
+DISPATCH_BACKLOG_SCAN_LIMIT = config(
+    "DISPATCH_BACKLOG_SCAN_LIMIT", default=20, cast=int
+)
+DISPATCH_AVERAGE_SPEED_KMH = config(
+    "DISPATCH_AVERAGE_SPEED_KMH", default=30.0, cast=float
+)
+DISPATCH_ROUTE_FACTOR = config("DISPATCH_ROUTE_FACTOR", default=1.3, cast=float)
+# "greedy" assigns inside create_order, "batch" matches orders per window,
+# "async" only queues the order for run_dispatch_worker
+ORDER_DISPATCH_MODE = config("ORDER_DISPATCH_MODE", default="greedy")
+ORDER_DISPATCH_QUEUE_BACKEND = config(
+    "ORDER_DISPATCH_QUEUE_BACKEND", default="apps.orders.queues.RedisDispatchQueue"
+)
+ORDER_DISPATCH_WINDOW_MS = config("ORDER_DISPATCH_WINDOW_MS", default=1000, cast=int)
 
 SPECTACULAR_SETTINGS = {
     "TITLE": "Online Drive API",
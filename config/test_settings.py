@@ -1,3 +1,5 @@
+from decouple import config
+
 from .settings import *  # noqa: F403, F401
 
 DATABASES = {
@@ -14,5 +16,17 @@ CHANNEL_LAYERS = {
 CACHES = {
     "default": {
         "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        # Room for the simulation's profiles without culling the counters.
+        "OPTIONS": {"MAX_ENTRIES": 100_000},
     }
 }
+
+DRIVER_AVAILABILITY_BACKEND = "apps.drivers.availability.InMemoryAvailabilityBackend"
+DRIVER_LOCATION_BUFFER_BACKEND = "apps.drivers.locations.InMemoryLocationBuffer"
+DRIVER_BROADCAST_BUFFER_BACKEND = "apps.drivers.broadcasts.InMemoryBroadcastBuffer"
+ORDER_DISPATCH_QUEUE_BACKEND = "apps.orders.queues.InMemoryDispatchQueue"
+TIERED_CACHE_INVALIDATION_BUS_BACKEND = "apps.common.caching.InMemoryInvalidationBus"
+
+# A Redis database the tests may empty (e.g. redis://localhost:6379/15); the
+# tests that need a real Redis are skipped without it.
+TEST_REDIS_URL = config("TEST_REDIS_URL", default="")
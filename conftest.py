@@ -1,7 +1,13 @@
 import pytest
+import redis
+from django.conf import settings
 from django.contrib.auth import get_user_model
 
 from apps.drivers.models import Driver
+from apps.drivers.availability import get_availability_backend
+from apps.drivers.broadcasts import get_broadcast_buffer
+from apps.common.caching import clear_local_caches
+from apps.drivers.locations import get_location_buffer
 from apps.orders.models import Order
 
 User = get_user_model()
@@ -53,3 +59,47 @@ def order(client_user, driver_profile):
         dropoff_longitude=-73.985130,
         dropoff_address="456 Broadway",
     )
+
+
+@pytest.fixture(autouse=True)
+def reset_driver_availability():
+    get_availability_backend().clear()
+    get_location_buffer().clear()
+    get_broadcast_buffer().clear()
+    clear_local_caches()
+    yield
+    get_availability_backend().clear()
+    get_location_buffer().clear()
+    get_broadcast_buffer().clear()
+    clear_local_caches()
+
+
+@pytest.fixture
+def redis_client():
+    """
+    A client for the dedicated Redis database in TEST_REDIS_URL, emptied
+    before and after the test. Tests using it are skipped unless that is
+    set, so they never touch the keys of the Redis in REDIS_URL.
+    """
+    if not settings.TEST_REDIS_URL:
+        pytest.skip("TEST_REDIS_URL is not set")
+    client = redis.Redis.from_url(settings.TEST_REDIS_URL)
+    try:
+        client.ping()
+    except redis.ConnectionError:
+        pytest.skip("Redis at TEST_REDIS_URL is not available")
+    client.flushdb()
+    yield client
+    client.flushdb()
+
+
+@pytest.fixture(params=["memory", "redis"])
+def backend_factory(request):
+    """
+    Builds either the in-memory or the Redis implementation of a backend, so
+    a test taking it runs against both.
+    """
+    if request.param == "memory":
+        return lambda memory_class, redis_class: memory_class()
+    client = request.getfixturevalue("redis_client")
+    return lambda memory_class, redis_class: redis_class(client=client)